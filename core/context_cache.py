@@ -0,0 +1,138 @@
+"""
+Per-session cache of the context assembled for each orchestrated request.
+
+Recent activity is loaded from the database once per session and reused
+until the session logs new activity (the SessionManager notifies the cache
+from every activity write path) or the entry is older than ``ttl``, which
+covers writes made behind the manager's back. Cached rows are always what
+the loader returned, so hits and misses look the same to callers. Sessions
+are evicted least recently used first. Every context source is timed so
+slow ones show up in ``get_stats``.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+
+class _Latency:
+    """Running count/mean/max of one source's fetch time"""
+
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "avg_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "max_ms": self.max * 1000
+        }
+
+
+class SessionContextCache:
+    """LRU of recent activity per session, invalidated by activity events"""
+
+    def __init__(self, max_sessions: int = 256, history_limit: int = 5, ttl: float = 30.0):
+        self.max_sessions = max(1, max_sessions)
+        self.history_limit = history_limit
+        self.ttl = ttl
+
+        # session -> (loaded at, monotonic seconds; rows as returned by the loader)
+        self._history: "OrderedDict[str, Tuple[float, List[Dict]]]" = OrderedDict()
+        # Sessions being loaded -> whether activity arrived meanwhile (then the load is stale)
+        self._loading: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+        self._latency: Dict[str, _Latency] = {}
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0, "expired": 0, "evictions": 0}
+
+    def _record(self, source: str, seconds: float):
+        with self._lock:
+            self._latency.setdefault(source, _Latency()).add(seconds)
+
+    async def recent_history(self, session_id: str,
+                             load: Callable[[str], Awaitable[List[Dict]]]) -> List[Dict]:
+        """Recent activity for a session, loading it only on a cache miss"""
+        started = time.perf_counter()
+        with self._lock:
+            cached = self._history.get(session_id)
+            if cached is not None and time.monotonic() - cached[0] > self.ttl:
+                del self._history[session_id]
+                self._stats["expired"] += 1
+                cached = None
+            if cached is not None:
+                self._history.move_to_end(session_id)
+                self._stats["hits"] += 1
+                history = cached[1]
+            else:
+                self._stats["misses"] += 1
+                self._loading.setdefault(session_id, False)
+
+        if cached is None:
+            loaded_at = time.monotonic()
+            try:
+                history = list(await load(session_id))[:self.history_limit]
+            finally:
+                with self._lock:
+                    stale = self._loading.pop(session_id, True)
+            if not stale:
+                with self._lock:
+                    self._store(session_id, loaded_at, history)
+
+        self._record("recent_history", time.perf_counter() - started)
+        return list(history)
+
+    def _store(self, session_id: str, loaded_at: float, history: List[Dict]):
+        self._history[session_id] = (loaded_at, history)
+        self._history.move_to_end(session_id)
+        while len(self._history) > self.max_sessions:
+            self._history.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def timed(self, source: str, fetch: Callable[[], Any]) -> Any:
+        """Fetch an uncached context source, recording its latency"""
+        started = time.perf_counter()
+        try:
+            return fetch()
+        finally:
+            self._record(source, time.perf_counter() - started)
+
+    def record_activity(self, session_id: str):
+        """Activity listener: the session logged activity, so its cached history is stale"""
+        self.invalidate(session_id)
+
+    def invalidate(self, session_id: str = None):
+        """Forget one session's context, or every session's"""
+        with self._lock:
+            if session_id is None:
+                self._stats["invalidations"] += len(self._history)
+                self._history.clear()
+                for loading in self._loading:
+                    self._loading[loading] = True
+            else:
+                if self._history.pop(session_id, None) is not None:
+                    self._stats["invalidations"] += 1
+                if session_id in self._loading:
+                    self._loading[session_id] = True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get occupancy, hit counters and per-source latency"""
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                "sessions": len(self._history),
+                "max_sessions": self.max_sessions,
+                "ttl_seconds": self.ttl,
+                "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+                "latency": {source: latency.as_dict() for source, latency in self._latency.items()},
+                **self._stats
+            }
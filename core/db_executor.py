@@ -0,0 +1,76 @@
+"""
+Dedicated executor for blocking database calls.
+
+Lets asyncio code await SessionManager queries without running sqlite3 on
+the event loop. Work is funnelled to a dedicated thread and the number of
+calls in flight is bounded, so a burst of requests queues up on the
+caller's side instead of piling up behind the database.
+"""
+
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+class DatabaseExecutor:
+    """Runs blocking database calls on a dedicated worker thread"""
+
+    def __init__(self, max_pending: int = 64, workers: int = 1,
+                 thread_name: str = "session-db"):
+        self.max_pending = max(1, max_pending)
+        self.workers = max(1, workers)
+        self.logger = logging.getLogger(__name__)
+
+        self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                            thread_name_prefix=thread_name)
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._in_flight = 0
+        self._completed = 0
+        self._waited = 0
+        self._closed = False
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run ``func`` on the database thread and await its result
+
+        Waits for a free slot when ``max_pending`` calls are already queued.
+        """
+        if self._closed:
+            raise RuntimeError("Database executor is closed")
+
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        if self._slots.locked():
+            self._waited += 1
+
+        async with self._slots:
+            self._in_flight += 1
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(
+                    self._executor, functools.partial(func, *args, **kwargs)
+                )
+            finally:
+                self._in_flight -= 1
+                self._completed += 1
+
+    async def close(self):
+        """Stop accepting work and wait for queued calls to finish"""
+        if self._closed:
+            return
+        self._closed = True
+        await asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(self._executor.shutdown, wait=True)
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue depth and throughput counters"""
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "in_flight": self._in_flight,
+            "completed": self._completed,
+            "waited_for_slot": self._waited,
+            "closed": self._closed
+        }
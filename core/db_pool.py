@@ -0,0 +1,143 @@
+"""
+Managed SQLite connection pool for the session store.
+
+Connections are opened lazily, configured once (WAL journaling and tuned
+pragmas) and then reused across calls, so each query pays for neither the
+connect nor the statement compilation: sqlite3 keeps a per-connection cache
+of prepared statements keyed by SQL text.
+"""
+
+import logging
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+# Applied in order to every new connection
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",       # readers no longer block the writer
+    "synchronous": "NORMAL",     # fsync on checkpoint, not on every commit
+    "temp_store": "MEMORY",
+    "cache_size": -16000,        # negative value is KiB, i.e. ~16 MB
+    "mmap_size": 268435456,      # 256 MB memory-mapped reads
+    "busy_timeout": 5000,        # ms to wait on a locked database
+}
+
+
+class PoolClosedError(sqlite3.ProgrammingError):
+    """Raised when a connection is requested from a drained pool"""
+
+
+class ConnectionPool:
+    """Small bounded pool of configured SQLite connections"""
+
+    def __init__(self, db_path: str, max_size: int = 4,
+                 pragmas: Optional[Dict[str, Any]] = None,
+                 cached_statements: int = 256, timeout: float = 30.0):
+        self.db_path = db_path
+        self.max_size = max(1, max_size)
+        self.pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        self.cached_statements = cached_statements
+        self.timeout = timeout
+        self.logger = logging.getLogger(__name__)
+
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._all: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stats = {"opened": 0, "checkouts": 0, "waits": 0}
+
+    def _open(self) -> sqlite3.Connection:
+        """Open and configure a new connection"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.timeout,
+            cached_statements=self.cached_statements,
+            check_same_thread=False  # connections move between threads, never shared concurrently
+        )
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name}={value}")
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        """Check out a connection, opening one if the pool is not full"""
+        if self._closed:
+            raise PoolClosedError(f"Connection pool for {self.db_path} is closed")
+
+        with self._lock:
+            self._stats["checkouts"] += 1
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if len(self._all) < self.max_size:
+                conn = self._open()
+                self._all.append(conn)
+                self._stats["opened"] += 1
+                return conn
+            self._stats["waits"] += 1
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"Timed out after {self.timeout}s waiting for a database connection"
+            )
+
+    def release(self, conn: sqlite3.Connection):
+        """Return a connection to the pool"""
+        if self._closed:
+            conn.close()
+            return
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Check out a connection for one transaction
+
+        Mirrors ``with sqlite3.connect(...) as conn``: the transaction is
+        committed on success and rolled back on error.
+        """
+        conn = self.acquire()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self.release(conn)
+
+    def close(self) -> int:
+        """Drain the pool and close every connection it opened"""
+        with self._lock:
+            self._closed = True
+            connections, self._all = self._all, []
+
+        closed = 0
+        for conn in connections:
+            try:
+                conn.close()
+                closed += 1
+            except sqlite3.Error as e:
+                self.logger.warning(f"Error closing pooled connection: {e}")
+
+        while True:
+            try:
+                self._idle.get_nowait()
+            except queue.Empty:
+                break
+        return closed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pool usage counters"""
+        with self._lock:
+            return {
+                "max_size": self.max_size,
+                "open_connections": len(self._all),
+                "idle_connections": self._idle.qsize(),
+                "closed": self._closed,
+                **self._stats
+            }
@@ -0,0 +1,398 @@
+"""
+In-process metrics and sampling profiler for the core components.
+
+``metrics`` is a process-wide registry of counters and latency histograms,
+keyed by name and labels. ``timed`` records how long a block, function or
+coroutine takes. The registry exports Prometheus text or JSON; a Flask
+blueprint serving both (plus profiler controls) is available when Flask is
+installed. ``SamplingProfiler`` periodically snapshots every thread's stack
+via ``sys._current_frames()`` and can be switched on and off at runtime;
+it costs nothing while stopped.
+"""
+
+import asyncio
+import bisect
+import contextlib
+import functools
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Latency buckets in seconds, 1us (cached safety checks) to 10s (subprocesses)
+DEFAULT_BUCKETS = (0.000001, 0.0000025, 0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> _LabelKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class Histogram:
+    """Latency histogram for one label set"""
+
+    __slots__ = ("bounds", "counts", "count", "sum", "max", "errors", "_lock")
+
+    # For hot paths timing themselves: started = h.clock(); ...; h.observe(h.clock() - started)
+    clock = staticmethod(time.perf_counter)
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, error: bool = False):
+        """Record one observation in seconds, optionally counting it as an error"""
+        with self._lock:
+            self.counts[bisect.bisect_left(self.bounds, value)] += 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+            if error:
+                self.errors += 1
+
+    def time(self) -> "_Timing":
+        """Context manager recording the duration of its block"""
+        return _Timing(self)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class _Timing:
+    __slots__ = ("histogram", "started")
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.started, error=exc_type is not None)
+        return False
+
+
+class CounterValue:
+    """Monotonic counter for one label set"""
+
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+
+class MetricsRegistry:
+    """Thread-safe counters and histograms with Prometheus/JSON export
+
+    ``counter()`` and ``histogram()`` return the series for a label set,
+    creating it on first use; hot paths resolve these once and keep them.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counters: Dict[str, Dict[_LabelKey, CounterValue]] = {}
+        self._histograms: Dict[str, Dict[_LabelKey, Histogram]] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, **labels) -> CounterValue:
+        """The counter series for a name and label set"""
+        key = _label_key(labels)
+        series = self._counters.get(name)
+        if series is None or key not in series:
+            with self._lock:
+                series = self._counters.setdefault(name, {})
+                series.setdefault(key, CounterValue())
+        return series[key]
+
+    def histogram(self, name: str, **labels) -> Histogram:
+        """The histogram series for a name and label set"""
+        key = _label_key(labels)
+        series = self._histograms.get(name)
+        if series is None or key not in series:
+            with self._lock:
+                series = self._histograms.setdefault(name, {})
+                series.setdefault(key, Histogram(self.buckets))
+        return series[key]
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        """Add to a counter"""
+        self.counter(name, **labels).inc(amount)
+
+    def observe(self, name: str, value: float, **labels):
+        """Record one observation (seconds, for latency histograms)"""
+        self.histogram(name, **labels).observe(value)
+
+    def reset(self):
+        """Drop every series"""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def _snapshot(self, prefix: str = ""):
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()
+                        if name.startswith(prefix)}
+            histograms = {name: dict(series) for name, series in self._histograms.items()
+                          if name.startswith(prefix)}
+        return counters, histograms
+
+    def to_json(self, prefix: str = "") -> Dict[str, Any]:
+        """Counters and histogram summaries, optionally only names with a prefix"""
+        counters, histograms = self._snapshot(prefix)
+        return {
+            "counters": {
+                name: [{"labels": dict(key), "value": c.value} for key, c in series.items()]
+                for name, series in counters.items()
+            },
+            "histograms": {
+                name: [{
+                    "labels": dict(key),
+                    "count": h.count,
+                    "errors": h.errors,
+                    "sum_seconds": h.sum,
+                    "avg_ms": h.sum / h.count * 1000 if h.count else 0.0,
+                    "p50_ms": h.quantile(0.50) * 1000,
+                    "p95_ms": h.quantile(0.95) * 1000,
+                    "p99_ms": h.quantile(0.99) * 1000,
+                    "max_ms": h.max * 1000
+                } for key, h in series.items()]
+                for name, series in histograms.items()
+            }
+        }
+
+    def to_prometheus(self, namespace: str = "core") -> str:
+        """Prometheus text exposition format"""
+        def render(labels: Iterable[Tuple[str, str]]) -> str:
+            pairs = ",".join(
+                '{}="{}"'.format(key, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+                for key, value in labels
+            )
+            return "{" + pairs + "}" if pairs else ""
+
+        counters, histograms = self._snapshot()
+        lines = []
+        for name, series in sorted(counters.items()):
+            metric = f"{namespace}_{name}"
+            lines.append(f"# TYPE {metric} counter")
+            for key, c in series.items():
+                lines.append(f"{metric}{render(key)} {c.value}")
+
+        for name, series in sorted(histograms.items()):
+            metric = f"{namespace}_{name}"
+            lines.append(f"# TYPE {metric} histogram")
+            for key, h in series.items():
+                cumulative = 0
+                for bound, count in zip(h.bounds, h.counts):
+                    cumulative += count
+                    lines.append(f"{metric}_bucket{render(key + (('le', repr(bound)),))} {cumulative}")
+                lines.append(f"{metric}_bucket{render(key + (('le', '+Inf'),))} {h.count}")
+                lines.append(f"{metric}_sum{render(key)} {h.sum}")
+                lines.append(f"{metric}_count{render(key)} {h.count}")
+            if any(h.errors for h in series.values()):
+                lines.append(f"# TYPE {metric}_errors_total counter")
+                for key, h in series.items():
+                    lines.append(f"{metric}_errors_total{render(key)} {h.errors}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+class timed:
+    """Record the duration of a block, function or coroutine in a histogram
+
+        with timed("executor_spawn_seconds"): ...
+
+        @timed("session_query_seconds", method="get_tasks")
+        def get_tasks(...): ...
+
+    Exceptions escaping the timed code are counted as the series' errors.
+    """
+
+    def __init__(self, name: str, registry: MetricsRegistry = None, **labels):
+        self.histogram = (registry or metrics).histogram(name, **labels)
+        self._timings: List[_Timing] = []
+
+    def __enter__(self):
+        timing = self.histogram.time()
+        self._timings.append(timing)
+        return timing.__enter__()
+
+    def __exit__(self, exc_type, exc, tb):
+        return self._timings.pop().__exit__(exc_type, exc, tb)
+
+    def __call__(self, func):
+        histogram = self.histogram
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with histogram.time():
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with histogram.time():
+                return func(*args, **kwargs)
+        return wrapper
+
+
+@contextlib.contextmanager
+def timed_context(manager, name: str, registry: MetricsRegistry = None, **labels):
+    """Enter another context manager, timing everything until it exits"""
+    with (registry or metrics).histogram(name, **labels).time(), manager as value:
+        yield value
+
+
+class SamplingProfiler:
+    """Statistical profiler over all threads, toggled at runtime
+
+    Every ``interval`` seconds each thread's stack is folded into a
+    "file:function;file:function" string and counted, the collapsed format
+    flame graph tools read.
+    """
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self._stacks: Counter = Counter()
+        self._samples = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.started_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, interval: float = None, reset: bool = True):
+        """Start sampling; a no-op if already running"""
+        if self._thread is not None:
+            return
+        if interval:
+            self.interval = interval
+        if reset:
+            with self._lock:
+                self._stacks.clear()
+                self._samples = 0
+        self._stop.clear()
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling, keeping the collected profile"""
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join(timeout=1)
+
+    def _fold(self, frame) -> str:
+        parts = []
+        while frame is not None and len(parts) < self.max_depth:
+            code = frame.f_code
+            parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(parts))
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            stacks = [self._fold(frame) for ident, frame in sys._current_frames().items() if ident != own]
+            with self._lock:
+                self._stacks.update(stacks)
+                self._samples += 1
+
+    def collapsed(self) -> str:
+        """Profile in collapsed-stack format, one "stack count" per line"""
+        with self._lock:
+            return "\n".join(f"{stack} {count}" for stack, count in self._stacks.most_common())
+
+    def top(self, limit: int = 20) -> Dict[str, Any]:
+        """Most frequently sampled leaf functions and full stacks"""
+        with self._lock:
+            leaves: Counter = Counter()
+            for stack, count in self._stacks.items():
+                leaves[stack.rsplit(";", 1)[-1]] += count
+            return {
+                "running": self.running,
+                "samples": self._samples,
+                "interval": self.interval,
+                "started_at": self.started_at,
+                "top_functions": leaves.most_common(limit),
+                "top_stacks": self._stacks.most_common(limit)
+            }
+
+
+profiler = SamplingProfiler()
+
+
+def create_metrics_blueprint(registry: MetricsRegistry = None, sampler: SamplingProfiler = None):
+    """Flask blueprint exposing metrics and profiler controls
+
+        GET  /metrics           Prometheus text
+        GET  /metrics.json      JSON
+        POST /profiler/start    ?interval=0.005
+        POST /profiler/stop
+        GET  /profiler          top functions/stacks (?format=collapsed for flame graphs)
+
+    Flask is imported here so the rest of this module works without it.
+    """
+    from flask import Blueprint, Response, jsonify, request
+
+    registry = registry or metrics
+    sampler = sampler or profiler
+    blueprint = Blueprint("core_metrics", __name__)
+
+    @blueprint.route("/metrics")
+    def prometheus_metrics():
+        return Response(registry.to_prometheus(), mimetype="text/plain; version=0.0.4")
+
+    @blueprint.route("/metrics.json")
+    def json_metrics():
+        return jsonify(registry.to_json())
+
+    @blueprint.route("/profiler/start", methods=["POST"])
+    def start_profiler():
+        sampler.start(interval=request.args.get("interval", type=float))
+        return jsonify({"running": sampler.running, "interval": sampler.interval})
+
+    @blueprint.route("/profiler/stop", methods=["POST"])
+    def stop_profiler():
+        sampler.stop()
+        return jsonify(sampler.top())
+
+    @blueprint.route("/profiler")
+    def profile():
+        if request.args.get("format") == "collapsed":
+            return Response(sampler.collapsed(), mimetype="text/plain")
+        return jsonify(sampler.top(request.args.get("limit", 20, type=int)))
+
+    return blueprint
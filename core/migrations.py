@@ -0,0 +1,551 @@
+"""
+Versioned schema migrations for the session store.
+
+Each migration runs once, in its own transaction, and is recorded in the
+``schema_migrations`` table. Steps are SQL strings or callables taking the
+connection, for changes that depend on the live schema. A callable step
+may raise ``MigrationDeferred`` when something it needs is missing (e.g.
+FTS5); the migration is then rolled back, left unrecorded and tried again
+on a later run, so it must not be a prerequisite of any later migration.
+"""
+
+import logging
+import re
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+MigrationStep = Union[str, Callable[[sqlite3.Connection], None]]
+
+
+class MigrationDeferred(Exception):
+    """Raised by a migration step that cannot run in this environment yet"""
+
+
+def _rollup_upsert(rollup: str, keys: Dict[str, str], values: Dict[str, str],
+                   condition: str, sign: str) -> str:
+    """Build an upsert adding (sign='+') or removing (sign='-') one row's contribution"""
+    columns = list(keys) + list(values)
+    selects = list(keys.values()) + [f"{sign}({expr})" for expr in values.values()]
+    updates = ", ".join(f"{name} = {name} + excluded.{name}" for name in values)
+    return (
+        f"INSERT INTO {rollup} ({', '.join(columns)}) "
+        f"SELECT {', '.join(selects)} WHERE {condition} "
+        f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {updates};"
+    )
+
+
+def _rollup_triggers(table: str, rollup: str, keys: Dict[str, str],
+                     values: Dict[str, str], required: Sequence[str]) -> List[str]:
+    """Triggers keeping ``rollup`` in step with inserts, updates and deletes on ``table``
+
+    ``keys`` and ``values`` map rollup columns to expressions over a row
+    referenced as ``{row}``; rows where any ``required`` expression is NULL
+    are not rolled up (they can never match a session/time-window query).
+    """
+    def bind(expressions, row):
+        return {name: expr.format(row=row) for name, expr in expressions.items()}
+
+    def condition(row):
+        return " AND ".join(f"{expr.format(row=row)} IS NOT NULL" for expr in required)
+
+    watched = sorted({
+        column
+        for expr in [*keys.values(), *values.values(), *required]
+        for column in re.findall(r"\{row\}\.(\w+)", expr)
+    })
+    add_new = _rollup_upsert(rollup, bind(keys, "NEW"), bind(values, "NEW"), condition("NEW"), "+")
+    remove_old = _rollup_upsert(rollup, bind(keys, "OLD"), bind(values, "OLD"), condition("OLD"), "-")
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS trg_{rollup}_insert AFTER INSERT ON {table} "
+        f"BEGIN {add_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_{rollup}_delete AFTER DELETE ON {table} "
+        f"BEGIN {remove_old} END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_{rollup}_update AFTER UPDATE OF {', '.join(watched)} ON {table} "
+        f"BEGIN {remove_old} {add_new} END",
+    ]
+
+
+def _rollup_backfill(table: str, rollup: str, keys: Dict[str, str],
+                     values: Dict[str, str], required: Sequence[str]) -> str:
+    """Seed ``rollup`` from the rows already in ``table``"""
+    bound_keys = [expr.format(row=table) for expr in keys.values()]
+    sums = [f"SUM({expr.format(row=table)})" for expr in values.values()]
+    where = " AND ".join(f"{expr.format(row=table)} IS NOT NULL" for expr in required)
+    return (
+        f"INSERT INTO {rollup} ({', '.join(list(keys) + list(values))}) "
+        f"SELECT {', '.join(bound_keys + sums)} FROM {table} WHERE {where} "
+        f"GROUP BY {', '.join(bound_keys)}"
+    )
+
+
+# Per-session, per-day rollups behind get_session_statistics. Each spec is
+# (source table, rollup table, key expressions, summed value expressions, required).
+_TASK_ROLLUP = (
+    "tasks", "task_daily_rollup",
+    {"session_id": "{row}.session_id", "day": "DATE({row}.created_at)"},
+    {"total": "1",
+     "completed": "CASE WHEN {row}.status = 'completed' THEN 1 ELSE 0 END",
+     "pending": "CASE WHEN {row}.status = 'pending' THEN 1 ELSE 0 END",
+     "in_progress": "CASE WHEN {row}.status = 'in_progress' THEN 1 ELSE 0 END"},
+    ["{row}.session_id", "DATE({row}.created_at)"])
+_NOTE_ROLLUP = (
+    "session_notes", "note_daily_rollup",
+    {"session_id": "{row}.session_id", "day": "DATE({row}.timestamp)"},
+    {"total": "1",
+     "manual": "CASE WHEN {row}.note_type = 'manual' THEN 1 ELSE 0 END",
+     "auto_summary": "CASE WHEN {row}.note_type = 'auto_summary' THEN 1 ELSE 0 END"},
+    ["{row}.session_id", "DATE({row}.timestamp)"])
+
+# As first created by migration 2; migration 5 replaces the activity rollups
+_ROLLUPS_V2 = [
+    ("activity_logs", "activity_daily_rollup",
+     {"session_id": "{row}.session_id", "day": "DATE({row}.timestamp)"},
+     {"total": "1",
+      "successful": "CASE WHEN {row}.success = 1 THEN 1 ELSE 0 END",
+      "execution_time_sum": "COALESCE({row}.execution_time, 0)",
+      "execution_time_count": "CASE WHEN {row}.execution_time IS NULL THEN 0 ELSE 1 END"},
+     ["{row}.session_id", "DATE({row}.timestamp)"]),
+    ("activity_logs", "activity_action_daily_rollup",
+     {"session_id": "{row}.session_id", "day": "DATE({row}.timestamp)", "action_type": "{row}.action_type"},
+     {"action_count": "1"},
+     ["{row}.session_id", "DATE({row}.timestamp)"]),
+    _TASK_ROLLUP,
+    _NOTE_ROLLUP,
+]
+
+# As created by migration 5, which summed execution time in whole microseconds
+_EXECUTION_TIME_US = "CAST(ROUND({row}.execution_time * 1000000) AS INTEGER)"
+# A NULL action_type is keyed as '' plus a flag, so its rows collapse into one rollup row
+_ACTION_ROLLUP = (
+    "activity_logs", "activity_action_daily_rollup",
+    {"session_id": "{row}.session_id", "day": "DATE({row}.timestamp)",
+     "action_type": "COALESCE({row}.action_type, '')",
+     "action_type_is_null": "({row}.action_type IS NULL)"},
+    {"action_count": "1"},
+    ["{row}.session_id", "DATE({row}.timestamp)"])
+_ROLLUPS_V5 = [
+    ("activity_logs", "activity_daily_rollup",
+     {"session_id": "{row}.session_id", "day": "DATE({row}.timestamp)"},
+     {"total": "1",
+      "successful": "CASE WHEN {row}.success = 1 THEN 1 ELSE 0 END",
+      "execution_time_us": f"COALESCE({_EXECUTION_TIME_US}, 0)",
+      "execution_time_count": "CASE WHEN {row}.execution_time IS NULL THEN 0 ELSE 1 END"},
+     ["{row}.session_id", "DATE({row}.timestamp)"]),
+    _ACTION_ROLLUP,
+    _TASK_ROLLUP,
+    _NOTE_ROLLUP,
+]
+
+# Execution time is not rolled up: a running float sum drifts as rows come and
+# go, and any other summation order changes the last digits. Its SUM and AVG
+# are read from the covering index instead, exactly as the raw query did.
+ROLLUPS = [
+    ("activity_logs", "activity_daily_rollup",
+     {"session_id": "{row}.session_id", "day": "DATE({row}.timestamp)"},
+     {"total": "1",
+      "successful": "CASE WHEN {row}.success = 1 THEN 1 ELSE 0 END"},
+     ["{row}.session_id", "DATE({row}.timestamp)"]),
+    _ACTION_ROLLUP,
+    _TASK_ROLLUP,
+    _NOTE_ROLLUP,
+]
+
+
+def _create_rollups(conn: sqlite3.Connection, specs=None, only: Sequence[str] = None):
+    """Create, backfill and attach triggers for rollup tables (all, or those named in ``only``)"""
+    for table, rollup, keys, values, required in ROLLUPS if specs is None else specs:
+        if only is not None and rollup not in only:
+            continue
+        for statement in _rollup_triggers(table, rollup, keys, values, required):
+            conn.execute(statement)
+        conn.execute(_rollup_backfill(table, rollup, keys, values, required))
+
+
+def _drop_rollup(conn: sqlite3.Connection, rollup: str):
+    for event in ("insert", "delete", "update"):
+        conn.execute(f"DROP TRIGGER IF EXISTS trg_{rollup}_{event}")
+    conn.execute(f"DROP TABLE IF EXISTS {rollup}")
+
+
+def _rebuild_activity_rollups(conn: sqlite3.Connection):
+    """Replace the float-summed activity rollups with integer-microsecond ones"""
+    rollups = ("activity_daily_rollup", "activity_action_daily_rollup")
+    for rollup in rollups:
+        _drop_rollup(conn, rollup)
+    conn.execute("""CREATE TABLE activity_daily_rollup (
+                        session_id TEXT NOT NULL,
+                        day TEXT NOT NULL,
+                        total INTEGER NOT NULL DEFAULT 0,
+                        successful INTEGER NOT NULL DEFAULT 0,
+                        execution_time_us INTEGER NOT NULL DEFAULT 0,
+                        execution_time_count INTEGER NOT NULL DEFAULT 0,
+                        PRIMARY KEY (session_id, day)
+                    ) WITHOUT ROWID""")
+    conn.execute("""CREATE TABLE activity_action_daily_rollup (
+                        session_id TEXT NOT NULL,
+                        day TEXT NOT NULL,
+                        action_type TEXT NOT NULL,
+                        action_type_is_null INTEGER NOT NULL,
+                        action_count INTEGER NOT NULL DEFAULT 0,
+                        PRIMARY KEY (session_id, day, action_type, action_type_is_null)
+                    ) WITHOUT ROWID""")
+    _create_rollups(conn, _ROLLUPS_V5, only=rollups)
+
+
+def _drop_execution_time_rollup(conn: sqlite3.Connection):
+    """Rebuild the daily activity rollup without its execution time columns"""
+    _drop_rollup(conn, "activity_daily_rollup")
+    conn.execute("""CREATE TABLE activity_daily_rollup (
+                        session_id TEXT NOT NULL,
+                        day TEXT NOT NULL,
+                        total INTEGER NOT NULL DEFAULT 0,
+                        successful INTEGER NOT NULL DEFAULT 0,
+                        PRIMARY KEY (session_id, day)
+                    ) WITHOUT ROWID""")
+    _create_rollups(conn, only=("activity_daily_rollup",))
+
+
+def window_first_day(since: datetime) -> Tuple[str, str]:
+    """The first (partial) day of a statistics window and the day after it"""
+    return since.date().isoformat(), (since.date() + timedelta(days=1)).isoformat()
+
+
+def window_totals(conn: sqlite3.Connection, session_id: str, since: datetime,
+                  rollup: str, rollup_columns: List[str],
+                  table: str, time_column: str, raw_columns: List[str]) -> List[Any]:
+    """Sum a session's rollup rows after ``since`` plus its raw rows on the first day
+
+    ``rollup_columns`` and ``raw_columns`` are matching expressions: the
+    first is summed over daily rollup rows, the second aggregated over the
+    raw rows of the partial day, and the two results are added together.
+    """
+    since_day, next_day = window_first_day(since)
+
+    full_days = conn.execute(f"""
+        SELECT {', '.join(f'SUM({column})' for column in rollup_columns)}
+        FROM {rollup}
+        WHERE session_id = ? AND day > ?
+    """, (session_id, since_day)).fetchone()
+
+    # The range bounds use the covering index; DATE() keeps the split exact
+    first_day = conn.execute(f"""
+        SELECT {', '.join(raw_columns)}
+        FROM {table}
+        WHERE session_id = ? AND {time_column} > ? AND {time_column} < ?
+          AND DATE({time_column}) = ?
+    """, (session_id, since.isoformat(), next_day, since_day)).fetchone()
+
+    return [(rolled or 0) + (raw or 0) for rolled, raw in zip(full_days, first_day)]
+
+
+# Full-text indexes over the free-text columns of session data. Each spec is
+# (source table, FTS5 table, filter columns). The indexed columns are
+# whichever TEXT columns the table has besides the filter columns; filters
+# are checked on the joined row, since ids like "bench-session-00012"
+# tokenize into words common to every row and make poor match terms.
+SEARCH_INDEXES = [
+    ("activity_logs", "activity_logs_fts", ("session_id", "action_type")),
+    ("session_notes", "session_notes_fts", ("session_id", "note_type")),
+]
+
+SEARCH_TOKENIZER = "unicode61 remove_diacritics 2"
+
+
+def fts5_available(conn: sqlite3.Connection) -> bool:
+    """Whether this SQLite build includes the FTS5 extension"""
+    try:
+        conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp.fts5_probe USING fts5(probe)")
+        conn.execute("DROP TABLE temp.fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def search_columns(conn: sqlite3.Connection, table: str,
+                   filters: Sequence[str]) -> Tuple[str, List[str], List[str]]:
+    """(rowid column, filter columns, text columns) of a table as it exists now"""
+    rowid, present, text = "rowid", set(), []
+    for _, name, col_type, _, _, pk in conn.execute(f"PRAGMA table_info({table})"):
+        affinity = (col_type or "").upper()
+        present.add(name)
+        if pk == 1 and affinity == "INTEGER":
+            rowid = name
+        elif name not in filters and any(kind in affinity for kind in ("TEXT", "CHAR", "CLOB")):
+            text.append(name)
+    return rowid, [name for name in filters if name in present], text
+
+
+def _create_search_indexes(conn: sqlite3.Connection):
+    """Create, backfill and attach sync triggers for every full-text index"""
+    if not fts5_available(conn):
+        raise MigrationDeferred("SQLite was built without FTS5; search falls back to LIKE scans")
+
+    for table, fts, filters in SEARCH_INDEXES:
+        rowid, _, text_columns = search_columns(conn, table, filters)
+        if not text_columns:
+            continue
+        columns = text_columns
+        column_list = ", ".join(columns)
+        new_values = ", ".join(f"NEW.{name}" for name in columns)
+        old_values = ", ".join(f"OLD.{name}" for name in columns)
+        insert = f"INSERT INTO {fts} (rowid, {column_list}) VALUES (NEW.{rowid}, {new_values});"
+        delete = (f"INSERT INTO {fts} ({fts}, rowid, {column_list}) "
+                  f"VALUES ('delete', OLD.{rowid}, {old_values});")
+
+        # External content: the index stores tokens only, text is read back from the table
+        conn.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({column_list}, "
+            f"content='{table}', content_rowid='{rowid}', "
+            f"tokenize='{SEARCH_TOKENIZER}', prefix='2 3')"
+        )
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_{fts}_insert AFTER INSERT ON {table} "
+                     f"BEGIN {insert} END")
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_{fts}_delete AFTER DELETE ON {table} "
+                     f"BEGIN {delete} END")
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_{fts}_update AFTER UPDATE OF {column_list} "
+                     f"ON {table} BEGIN {delete} {insert} END")
+        conn.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+
+MIGRATIONS: List[Tuple[int, str, Sequence[MigrationStep]]] = [
+    (1, "Composite and covering indexes for session/time-window queries", [
+        # get_session_statistics and get_recent_activity: seek on session, range on time,
+        # and every aggregated column is in the index so the table is never touched
+        """CREATE INDEX IF NOT EXISTS idx_activity_session_time
+           ON activity_logs (session_id, timestamp, action_type, success, execution_time)""",
+        # cleanup_old_data range delete and oldest/newest in get_database_info
+        "CREATE INDEX IF NOT EXISTS idx_activity_time ON activity_logs (timestamp)",
+        # get_tasks filtered by session and status, ordered by creation
+        """CREATE INDEX IF NOT EXISTS idx_tasks_session_status_created
+           ON tasks (session_id, status, created_at)""",
+        # task statistics: session and creation window, counting by status
+        """CREATE INDEX IF NOT EXISTS idx_tasks_session_created
+           ON tasks (session_id, created_at, status)""",
+        # cleanup_old_data: completed tasks by completion time
+        "CREATE INDEX IF NOT EXISTS idx_tasks_status_completed ON tasks (status, completed_at)",
+        # note statistics: session and time window, counting by type
+        """CREATE INDEX IF NOT EXISTS idx_notes_session_time
+           ON session_notes (session_id, timestamp, note_type)""",
+        # cleanup_old_data range delete on notes
+        "CREATE INDEX IF NOT EXISTS idx_notes_time ON session_notes (timestamp, note_type)",
+    ]),
+    (2, "Incrementally maintained per-session daily rollups for statistics", [
+        """CREATE TABLE IF NOT EXISTS activity_daily_rollup (
+               session_id TEXT NOT NULL,
+               day TEXT NOT NULL,
+               total INTEGER NOT NULL DEFAULT 0,
+               successful INTEGER NOT NULL DEFAULT 0,
+               execution_time_sum DEFAULT 0,  -- untyped so integer sums stay integers, as SUM() does
+               execution_time_count INTEGER NOT NULL DEFAULT 0,
+               PRIMARY KEY (session_id, day)
+           ) WITHOUT ROWID""",
+        # Rowid table: action_type may be NULL, and a NULL key never conflicts,
+        # so each NULL-typed row gets its own +1/-1 delta row instead
+        """CREATE TABLE IF NOT EXISTS activity_action_daily_rollup (
+               session_id TEXT NOT NULL,
+               day TEXT NOT NULL,
+               action_type TEXT,
+               action_count INTEGER NOT NULL DEFAULT 0,
+               PRIMARY KEY (session_id, day, action_type)
+           )""",
+        """CREATE TABLE IF NOT EXISTS task_daily_rollup (
+               session_id TEXT NOT NULL,
+               day TEXT NOT NULL,
+               total INTEGER NOT NULL DEFAULT 0,
+               completed INTEGER NOT NULL DEFAULT 0,
+               pending INTEGER NOT NULL DEFAULT 0,
+               in_progress INTEGER NOT NULL DEFAULT 0,
+               PRIMARY KEY (session_id, day)
+           ) WITHOUT ROWID""",
+        """CREATE TABLE IF NOT EXISTS note_daily_rollup (
+               session_id TEXT NOT NULL,
+               day TEXT NOT NULL,
+               total INTEGER NOT NULL DEFAULT 0,
+               manual INTEGER NOT NULL DEFAULT 0,
+               auto_summary INTEGER NOT NULL DEFAULT 0,
+               PRIMARY KEY (session_id, day)
+           ) WITHOUT ROWID""",
+        lambda conn: _create_rollups(conn, _ROLLUPS_V2),
+    ]),
+    (3, "Keyset pagination indexes for task and activity listings", [
+        # (created_at, id) keys: pages resume with a seek instead of an OFFSET scan
+        "CREATE INDEX IF NOT EXISTS idx_tasks_session_keyset ON tasks (session_id, created_at, id)",
+        """CREATE INDEX IF NOT EXISTS idx_tasks_session_status_keyset
+           ON tasks (session_id, status, created_at, id)""",
+        "DROP INDEX IF EXISTS idx_tasks_session_status_created",
+        # Index entries end in the rowid, so this orders by (timestamp, rowid)
+        "CREATE INDEX IF NOT EXISTS idx_activity_session_keyset ON activity_logs (session_id, timestamp)",
+    ]),
+    (4, "Full-text search indexes over activity logs and session notes", [
+        _create_search_indexes,
+    ]),
+    (5, "Exact integer-microsecond activity rollups with NULL action types collapsed", [
+        _rebuild_activity_rollups,
+    ]),
+    (6, "Read execution time from the raw rows so statistics keep full float precision", [
+        _drop_execution_time_rollup,
+    ]),
+]
+
+# Representative queries for the hot access paths, with placeholder parameters
+QUERY_PLAN_PROBES: Dict[str, Tuple[str, Tuple[Any, ...]]] = {
+    "activity_statistics": (
+        """SELECT COUNT(*), SUM(CASE WHEN success = 1 THEN 1 ELSE 0 END), AVG(execution_time),
+                  SUM(execution_time), COUNT(DISTINCT DATE(timestamp))
+           FROM activity_logs WHERE session_id = ? AND timestamp > ?""",
+        ("session", "1970-01-01")
+    ),
+    "activity_rollup_window": (
+        "SELECT SUM(total), SUM(successful) FROM activity_daily_rollup WHERE session_id = ? AND day > ?",
+        ("session", "1970-01-01")
+    ),
+    "top_action_types": (
+        """SELECT action_type, COUNT(*) as count FROM activity_logs
+           WHERE session_id = ? AND timestamp > ?
+           GROUP BY action_type ORDER BY count DESC LIMIT 5""",
+        ("session", "1970-01-01")
+    ),
+    "tasks_by_session_status": (
+        "SELECT * FROM tasks WHERE 1=1 AND session_id = ? AND status = ? ORDER BY created_at DESC",
+        ("session", "pending")
+    ),
+    "tasks_page": (
+        """SELECT id FROM tasks WHERE 1=1 AND session_id = ? AND (created_at, id) < (?, ?)
+           ORDER BY created_at DESC, id DESC LIMIT ?""",
+        ("session", "9999-12-31", "", 100)
+    ),
+    "activity_page": (
+        """SELECT rowid FROM activity_logs WHERE session_id = ? AND (timestamp, rowid) < (?, ?)
+           ORDER BY timestamp DESC, rowid DESC LIMIT ?""",
+        ("session", "9999-12-31", 0, 100)
+    ),
+    "task_statistics": (
+        """SELECT COUNT(*), SUM(CASE WHEN status = 'completed' THEN 1 ELSE 0 END)
+           FROM tasks WHERE session_id = ? AND created_at > ?""",
+        ("session", "1970-01-01")
+    ),
+    "note_statistics": (
+        """SELECT COUNT(*), SUM(CASE WHEN note_type = 'manual' THEN 1 ELSE 0 END)
+           FROM session_notes WHERE session_id = ? AND timestamp > ?""",
+        ("session", "1970-01-01")
+    ),
+    "search_activity": (
+        """SELECT f.rowid FROM activity_logs_fts f CROSS JOIN activity_logs t ON t.rowid = f.rowid
+           WHERE activity_logs_fts MATCH ? AND t.session_id = ? ORDER BY f.rank, f.rowid LIMIT ?""",
+        ('"error"', "session", 20)
+    ),
+    "cleanup_activity": (
+        "DELETE FROM activity_logs WHERE timestamp < ?",
+        ("1970-01-01",)
+    ),
+    "cleanup_tasks": (
+        "DELETE FROM tasks WHERE completed_at < ? AND status = 'completed'",
+        ("1970-01-01",)
+    ),
+}
+
+
+def _ensure_migrations_table(conn: sqlite3.Connection):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )
+    """)
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Get the highest applied migration version (0 when none)"""
+    _ensure_migrations_table(conn)
+    row = conn.execute("SELECT MAX(version) FROM schema_migrations").fetchone()
+    return row[0] or 0
+
+
+def _is_applied(conn: sqlite3.Connection, version: int) -> bool:
+    row = conn.execute("SELECT 1 FROM schema_migrations WHERE version = ?", (version,)).fetchone()
+    return row is not None
+
+
+def _prefer_incremental_vacuum(conn: sqlite3.Connection) -> bool:
+    """Switch a database that holds no rows yet to auto_vacuum=INCREMENTAL
+
+    The mode only takes effect through a VACUUM, which is instant while the
+    file is empty; databases that already hold data are left for the
+    one-off RetentionEngine.enable_incremental_vacuum.
+    """
+    from core.retention import AUTO_VACUUM_INCREMENTAL
+
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == AUTO_VACUUM_INCREMENTAL:
+        return False
+    tables = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+    )]
+    if any(conn.execute(f'SELECT EXISTS (SELECT 1 FROM "{table}")').fetchone()[0] for table in tables):
+        return False
+
+    conn.commit()
+    conn.execute(f"PRAGMA auto_vacuum={AUTO_VACUUM_INCREMENTAL}")
+    conn.execute("VACUUM")
+    return True
+
+
+def apply_migrations(conn: sqlite3.Connection,
+                     migrations: Sequence[Tuple[int, str, Sequence[MigrationStep]]] = None) -> List[int]:
+    """Apply pending migrations in version order and return the versions applied"""
+    migrations = sorted(MIGRATIONS if migrations is None else migrations, key=lambda m: m[0])
+    applied = []
+
+    if get_schema_version(conn) == 0 and _prefer_incremental_vacuum(conn):
+        logger.info("New session store database set to auto_vacuum=INCREMENTAL")
+
+    for version, description, steps in migrations:
+        # BEGIN IMMEDIATE takes the write lock up front, so concurrent
+        # callers serialize here and re-check the version inside it
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if _is_applied(conn, version):
+                conn.rollback()
+                continue
+
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+
+            conn.execute(
+                "INSERT INTO schema_migrations (version, description, applied_at) VALUES (?, ?, ?)",
+                (version, description, datetime.now().isoformat())
+            )
+            conn.commit()
+        except MigrationDeferred as e:
+            conn.rollback()
+            logger.warning(f"Deferred session store migration {version}: {e}")
+            continue
+        except Exception:
+            conn.rollback()
+            raise
+
+        applied.append(version)
+        logger.info(f"Applied session store migration {version}: {description}")
+
+    if applied:
+        conn.execute("PRAGMA optimize")
+    return applied
+
+
+def explain_query_plans(conn: sqlite3.Connection,
+                        probes: Dict[str, Tuple[str, Tuple[Any, ...]]] = None) -> Dict[str, List[str]]:
+    """Run EXPLAIN QUERY PLAN for each probe query"""
+    plans = {}
+    for name, (query, params) in (QUERY_PLAN_PROBES if probes is None else probes).items():
+        try:
+            rows = conn.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+            plans[name] = [row[3] for row in rows]
+        except sqlite3.Error as e:
+            plans[name] = [f"error: {e}"]
+    return plans
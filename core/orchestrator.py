@@ -1,29 +1,82 @@
-    def get_recent_user_history(self, session_id: str) -> List[Dict]:
+    def _context_cache(self):
+        """Get the per-session context cache, fed by session activity events"""
+        cache = self.__dict__.get('_session_context')
+        if cache is None:
+            from core.context_cache import SessionContextCache
+            cache = self._session_context = SessionContextCache(history_limit=5)
+            if self.session_manager:
+                self.session_manager.add_activity_listener(cache.record_activity)
+        return cache
+    
+    async def _load_recent_user_history(self, session_id: str) -> List[Dict]:
+        """Load recent user activity from the database"""
+        return await self.session_manager.get_recent_activity_async(session_id, limit=5)
+    
+    async def get_recent_user_history(self, session_id: str) -> List[Dict]:
         """Get recent user activity for context"""
         if self.session_manager:
-            return self.session_manager.get_recent_activity(session_id, limit=5)
+            return await self._context_cache().recent_history(session_id, self._load_recent_user_history)
         return []
     
-    def get_system_state(self) -> Dict[str, Any]:
-        """Get current system state for context"""
+    async def build_context(self, session_id: str) -> Dict[str, Any]:
+        """Assemble the history, system state and tool context for a request"""
+        cache = self._context_cache()
+        return {
+            "recent_history": await self.get_recent_user_history(session_id),
+            "system_state": cache.timed("system_state", self.get_system_state),
+            "available_tools": cache.timed("available_tools", self.get_available_tools)
+        }
+    
+    def _system_sampler(self):
+        """Get the shared background metrics sampler"""
+        sampler = self.__dict__.get('_metrics_sampler')
+        if sampler is None:
+            from core.system_metrics import acquire_sampler
+            sampler = self._metrics_sampler = acquire_sampler()
+        return sampler
+    
+    def get_system_state(self, window: float = None) -> Dict[str, Any]:
+        """Get current system state for context
+        
+        Served from the latest background sample; pass window (seconds) to
+        also get averages and percentiles over recent samples.
+        """
         try:
-            import psutil
+            sampler = self._system_sampler()
+            snapshot = sampler.latest()
             
-            return {
-                "cpu_percent": psutil.cpu_percent(interval=1),
-                "memory_percent": psutil.virtual_memory().percent,
-                "disk_usage": psutil.disk_usage('/').percent,
-                "active_processes": len(psutil.pids()),
-                "timestamp": datetime.now().isoformat()
+            state = {
+                "cpu_percent": snapshot["cpu_percent"],
+                "memory_percent": snapshot["memory"]["percent"],
+                "disk_usage": snapshot["disk"]["percent"],
+                "active_processes": snapshot["processes"],
+                "timestamp": snapshot["timestamp"]
             }
+            if window:
+                state["window"] = sampler.window(window)
+            return state
         except ImportError:
             return {
                 "status": "system_monitoring_unavailable",
                 "timestamp": datetime.now().isoformat()
             }
     
+    def _tool_registry(self):
+        """Get the tool registry, built from mcp_tools.json on first use"""
+        registry = self.__dict__.get('_tools')
+        if registry is None:
+            from core.tool_registry import ToolRegistry
+            discover = self.mcp_gateway.get_available_tools if self.mcp_gateway else None
+            registry = self.__dict__.setdefault('_tools', ToolRegistry(discover=discover))
+        return registry
+    
     def get_available_tools(self) -> List[Dict]:
         """Get list of available MCP tools"""
+        try:
+            return self._tool_registry().descriptors()
+        except (OSError, ValueError) as e:
+            self.logger.error(f"Tool registry unavailable: {e}")
+        
         if self.mcp_gateway:
             return self.mcp_gateway.get_available_tools()
         
@@ -34,30 +87,115 @@
             {"name": "text_processor", "description": "Text processing", "safety_level": "low"}
         ]
     
-    async def shutdown(self):
-        """Gracefully shutdown orchestrator and all components"""
+    def get_available_tools_versioned(self, etag: str = None, safety_level: str = None) -> Dict[str, Any]:
+        """Get the tool list with its ETag; only not_modified if etag is current"""
+        try:
+            return self._tool_registry().versioned(etag, safety_level)
+        except (OSError, ValueError) as e:
+            self.logger.error(f"Tool registry unavailable: {e}")
+            return {"etag": None, "version": None, "not_modified": False,
+                    "tools": self.get_available_tools()}
+    
+    def get_tool_implementation(self, name: str) -> Any:
+        """Import and return a tool's implementation on first use"""
+        return self._tool_registry().implementation(name)
+    
+    async def _close_component(self, name: str, component) -> Dict[str, Any]:
+        """Close one component, timing it and logging any failure"""
+        import time
+        from core.instrumentation import metrics
+        
+        started = time.perf_counter()
+        try:
+            await component.close()
+            report = {"status": "closed"}
+        except Exception as e:
+            self.logger.error(f"Error closing {name}: {e}")
+            report = {"status": "error", "error": str(e)}
+        elapsed = time.perf_counter() - started
+        metrics.observe("orchestrator_shutdown_seconds", elapsed, component=name)
+        report["seconds"] = round(elapsed, 4)
+        return report
+    
+    async def shutdown(self, timeout: float = 10.0) -> Dict[str, Any]:
+        """Gracefully shutdown orchestrator and all components
+        
+        Components close concurrently; any still running after timeout
+        seconds are cancelled and reported as timed out.
+        """
+        import asyncio
+        import time
+        
         self.logger.info("Shutting down orchestrator...")
+        started = time.perf_counter()
+        report: Dict[str, Any] = {}
         
         try:
-            if self.session_manager:
-                await self.session_manager.close()
-            
-            if self.pattern_engine:
-                await self.pattern_engine.close()
+            components = {
+                "session_manager": self.session_manager,
+                "pattern_engine": self.pattern_engine,
+                "safe_executor": self.safe_executor,
+                "mcp_gateway": self.mcp_gateway,
+                "ai_handler": self.ai_handler
+            }
+            tasks = {
+                name: asyncio.ensure_future(self._close_component(name, component))
+                for name, component in components.items()
+                if component
+            }
             
-            if self.safe_executor:
-                await self.safe_executor.close()
+            if tasks:
+                await asyncio.wait(tasks.values(), timeout=timeout)
             
-            if self.mcp_gateway:
-                await self.mcp_gateway.close()
+            for name, task in tasks.items():
+                if task.done():
+                    report[name] = task.result()
+                else:
+                    task.cancel()
+                    self.logger.error(f"Timed out closing {name} after {timeout}s")
+                    report[name] = {"status": "timeout", "seconds": timeout}
             
-            if self.ai_handler:
-                await self.ai_handler.close()
+            if self.__dict__.pop('_metrics_sampler', None) is not None:
+                from core.system_metrics import release_sampler
+                release_sampler()
             
             self.logger.info("Orchestrator shutdown complete")
             
         except Exception as e:
             self.logger.error(f"Error during shutdown: {e}")
+        
+        return {
+            "components": report,
+            "total_seconds": round(time.perf_counter() - started, 4)
+        }
+    
+    def _profiler(self):
+        """Get the process-wide sampling profiler"""
+        from core.instrumentation import profiler
+        return profiler
+    
+    def get_metrics(self, format: str = "json") -> Any:
+        """Export core metrics as a JSON-ready dict or Prometheus text"""
+        from core.instrumentation import metrics
+        
+        if format == "prometheus":
+            return metrics.to_prometheus()
+        return metrics.to_json()
+    
+    def set_profiling(self, enabled: bool, interval: float = None) -> Dict[str, Any]:
+        """Start or stop the sampling profiler at runtime"""
+        profiler = self._profiler()
+        if enabled:
+            profiler.start(interval=interval)
+            self.logger.info(f"Sampling profiler started ({profiler.interval}s interval)")
+        else:
+            profiler.stop()
+            self.logger.info("Sampling profiler stopped")
+        return {"running": profiler.running, "interval": profiler.interval}
+    
+    def get_profile(self, limit: int = 20) -> Dict[str, Any]:
+        """Get the hottest functions and stacks from the sampling profiler"""
+        return self._profiler().top(limit)
     
     def get_orchestrator_status(self) -> Dict[str, Any]:
         """Get current orchestrator status"""
@@ -71,5 +209,6 @@
                 "ai_handler": self.ai_handler is not None
             },
             "config_loaded": bool(self.config),
+            "profiler_running": self._profiler().running,
             "timestamp": datetime.now().isoformat()
         }
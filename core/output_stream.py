@@ -0,0 +1,210 @@
+"""
+Incremental, bounded capture of subprocess output.
+
+Pipes are read in fixed-size chunks as the process writes them instead of
+being collected by ``process.communicate()``. Each stream keeps only its
+most recent bytes in memory; the full output can optionally spill to a
+temporary file, which is deleted when the capture closes unless the caller
+asks to keep it. Chunks are forwarded to subscribers (for example a
+Flask-SocketIO channel) as they arrive, and a per-command byte cap stops
+runaway output.
+"""
+
+import asyncio
+import codecs
+import logging
+import os
+import tempfile
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+STREAMS = ("stdout", "stderr")
+
+
+class _Tail:
+    """The last ``limit`` bytes written to one stream"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.chunks: "deque[bytes]" = deque()
+        self.size = 0
+        self.total = 0
+        self.dropped = 0
+
+    def append(self, data: bytes):
+        self.total += len(data)
+        self.chunks.append(data)
+        self.size += len(data)
+        while self.size > self.limit:
+            oldest = self.chunks[0]
+            excess = self.size - self.limit
+            if len(oldest) <= excess:
+                self.chunks.popleft()
+                self.size -= len(oldest)
+                self.dropped += len(oldest)
+            else:
+                self.chunks[0] = oldest[excess:]
+                self.size -= excess
+                self.dropped += excess
+
+    def getvalue(self) -> bytes:
+        return b"".join(self.chunks)
+
+
+class CommandOutput:
+    """Bounded stdout/stderr capture for one command"""
+
+    def __init__(self, max_bytes: int = 10 * 1024 * 1024, memory_limit: int = 256 * 1024,
+                 spill_dir: str = None, on_limit: Callable[[], Any] = None,
+                 encoding: str = "utf-8", keep_spill: bool = False):
+        self.max_bytes = max_bytes
+        self.encoding = encoding
+        self.on_limit = on_limit
+        self.keep_spill = keep_spill
+        self.truncated = False
+        self.accepted = 0
+
+        self._tails = {stream: _Tail(memory_limit) for stream in STREAMS}
+        # Chunk boundaries can split a multibyte character; each stream
+        # carries the partial bytes over to its next chunk
+        decoder = codecs.getincrementaldecoder(encoding)
+        self._decoders = {stream: decoder(errors="replace") for stream in STREAMS}
+        self._subscribers: List[Callable] = []
+        self._spill = None
+        if spill_dir is not None:
+            os.makedirs(spill_dir, exist_ok=True)
+            self._spill = tempfile.NamedTemporaryFile(
+                mode="wb", prefix="cmd-", suffix=".log", dir=spill_dir, delete=False
+            )
+
+    @property
+    def spill_path(self) -> Optional[str]:
+        """Path of the spill file, or None if there is none (or it was deleted)"""
+        if self._spill is None or (self._spill.closed and not self.keep_spill):
+            return None
+        return self._spill.name
+
+    def subscribe(self, subscriber: Callable):
+        """Register a callable (sync or async) receiving (stream, text)"""
+        self._subscribers.append(subscriber)
+
+    async def write(self, stream: str, data: bytes):
+        """Record a chunk and forward it to subscribers, enforcing the byte cap"""
+        if self.truncated:
+            return
+
+        room = self.max_bytes - self.accepted
+        if len(data) > room:
+            data = data[:room]
+            self.truncated = True
+
+        if data:
+            self.accepted += len(data)
+            self._tails[stream].append(data)
+            if self._spill is not None:
+                self._spill.write(data)
+            text = self._decoders[stream].decode(data)
+            if text:
+                await self._publish(stream, text)
+
+        if self.truncated:
+            logger.warning(f"Command output exceeded {self.max_bytes} bytes; truncating")
+            if self.on_limit is not None:
+                self.on_limit()
+
+    async def _publish(self, stream: str, text: str):
+        for subscriber in list(self._subscribers):
+            try:
+                result = subscriber(stream, text)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                logger.error(f"Output subscriber failed, unsubscribing: {e}")
+                self._subscribers.remove(subscriber)
+
+    async def pump(self, stream: str, reader: asyncio.StreamReader, chunk_size: int = 64 * 1024):
+        """Copy a pipe into this capture until EOF
+
+        Reading continues past the cap (discarding data) so the writer never
+        blocks on a full pipe.
+        """
+        while True:
+            data = await reader.read(chunk_size)
+            if not data:
+                break
+            await self.write(stream, data)
+        await self.finish(stream)
+
+    async def finish(self, stream: str = None):
+        """Publish any incomplete character left at the end of a stream (or all streams)"""
+        for name in (stream,) if stream else STREAMS:
+            text = self._decoders[name].decode(b"", final=True)
+            if text:
+                await self._publish(name, text)
+
+    def text(self, stream: str) -> str:
+        """Retained tail of a stream as text"""
+        return self._tails[stream].getvalue().decode(self.encoding, errors="replace")
+
+    def close(self):
+        """Close the spill file, deleting it unless keep_spill was set"""
+        if self._spill is not None and not self._spill.closed:
+            self._spill.close()
+            if not self.keep_spill:
+                self._delete_spill()
+
+    def discard(self):
+        """Close the capture and delete the spill file even if it was to be kept"""
+        self.keep_spill = False
+        self.close()
+        self._delete_spill()
+
+    def _delete_spill(self):
+        if self._spill is None:
+            return
+        try:
+            os.unlink(self._spill.name)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not delete spill file {self._spill.name}: {e}")
+
+    def summary(self) -> Dict[str, Any]:
+        """Output text and byte accounting for a command result
+
+        Closes the capture; spill_file is only reported when it was kept,
+        in which case deleting it is up to the caller.
+        """
+        self.close()
+        return {
+            "stdout": self.text("stdout"),
+            "stderr": self.text("stderr"),
+            "output_bytes": {stream: self._tails[stream].total for stream in STREAMS},
+            "output_dropped_from_memory": {stream: self._tails[stream].dropped for stream in STREAMS},
+            "truncated": self.truncated,
+            "spill_file": self.spill_path
+        }
+
+
+class SocketIOEmitter:
+    """Output subscriber that emits chunks on a Flask-SocketIO server
+
+    Only ``emit(event, data, **kwargs)`` is used, so any object with that
+    method works.
+    """
+
+    def __init__(self, socketio, event: str = "command_output", room: str = None,
+                 command_id: str = None):
+        self.socketio = socketio
+        self.event = event
+        self.room = room
+        self.command_id = command_id
+
+    def __call__(self, stream: str, text: str):
+        payload = {"stream": stream, "data": text, "command_id": self.command_id}
+        if self.room is not None:
+            self.socketio.emit(self.event, payload, to=self.room)
+        else:
+            self.socketio.emit(self.event, payload)
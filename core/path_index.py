@@ -0,0 +1,63 @@
+"""
+Pre-resolved index of SafeExecutor's allowed directories.
+
+The allowed roots are expanded and resolved once and stored as a trie of
+path components, so checking a candidate is a single resolve() of the
+candidate followed by a walk down at most ``len(path.parts)`` dict lookups.
+"""
+
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, Sequence
+
+_ROOT_MARKER = ""  # never a real path component
+
+logger = logging.getLogger(__name__)
+
+
+class AllowedDirectoryIndex:
+    """Component trie of resolved allowed directory roots"""
+
+    def __init__(self, allowed_directories: Sequence[str], max_age: float = 30.0):
+        self.source = tuple(allowed_directories)
+        self.max_age = max_age
+        # Relative roots (./workspace) and ~ depend on these; rebuild if they change
+        self.cwd = os.getcwd()
+        self.home = os.environ.get("HOME")
+        self.built_at = time.monotonic()
+
+        self._trie: Dict[str, dict] = {}
+        self.roots = []
+        for allowed_dir in self.source:
+            try:
+                root = Path(os.path.expanduser(allowed_dir)).resolve()
+            except (OSError, RuntimeError) as e:
+                logger.error(f"Cannot resolve allowed directory {allowed_dir}: {e}")
+                continue
+            self.roots.append(root)
+            node = self._trie
+            for part in root.parts:
+                node = node.setdefault(os.path.normcase(part), {})
+            node[_ROOT_MARKER] = {}
+
+    def is_current(self, allowed_directories: Sequence[str]) -> bool:
+        """Check the index still describes these directories in this process state"""
+        return (
+            tuple(allowed_directories) == self.source
+            and time.monotonic() - self.built_at < self.max_age  # allowed roots may be symlinks
+            and os.getcwd() == self.cwd
+            and os.environ.get("HOME") == self.home
+        )
+
+    def contains(self, resolved_path: Path) -> bool:
+        """Check whether a resolved path is an allowed root or inside one"""
+        node = self._trie
+        for part in resolved_path.parts:
+            if _ROOT_MARKER in node:
+                return True
+            node = node.get(os.path.normcase(part))
+            if node is None:
+                return False
+        return _ROOT_MARKER in node
@@ -0,0 +1,190 @@
+"""
+Cached process table for SafeExecutor application control.
+
+Rather than walking every process on each lookup, the index keeps
+pid -> (name, pgid) and inverted name and pgid maps. A refresh lists only
+the current pids and reads details just for pids it has not seen before
+(a pid whose start time changed counts as new), so the cost of keeping the
+index current is proportional to process churn, and a lookup by name or
+group touches only the matching entries.
+
+On Linux the table comes straight from ``/proc``; elsewhere it falls back
+to psutil. Sources are pluggable so the index can be driven by a synthetic
+table in benchmarks.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+_COMM_LENGTH = 15  # the kernel truncates /proc/<pid>/stat names to this
+
+
+class ProcessInfo(NamedTuple):
+    pid: int
+    name: str
+    pgid: int
+    start_time: float
+
+
+class ProcFSSource:
+    """Reads processes from /proc (Linux)"""
+
+    def pids(self) -> Iterable[int]:
+        return [int(entry) for entry in os.listdir("/proc") if entry.isdigit()]
+
+    def read(self, pid: int) -> Optional[ProcessInfo]:
+        try:
+            with open(f"/proc/{pid}/stat", "rb") as f:
+                stat = f.read().decode("utf-8", errors="replace")
+            # comm may itself contain spaces or parentheses
+            head, _, rest = stat.rpartition(")")
+            name = head.partition("(")[2]
+            fields = rest.split()  # state, ppid, pgrp, session, ...
+            pgid, start_time = int(fields[2]), float(fields[19])
+
+            if len(name) >= _COMM_LENGTH:
+                # Recover the full name from argv[0], as psutil does
+                with open(f"/proc/{pid}/cmdline", "rb") as f:
+                    argv0 = f.read().split(b"\0", 1)[0].decode("utf-8", errors="replace")
+                full = os.path.basename(argv0)
+                if full.startswith(name):
+                    name = full
+            return ProcessInfo(pid, name, pgid, start_time)
+        except (OSError, IndexError, ValueError):
+            return None  # exited while we were reading it
+
+
+class PsutilSource:
+    """Reads processes through psutil (macOS, Windows)"""
+
+    def __init__(self):
+        import psutil
+        self.psutil = psutil
+
+    def pids(self) -> Iterable[int]:
+        return self.psutil.pids()
+
+    def read(self, pid: int) -> Optional[ProcessInfo]:
+        try:
+            process = self.psutil.Process(pid)
+            with process.oneshot():
+                name, start_time = process.name(), process.create_time()
+            pgid = os.getpgid(pid) if hasattr(os, "getpgid") else pid
+            return ProcessInfo(pid, name, pgid, start_time)
+        except (self.psutil.Error, OSError):
+            return None
+
+
+def default_source():
+    """The cheapest process source available on this platform"""
+    if os.path.isdir("/proc/self"):
+        return ProcFSSource()
+    return PsutilSource()
+
+
+class ProcessIndex:
+    """Process table indexed by pid, lowercase name and process group"""
+
+    def __init__(self, source=None, max_age: float = 2.0):
+        self.source = source or default_source()
+        self.max_age = max_age
+        self.refreshed_at = float("-inf")
+
+        self._by_pid: Dict[int, ProcessInfo] = {}
+        self._by_name: Dict[str, Set[int]] = {}
+        self._by_pgid: Dict[int, Set[int]] = {}
+        self._lock = threading.Lock()
+        self._stats = {"refreshes": 0, "added": 0, "removed": 0}
+
+    def _add(self, info: ProcessInfo):
+        self._by_pid[info.pid] = info
+        self._by_name.setdefault(info.name.lower(), set()).add(info.pid)
+        self._by_pgid.setdefault(info.pgid, set()).add(info.pid)
+
+    def _remove(self, pid: int):
+        info = self._by_pid.pop(pid)
+        for index, key in ((self._by_name, info.name.lower()), (self._by_pgid, info.pgid)):
+            members = index.get(key)
+            if members is not None:
+                members.discard(pid)
+                if not members:
+                    del index[key]
+
+    def refresh(self, force: bool = False):
+        """Bring the index up to date with the process table
+
+        Skipped when the last refresh is younger than max_age, unless forced.
+        """
+        with self._lock:
+            if not force and time.monotonic() - self.refreshed_at < self.max_age:
+                return
+
+            current = set(self.source.pids())
+            for pid in self._by_pid.keys() - current:
+                self._remove(pid)
+                self._stats["removed"] += 1
+
+            for pid in current - self._by_pid.keys():
+                info = self.source.read(pid)
+                if info is not None:
+                    self._add(info)
+                    self._stats["added"] += 1
+
+            self.refreshed_at = time.monotonic()
+            self._stats["refreshes"] += 1
+
+    def _verify(self, pids: Iterable[int]) -> List[ProcessInfo]:
+        """Re-read candidate processes, dropping any that exited or were replaced"""
+        matches = []
+        with self._lock:
+            for pid in sorted(pids):
+                cached = self._by_pid.get(pid)
+                if cached is None:
+                    continue
+                info = self.source.read(pid)
+                if info is None or info.start_time != cached.start_time:
+                    self._remove(pid)  # stale; the next refresh picks up any new process
+                    self._stats["removed"] += 1
+                    continue
+                if info != cached:  # exec() changed its name or it moved group
+                    self._remove(pid)
+                    self._add(info)
+                matches.append(info)
+        return matches
+
+    def find_by_name(self, name: str, exact: bool = False) -> List[ProcessInfo]:
+        """Processes whose name equals (or, by default, contains) name, case-insensitively"""
+        self.refresh()
+        needle = name.lower()
+        with self._lock:
+            if exact:
+                pids = set(self._by_name.get(needle, ()))
+            else:
+                # Scans distinct names only, far fewer than processes
+                pids = set()
+                for process_name, members in self._by_name.items():
+                    if needle in process_name:
+                        pids |= members
+        return [info for info in self._verify(pids) if needle in info.name.lower()]
+
+    def group_members(self, pgid: int) -> List[ProcessInfo]:
+        """Processes in a process group"""
+        self.refresh()
+        with self._lock:
+            pids = set(self._by_pgid.get(pgid, ()))
+        return [info for info in self._verify(pids) if info.pgid == pgid]
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get index size and refresh counters"""
+        with self._lock:
+            return {
+                "processes": len(self._by_pid),
+                "names": len(self._by_name),
+                "groups": len(self._by_pgid),
+                **self._stats
+            }
@@ -0,0 +1,79 @@
+"""
+Lightweight row types and keyset cursors for session store queries.
+
+Rows come back as named tuples rather than per-row dicts: attribute and
+index access without a hash table per row, and ``_asdict()`` when a caller
+does need a dict (e.g. for JSON responses).
+"""
+
+import base64
+import json
+from collections import namedtuple
+from functools import lru_cache
+from typing import Any, NamedTuple, Optional, Sequence, Tuple
+
+
+class TaskRecord(NamedTuple):
+    """One row of the tasks table"""
+    id: str
+    session_id: str
+    title: str
+    description: Optional[str]
+    priority: Optional[str]
+    status: str
+    due_date: Optional[str]
+    created_at: str
+    completed_at: Optional[str]
+    automation_pattern: Optional[str]
+
+
+TASK_COLUMNS = TaskRecord._fields
+
+
+@lru_cache(maxsize=32)
+def record_type(columns: Tuple[str, ...], name: str = "ActivityRecord"):
+    """Named tuple type for a result column set, built once per shape"""
+    return namedtuple(name, columns, rename=True)
+
+
+def encode_cursor(position: Sequence[Any]) -> str:
+    """Turn the sort key of the last row on a page into an opaque cursor"""
+    raw = json.dumps(list(position), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, ...]:
+    """Inverse of encode_cursor"""
+    try:
+        return tuple(json.loads(base64.urlsafe_b64decode(cursor.encode("ascii"))))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid page cursor: {cursor!r}") from e
+
+
+def keyset_before(column: str, tiebreak: str, position: Sequence[Any]) -> Tuple[str, list]:
+    """WHERE clause for rows after position in ``column DESC, tiebreak DESC`` order
+
+    SQLite sorts NULL below every other value, so rows with a NULL sort key
+    come last; a row-value comparison against NULL is never true, so they
+    are matched explicitly.
+    """
+    value, last = position
+    if value is None:
+        return f"({column} IS NULL AND {tiebreak} < ?)", [last]
+    return f"(({column}, {tiebreak}) < (?, ?) OR {column} IS NULL)", [value, last]
+
+
+def desc_key(value: Any, tiebreak: Any) -> Tuple[Any, ...]:
+    """Python sort key matching ``ORDER BY value DESC, tiebreak DESC`` with reverse=True"""
+    return (value is not None, value if value is not None else "", tiebreak)
+
+
+class PageError(RuntimeError):
+    """A page fetched while iterating came back with an error"""
+
+
+def check_page(page: dict) -> dict:
+    """Raise PageError if a page dict carries an error, so iterators don't stop silently"""
+    if "error" in page:
+        raise PageError(page["error"])
+    return page
@@ -0,0 +1,271 @@
+"""
+Chunked retention engine for the session store.
+
+Old rows are pruned per table policy in bounded chunks. Each chunk is its own
+short write transaction, and the engine pauses briefly between chunks so other
+writers can take the lock; ``run_async`` submits every chunk as a separate
+database job and awaits the pause on the event loop, so the database thread
+serves other calls in between. Pruned rows can be archived as part of the
+chunk's transaction, either to gzip-compressed, date-partitioned JSON Lines
+files or to columnar segments (see core.columnar); if the delete fails the
+archive write is undone, so a retried chunk is archived once. Freed pages
+are returned to the filesystem with incremental vacuum.
+"""
+
+import asyncio
+import gzip
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Generator, List, Optional, Sequence, Tuple
+
+# PRAGMA auto_vacuum value for INCREMENTAL
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """Which rows of a table expire, and when"""
+    table: str
+    time_column: str
+    condition: str = ""     # extra SQL predicate rows must also match
+    keep_days: Optional[int] = None  # overrides the run-wide retention period
+    archive: bool = True    # archive pruned rows when an archive directory is set
+
+
+DEFAULT_POLICIES = (
+    RetentionPolicy("activity_logs", "timestamp"),
+    # Manual notes are kept longer; only generated notes expire
+    RetentionPolicy("session_notes", "timestamp", "note_type != 'manual'"),
+    RetentionPolicy("tasks", "completed_at", "status = 'completed'"),
+)
+
+
+class RetentionEngine:
+    """Deletes expired rows in bounded chunks and reports lock wait and hold time"""
+
+    def __init__(self, connection_factory: Callable,
+                 policies: Sequence[RetentionPolicy] = DEFAULT_POLICIES,
+                 chunk_size: int = 1000, pause: float = 0.01,
+                 archive_dir: Optional[str] = None, vacuum_pages: int = 2000,
+                 archive_format: str = "jsonl"):
+        if archive_format not in ("jsonl", "columnar"):
+            raise ValueError(f"Unknown archive format: {archive_format}")
+        self.connection_factory = connection_factory
+        self.policies = tuple(policies)
+        self.chunk_size = max(1, chunk_size)
+        self.pause = pause
+        self.archive_dir = archive_dir
+        self.vacuum_pages = vacuum_pages
+        self.archive_format = archive_format
+        self.logger = logging.getLogger(__name__)
+
+    def run(self, days: int = 30) -> Dict[str, Any]:
+        """Apply every policy and return a throughput and locking report"""
+        steps = self.steps(days)
+        while True:
+            done, report = _advance(steps)
+            if done:
+                return report
+            if self.pause:
+                time.sleep(self.pause)  # let other writers in between chunks
+
+    async def run_async(self, days: int, run_db: Callable) -> Dict[str, Any]:
+        """run() with each chunk submitted through ``run_db`` and the pauses awaited"""
+        steps = self.steps(days)
+        while True:
+            done, report = await run_db(_advance, steps)
+            if done:
+                return report
+            if self.pause:
+                await asyncio.sleep(self.pause)
+
+    def steps(self, days: int = 30) -> Generator[None, None, Dict[str, Any]]:
+        """Apply every policy, yielding after each chunk; returns the report"""
+        started = time.perf_counter()
+        now = datetime.now()
+        tables = {}
+
+        for policy in self.policies:
+            keep_days = policy.keep_days if policy.keep_days is not None else days
+            tables[policy.table] = yield from self._prune(policy, (now - timedelta(days=keep_days)).isoformat())
+
+        vacuum = self.incremental_vacuum()
+        duration = time.perf_counter() - started
+        deleted = sum(t["deleted"] for t in tables.values())
+
+        return {
+            "tables": tables,
+            "rows_deleted": deleted,
+            "duration_seconds": duration,
+            "rows_per_second": deleted / duration if duration > 0 else 0.0,
+            "max_lock_hold_ms": max((t["max_lock_hold_ms"] for t in tables.values()), default=0.0),
+            "total_lock_hold_ms": sum(t["total_lock_hold_ms"] for t in tables.values()),
+            "max_lock_wait_ms": max((t["max_lock_wait_ms"] for t in tables.values()), default=0.0),
+            "total_lock_wait_ms": sum(t["total_lock_wait_ms"] for t in tables.values()),
+            "vacuum": vacuum
+        }
+
+    def _prune(self, policy: RetentionPolicy, cutoff: str) -> Generator[None, None, Dict[str, Any]]:
+        """Delete one policy's expired rows chunk by chunk, yielding between chunks"""
+        where = f"{policy.time_column} < ?"
+        if policy.condition:
+            where += f" AND ({policy.condition})"
+        archive = bool(self.archive_dir and policy.archive)
+
+        stats = {"cutoff": cutoff, "deleted": 0, "archived": 0, "chunks": 0,
+                 "max_lock_hold_ms": 0.0, "total_lock_hold_ms": 0.0,
+                 "max_lock_wait_ms": 0.0, "total_lock_wait_ms": 0.0}
+        writer = None
+
+        while True:
+            with self.connection_factory() as conn:
+                # Time spent waiting for other writers is reported apart from the hold
+                wait_started = time.perf_counter()
+                conn.execute("BEGIN IMMEDIATE")
+                lock_started = time.perf_counter()
+                waited_ms = (lock_started - wait_started) * 1000
+                undo = None
+                try:
+                    if archive:
+                        # Archived under the write lock, so the rows archived are exactly the rows deleted
+                        cursor = conn.execute(
+                            f"SELECT rowid AS _rowid, * FROM {policy.table} WHERE {where} LIMIT ?",
+                            (cutoff, self.chunk_size)
+                        )
+                        columns = [d[0] for d in cursor.description]
+                        rows = cursor.fetchall()
+                        if not rows:
+                            conn.rollback()
+                            break
+                        if self.archive_format == "columnar":
+                            writer = writer or self._open_segment(policy, conn)
+                            undo = self._archive_columnar(writer, rows)
+                        else:
+                            undo = self._archive(policy, columns, rows)
+                        rowids = [row[0] for row in rows]
+                        statement = (f"DELETE FROM {policy.table} WHERE rowid IN "
+                                     f"({', '.join('?' for _ in rowids)})")
+                        params = tuple(rowids)
+                    else:
+                        statement = (f"DELETE FROM {policy.table} WHERE rowid IN "
+                                     f"(SELECT rowid FROM {policy.table} WHERE {where} LIMIT ?)")
+                        params = (cutoff, self.chunk_size)
+
+                    deleted = conn.execute(statement, params).rowcount
+                    conn.commit()
+                except BaseException:
+                    conn.rollback()
+                    if undo is not None:
+                        undo()  # the rows stay in the table, so take them back out of the archive
+                    raise
+                held_ms = (time.perf_counter() - lock_started) * 1000
+
+            stats["chunks"] += 1
+            stats["deleted"] += deleted
+            if archive:
+                stats["archived"] += deleted
+            stats["total_lock_hold_ms"] += held_ms
+            stats["max_lock_hold_ms"] = max(stats["max_lock_hold_ms"], held_ms)
+            stats["total_lock_wait_ms"] += waited_ms
+            stats["max_lock_wait_ms"] = max(stats["max_lock_wait_ms"], waited_ms)
+
+            if deleted < self.chunk_size and not archive:
+                break
+            yield
+
+        if writer is not None:
+            stats["archive_segment"] = writer.path
+            writer.close()
+
+        return stats
+
+    def _open_segment(self, policy: RetentionPolicy, conn):
+        """Start this run's columnar archive segment for a policy's table"""
+        from core.columnar import ColumnarWriter, column_kinds
+
+        path = os.path.join(self.archive_dir, policy.table, datetime.now().strftime("%Y%m%dT%H%M%S%f"))
+        return ColumnarWriter(path, policy.table, column_kinds(conn, policy.table), policy.time_column)
+
+    @staticmethod
+    def _archive_columnar(writer, rows: List[tuple]) -> Callable[[], None]:
+        """Append rows to a columnar segment; returns a callable undoing the append"""
+        checkpoint = writer.checkpoint()
+        writer.append(row[1:] for row in rows)
+        writer.flush()  # durable before the rows are deleted
+        return lambda: writer.rollback(checkpoint)
+
+    def _archive(self, policy: RetentionPolicy, columns: List[str], rows: List[tuple]) -> Callable[[], None]:
+        """Append rows to per-day gzip JSON Lines files; returns a callable undoing the append"""
+        table_dir = os.path.join(self.archive_dir, policy.table)
+        os.makedirs(table_dir, exist_ok=True)
+        time_index = columns.index(policy.time_column)
+
+        partitions: Dict[str, List[str]] = {}
+        for row in rows:
+            stamp = row[time_index]
+            day = stamp[:10] if isinstance(stamp, str) and len(stamp) >= 10 else "undated"
+            record = dict(zip(columns[1:], row[1:]))
+            partitions.setdefault(day, []).append(json.dumps(record, default=str))
+
+        sizes: List[Tuple[str, Optional[int]]] = []
+
+        def undo():
+            # Each append is a separate gzip member, so cutting back to the old size drops it whole
+            for path, size in sizes:
+                if size is None:
+                    os.remove(path)
+                else:
+                    os.truncate(path, size)
+
+        try:
+            for day, lines in partitions.items():
+                path = os.path.join(table_dir, f"{day}.jsonl.gz")
+                sizes.append((path, os.path.getsize(path) if os.path.exists(path) else None))
+                # Appending creates a new gzip member; gzip.open reads them back as one stream
+                with gzip.open(path, "at", encoding="utf-8") as f:
+                    f.write("\n".join(lines) + "\n")
+        except BaseException:
+            undo()
+            raise
+        return undo
+
+    def incremental_vacuum(self) -> Dict[str, Any]:
+        """Return free pages to the filesystem if incremental vacuum is enabled"""
+        with self.connection_factory() as conn:
+            mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+            free_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if mode != AUTO_VACUUM_INCREMENTAL:
+                return {"enabled": False, "free_pages": free_before}
+
+            # executescript steps the pragma to completion; execute() frees a single page
+            conn.executescript(f"PRAGMA incremental_vacuum({int(self.vacuum_pages)});")
+            free_after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            return {"enabled": True, "pages_released": free_before - free_after, "free_pages": free_after}
+
+    def enable_incremental_vacuum(self) -> bool:
+        """Switch the database to auto_vacuum=INCREMENTAL
+
+        Existing databases need a full VACUUM for the mode to take effect,
+        which rewrites the file and holds an exclusive lock, so this is a
+        one-off maintenance step rather than part of ``run``.
+        """
+        with self.connection_factory() as conn:
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == AUTO_VACUUM_INCREMENTAL:
+                return False
+            conn.execute(f"PRAGMA auto_vacuum={AUTO_VACUUM_INCREMENTAL}")
+            conn.commit()
+            conn.execute("VACUUM")
+            return True
+
+
+def _advance(steps: Generator) -> Tuple[bool, Any]:
+    """Run a step generator to its next yield: (False, None), or (True, result) when it is done"""
+    try:
+        next(steps)
+        return False, None
+    except StopIteration as done:
+        return True, done.value
@@ -74,121 +74,161 @@
         except Exception as e:
             return {"error": f"Application control failed: {str(e)}", "app": app_name}
     
-    def is_command_safe(self, command: str, safety_level: str) -> Dict[str, Any]:
-        """Validate command safety based on level and rules"""
+    def _safety_engine(self):
+        """Get the safety rules compiled for the current configuration
         
-        command_lower = command.lower().strip()
+        Recompiled whenever safety_rules or blocked_commands is replaced or
+        edited in place, or taken from the rules file watcher once reloading
+        is enabled.
+        """
+        loader = self.__dict__.get('_rules_loader')
+        if loader is not None:
+            engine = loader.current(self.blocked_commands)
+            if engine is not self.__dict__.get('_compiled_rules'):
+                self._compiled_rules = engine
+                self.safety_rules = engine.safety_rules
+            return engine
         
-        # Check for empty command
-        if not command_lower:
-            return {"safe": False, "reason": "Empty command"}
+        engine = self.__dict__.get('_compiled_rules')
+        if engine is None or not engine.built_from(self.safety_rules, self.blocked_commands):
+            from core.safety_rules import CompiledSafetyRules
+            engine = self._compiled_rules = CompiledSafetyRules(self.safety_rules, self.blocked_commands)
+        return engine
+    
+    def enable_safety_rules_reload(self, path: str = "config/safety_rules.json",
+                                   check_interval: float = 2.0) -> Dict[str, Any]:
+        """Watch the safety rules file and apply edits without a restart"""
+        from core.safety_rules import SafetyRulesLoader
         
-        # Check blacklisted patterns from safety rules
-        blacklist_patterns = self.safety_rules.get("command_validation", {}).get("blacklist_patterns", [])
-        for pattern in blacklist_patterns:
-            try:
-                if re.search(pattern, command_lower):
-                    return {
-                        "safe": False,
-                        "reason": f"Command contains blocked pattern: {pattern}"
-                    }
-            except re.error:
-                # If regex pattern is invalid, treat as literal string
-                if pattern.lower() in command_lower:
-                    return {
-                        "safe": False,
-                        "reason": f"Command contains blocked pattern: {pattern}"
-                    }
+        loader = SafetyRulesLoader(path, check_interval=check_interval)
+        try:
+            loader.current(self.blocked_commands)
+        except (OSError, ValueError) as e:
+            self.logger.error(f"Safety rules reload not enabled: {e}")
+            return {"error": str(e)}
         
-        # Check explicitly blocked commands
-        for blocked in self.blocked_commands:
-            if blocked.lower() in command_lower:
-                return {
-                    "safe": False,
-                    "reason": f"Command contains blocked term: {blocked}"
+        self._rules_loader = loader
+        self._safety_engine()
+        return loader.get_status()
+    
+    def _verdict_cache(self, name: str):
+        """Get the LRU verdict cache for command or path checks"""
+        caches = self.__dict__.get('_verdict_caches')
+        if caches is None:
+            from core.verdict_cache import VerdictCache
+            caches = self.__dict__.setdefault('_verdict_caches', {
+                "commands": VerdictCache(maxsize=2048),
+                # Path verdicts depend on symlinks on disk, so they expire quickly
+                "paths": VerdictCache(maxsize=2048, ttl=5.0)
+            })
+        return caches[name]
+    
+    def _instruments(self) -> Dict[str, Any]:
+        """Get the safety check latency series, resolved once, by kind and verdict"""
+        instruments = self.__dict__.get('_metric_series')
+        if instruments is None:
+            from core.instrumentation import metrics
+            instruments = self._metric_series = {
+                kind: {
+                    safe: metrics.histogram("executor_safety_check_seconds", kind=kind, safe=safe)
+                    for safe in (True, False)
                 }
+                for kind in ("command", "path")
+            }
+        return instruments
+    
+    def is_command_safe(self, command: str, safety_level: str, cwd: str = None) -> Dict[str, Any]:
+        """Validate command safety based on level and rules
         
-        # Check dangerous paths
-        dangerous_paths = self.safety_rules.get("command_validation", {}).get("dangerous_paths", [])
-        for path in dangerous_paths:
-            if path in command:
-                return {
-                    "safe": False,
-                    "reason": f"Command references dangerous path: {path}"
-                }
+        Relative paths in the command are resolved against cwd, the safe
+        working directory unless given.
+        """
+        from core.verdict_cache import MISSING
         
-        # Safety level specific checks
-        if safety_level == "low":
-            # Very restrictive - only basic safe commands
-            safe_prefixes = self.safety_rules.get("command_validation", {}).get("safe_command_prefixes", {}).get("low_risk", [])
-            if not any(command_lower.startswith(prefix) for prefix in safe_prefixes):
-                return {
-                    "safe": False,
-                    "reason": f"Command not allowed at safety level 'low': {command}"
-                }
-                
-        elif safety_level == "medium":
-            # Allow file operations and common dev tools
-            medium_risk_patterns = ["rm -rf", "sudo", "chmod 777", "curl |", "wget |"]
-            for pattern in medium_risk_patterns:
-                if pattern in command_lower:
-                    return {
-                        "safe": False,
-                        "reason": f"Command contains medium-risk pattern not allowed: {pattern}"
-                    }
-                    
-        elif safety_level == "high":
-            # Allow most commands except explicitly blocked
-            # Already checked blocked patterns above
-            pass
-        else:
-            return {
-                "safe": False,
-                "reason": f"Unknown safety level: {safety_level}"
-            }
+        series = self._instruments()["command"]
+        started = series[True].clock()
         
-        return {
-            "safe": True,
-            "reason": "Command passed safety validation",
-            "safety_level": safety_level
-        }
-    
+        engine = self._safety_engine()
+        cache = self._verdict_cache("commands")
+        cwd = cwd or self.get_safe_working_directory()
+        key = (command, safety_level, cwd, os.environ.get("HOME"))
+        
+        # Keyed on the exact command: the 'low' rejection reason echoes it back
+        verdict = cache.get(key, engine.fingerprint)
+        if verdict is MISSING:
+            verdict = engine.check(command, safety_level, cwd)
+            cache.put(key, engine.fingerprint, verdict)
+        
+        series[verdict["safe"]].observe(series[True].clock() - started)
+        return dict(verdict)
+
+    def validate_commands(self, commands: List[str], safety_level: str, cwd: str = None) -> List[Dict[str, Any]]:
+        """Validate many commands in one call, one verdict per command in order"""
+        from core.verdict_cache import MISSING
+
+        series = self._instruments()["command"]
+        engine = self._safety_engine()
+        cache = self._verdict_cache("commands")
+        cwd = cwd or self.get_safe_working_directory()
+        home = os.environ.get("HOME")
+
+        # Repeated commands in the batch are checked once
+        verdicts = {}
+        for command in commands:
+            if command in verdicts:
+                continue
+            started = series[True].clock()
+            key = (command, safety_level, cwd, home)
+            verdict = cache.get(key, engine.fingerprint)
+            if verdict is MISSING:
+                verdict = engine.check(command, safety_level, cwd)
+                cache.put(key, engine.fingerprint, verdict)
+            verdicts[command] = verdict
+            series[verdict["safe"]].observe(series[True].clock() - started)
+
+        return [dict(verdicts[command]) for command in commands]
+
     def validate_file_path(self, path: str) -> Optional[Path]:
         """Validate file path is within allowed directories"""
+        from core.verdict_cache import MISSING
         
         if not path:
             return None
         
+        series = self._instruments()["path"]
+        started = series[True].clock()
+        
+        # Relative and ~ paths resolve differently per working and home directory
+        cache = self._verdict_cache("paths")
+        key = (path, os.getcwd(), os.environ.get("HOME"))
+        stamp = tuple(self.allowed_directories)
+        
+        safe_path = cache.get(key, stamp)
+        if safe_path is MISSING:
+            safe_path = self._resolve_allowed_path(path)
+            cache.put(key, stamp, safe_path)
+        
+        series[safe_path is not None].observe(series[True].clock() - started)
+        return safe_path
+    
+    def _allowed_index(self):
+        """Get the allowed directories resolved into a prefix index"""
+        index = self.__dict__.get('_allowed_dir_index')
+        if index is None or not index.is_current(self.allowed_directories):
+            from core.path_index import AllowedDirectoryIndex
+            index = self._allowed_dir_index = AllowedDirectoryIndex(self.allowed_directories)
+        return index
+    
+    def _resolve_allowed_path(self, path: str) -> Optional[Path]:
+        """Resolve a path and check it against the allowed directories"""
+        
         try:
-            # Expand user home directory
-            expanded_path = os.path.expanduser(path)
-            safe_path = Path(expanded_path).resolve()
+            # Expand user home directory; resolve() always yields an absolute path
+            safe_path = Path(os.path.expanduser(path)).resolve()
             
             # Check if path is within allowed directories
-            for allowed_dir in self.allowed_directories:
-                allowed_path = Path(os.path.expanduser(allowed_dir)).resolve()
-                try:
-                    safe_path.relative_to(allowed_path)
-                    return safe_path
-                except ValueError:
-                    continue
-            
-            # If no allowed directory matched, check if it's a relative path within current working directory
-            try:
-                cwd = Path.cwd()
-                if not safe_path.is_absolute():
-                    safe_path = (cwd / safe_path).resolve()
-                
-                # Check if the resolved path is within any allowed directory
-                for allowed_dir in self.allowed_directories:
-                    allowed_path = Path(os.path.expanduser(allowed_dir)).resolve()
-                    try:
-                        safe_path.relative_to(allowed_path)
-                        return safe_path
-                    except ValueError:
-                        continue
-            except Exception:
-                pass
+            if self._allowed_index().contains(safe_path):
+                return safe_path
             
             return None
             
@@ -199,28 +239,7 @@
     def is_file_extension_allowed(self, path: Path) -> bool:
         """Check if file extension is allowed"""
         
-        file_rules = self.safety_rules.get("file_operation_rules", {})
-        
-        # Check blocked extensions first
-        blocked_extensions = file_rules.get("blocked_extensions", [])
-        if path.suffix.lower() in [ext.lower() for ext in blocked_extensions]:
-            return False
-        
-        # Check allowed extensions
-        allowed_extensions = file_rules.get("allowed_extensions", [])
-        if allowed_extensions:
-            return path.suffix.lower() in [ext.lower() for ext in allowed_extensions]
-        
-        # If no specific allowed extensions defined, allow most text-based extensions
-        default_allowed = [
-            '.txt', '.md', '.json', '.yaml', '.yml', '.xml', '.csv',
-            '.js', '.ts', '.jsx', '.tsx', '.py', '.java', '.go', '.rs',
-            '.html', '.css', '.scss', '.sass', '.less',
-            '.sh', '.bash', '.zsh', '.fish',
-            '.sql', '.log', '.conf', '.config', '.ini', '.toml'
-        ]
-        
-        return path.suffix.lower() in default_allowed or path.suffix == ''
+        return self._safety_engine().is_extension_allowed(path)
     
     def get_safe_working_directory(self) -> str:
         """Get safe working directory for command execution"""
@@ -239,63 +258,366 @@
         # Last resort - current working directory
         return os.getcwd()
     
-    async def kill_running_processes(self):
-        """Kill all running processes managed by this executor"""
+    def _execution_scheduler(self):
+        """Get the admission scheduler sized from the execution limits
         
-        killed_processes = []
+        The limits are re-read whenever the safety rules change, including
+        hot reloads of the rules file.
+        """
+        engine = self._safety_engine()
+        scheduler = self.__dict__.get('_scheduler')
+        if scheduler is None:
+            from core.scheduler import ExecutionScheduler
+            scheduler = self.__dict__.setdefault('_scheduler', ExecutionScheduler())
+        
+        if self.__dict__.get('_scheduler_engine') is not engine:
+            limits = engine.safety_rules.get("execution_limits", {})
+            scheduler.configure(
+                max_concurrent=limits.get("max_concurrent_processes", 5),
+                per_session_limit=limits.get("max_processes_per_session", 2),
+                max_queue_depth=limits.get("max_queued_commands", 50)
+            )
+            self._scheduler_engine = engine
+        return scheduler
+    
+    async def run_scheduled(self, session_id: str, execute, *args, priority: int = 0, **kwargs) -> Any:
+        """Run an execution coroutine function once the scheduler grants a slot"""
+        from core.scheduler import SchedulerFullError
+        
+        try:
+            async with self._execution_scheduler().slot(session_id, priority):
+                return await execute(*args, **kwargs)
+        except SchedulerFullError as e:
+            self.logger.warning(f"Rejected command for session {session_id}: {e}")
+            return {"error": str(e), "retryable": True}
+    
+    async def execute_command_streaming(self, command: str, session_id: str = "default",
+                                        safety_level: str = "medium", working_directory: str = None,
+                                        subscribers: List = None, max_output_bytes: int = None,
+                                        spill_dir: str = None, timeout: float = None,
+                                        priority: int = 0, in_process: bool = False,
+                                        keep_spill: bool = False) -> Dict[str, Any]:
+        """Execute a command, streaming its output to subscribers as it arrives
+        
+        Only the tail of each stream is kept in memory (the full output can
+        spill to a file under spill_dir, deleted once the command finishes
+        unless keep_spill is set, in which case the caller deletes the
+        returned spill_file), and the process is killed once it writes more
+        than max_output_bytes. With in_process, plain read-only
+        commands (ls, cat, head, tail, grep, echo, pwd) are served without
+        spawning a process; anything else still runs as one.
+        """
         
-        for process_id, process in list(self.running_processes.items()):
+        if working_directory:
+            cwd = self.validate_file_path(working_directory)
+            if cwd is None or not cwd.is_dir():
+                return {"error": f"Working directory not allowed: {working_directory}", "command": command}
+        else:
+            cwd = self.get_safe_working_directory()
+        
+        safety_check = self.is_command_safe(command, safety_level, str(cwd))
+        if not safety_check["safe"]:
+            return {"error": safety_check["reason"], "command": command}
+        
+        if in_process:
+            from core.command_parser import parse_command
+            from core.inprocess_commands import CommandContext, PathNotAllowedError, prepare
+            
+            context = CommandContext(str(cwd), self.validate_file_path, self.is_file_extension_allowed)
             try:
-                if process.returncode is None:  # Process still running
-                    if os.name != 'nt':
-                        os.killpg(os.getpgid(process.pid), signal.SIGTERM)
-                    else:
-                        process.terminate()
-                    
-                    killed_processes.append(process_id)
+                prepared = prepare(parse_command(command), context)
+            except PathNotAllowedError as e:
+                return {"error": str(e), "command": command}
+            if prepared is not None:
+                return await self.run_scheduled(
+                    session_id, self._run_in_process, command, prepared,
+                    subscribers or [], max_output_bytes, spill_dir, keep_spill, timeout,
+                    priority=priority
+                )
+        
+        try:
+            import shlex
+            args = shlex.split(command)
+        except ValueError as e:
+            return {"error": f"Could not parse command: {e}", "command": command}
+        
+        return await self.run_scheduled(
+            session_id, self._stream_process, command, args, str(cwd),
+            subscribers or [], max_output_bytes, spill_dir, keep_spill, timeout,
+            priority=priority
+        )
+    
+    async def _stream_process(self, command: str, args: List[str], cwd: str, subscribers: List,
+                              max_output_bytes: int, spill_dir: str, keep_spill: bool,
+                              timeout: float) -> Dict[str, Any]:
+        """Spawn a command and pump its pipes into a bounded capture"""
+        from core.instrumentation import metrics, timed
+        from core.output_stream import CommandOutput
+        
+        limits = self.safety_rules.get("execution_limits", {})
+        timeout = timeout or self.max_execution_time
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        
+        try:
+            with timed("executor_spawn_seconds"):
+                process = await asyncio.create_subprocess_exec(
+                    *args,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    cwd=cwd,
+                    start_new_session=os.name != 'nt'
+                )
+        except (OSError, ValueError) as e:
+            metrics.inc("executor_commands_total", outcome="spawn_failed")
+            return {"error": f"Failed to start command: {e}", "command": command}
+        
+        process_id = f"cmd_{process.pid}"
+        self.running_processes[process_id] = process
+        if os.name != 'nt':
+            # Its own session, so its group id is its pid; no getpgid() needed later
+            self.__dict__.setdefault('_process_pgids', {})[process.pid] = process.pid
+        
+        output = CommandOutput(
+            max_bytes=max_output_bytes or limits.get("max_output_bytes", 10 * 1024 * 1024),
+            spill_dir=spill_dir,
+            keep_spill=keep_spill,
+            on_limit=lambda: self._signal_process(process, signal.SIGKILL)
+        )
+        for subscriber in subscribers:
+            output.subscribe(subscriber)
+        
+        timed_out = False
+        pumps = asyncio.gather(
+            output.pump("stdout", process.stdout),
+            output.pump("stderr", process.stderr),
+            process.wait()
+        )
+        try:
+            await asyncio.wait_for(pumps, timeout=timeout)
+        except asyncio.TimeoutError:
+            timed_out = True
+            self._signal_process(process, signal.SIGKILL)
+            await process.wait()
+        except asyncio.CancelledError:
+            # Reap the killed process so it doesn't linger as a zombie; the
+            # caller never sees a result, so nobody else will delete the spill
+            self._signal_process(process, signal.SIGKILL)
+            output.discard()
+            await asyncio.shield(process.wait())
+            if pumps.done() and not pumps.cancelled():
+                pumps.exception()  # the pumps' own CancelledError; already handled here
+            raise
+        finally:
+            if process.returncode is None:
+                self._signal_process(process, signal.SIGKILL)
+            output.close()
+            self.running_processes.pop(process_id, None)
+            self.__dict__.get('_process_pgids', {}).pop(process.pid, None)
+        
+        result = {
+            "success": process.returncode == 0 and not timed_out and not output.truncated,
+            "command": command,
+            "return_code": process.returncode,
+            "execution_time": loop.time() - started,
+            "timed_out": timed_out,
+            **output.summary()
+        }
+        if timed_out:
+            result["error"] = f"Command timed out after {timeout}s"
+        elif output.truncated:
+            result["error"] = f"Command output exceeded {output.max_bytes} bytes"
+        
+        outcome = ("timeout" if timed_out else "truncated" if output.truncated
+                   else "success" if result["success"] else "failed")
+        metrics.inc("executor_commands_total", outcome=outcome)
+        metrics.observe("executor_command_seconds", result["execution_time"])
+        return result
+    
+    async def _run_in_process(self, command: str, prepared, subscribers: List, max_output_bytes: int,
+                              spill_dir: str, keep_spill: bool, timeout: float) -> Dict[str, Any]:
+        """Run a command prepared by core.inprocess_commands into a bounded capture"""
+        from core.inprocess_commands import run_prepared
+        from core.instrumentation import metrics
+        from core.output_stream import CommandOutput
+        
+        limits = self.safety_rules.get("execution_limits", {})
+        timeout = timeout or self.max_execution_time
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        
+        output = CommandOutput(
+            max_bytes=max_output_bytes or limits.get("max_output_bytes", 10 * 1024 * 1024),
+            spill_dir=spill_dir,
+            keep_spill=keep_spill
+        )
+        for subscriber in subscribers:
+            output.subscribe(subscriber)
+        
+        timed_out = False
+        return_code = None
+        try:
+            return_code = await asyncio.wait_for(run_prepared(prepared, output), timeout=timeout)
+        except asyncio.TimeoutError:
+            timed_out = True
+        except asyncio.CancelledError:
+            output.discard()
+            raise
+        finally:
+            output.close()
+        
+        result = {
+            "success": return_code == 0 and not timed_out and not output.truncated,
+            "command": command,
+            "return_code": return_code,
+            "execution_time": loop.time() - started,
+            "timed_out": timed_out,
+            "in_process": True,
+            **output.summary()
+        }
+        if timed_out:
+            result["error"] = f"Command timed out after {timeout}s"
+        elif output.truncated:
+            result["error"] = f"Command output exceeded {output.max_bytes} bytes"
+        
+        outcome = ("timeout" if timed_out else "truncated" if output.truncated
+                   else "success" if result["success"] else "failed")
+        metrics.inc("executor_commands_total", outcome=outcome)
+        metrics.inc("executor_in_process_commands_total", outcome=outcome)
+        metrics.observe("executor_command_seconds", result["execution_time"])
+        return result
+    
+    def _signal_process(self, process, sig) -> bool:
+        """Signal a process's group (or the process on Windows); False if it is gone"""
+        try:
+            if os.name != 'nt':
+                pgid = self.__dict__.get('_process_pgids', {}).get(process.pid)
+                os.killpg(pgid if pgid is not None else os.getpgid(process.pid), sig)
+            elif sig == signal.SIGTERM:
+                process.terminate()
+            else:
+                process.kill()
+            return True
+        except (ProcessLookupError, psutil.NoSuchProcess):
+            return False  # Process already terminated
+    
+    async def kill_running_processes(self, grace_period: float = 3.0):
+        """Kill all running processes managed by this executor
+        
+        Every process group is sent SIGTERM at once and given one shared
+        grace period; whatever is still running is then SIGKILLed together.
+        """
+        from core.instrumentation import timed
+        
+        killed_processes = []
+        terminating = {}
+        snapshot = list(self.running_processes.items())
+        
+        with timed("executor_shutdown_phase_seconds", phase="sigterm"):
+            for process_id, process in snapshot:
+                try:
+                    if process.returncode is None:  # Process still running
+                        if self._signal_process(process, signal.SIGTERM):
+                            killed_processes.append(process_id)
+                            terminating[process_id] = process
+                except Exception as e:
+                    self.logger.error(f"Error killing process {process_id}: {e}")
+        
+        if terminating:
+            # Wait for graceful termination of all of them together
+            waiters = {
+                asyncio.ensure_future(process.wait()): process_id
+                for process_id, process in terminating.items()
+            }
+            with timed("executor_shutdown_phase_seconds", phase="grace"):
+                _, pending = await asyncio.wait(waiters.keys(), timeout=grace_period)
+            
+            if pending:
+                with timed("executor_shutdown_phase_seconds", phase="sigkill"):
+                    # Force kill whatever is still running
+                    for waiter in pending:
+                        process_id = waiters[waiter]
+                        try:
+                            self._signal_process(terminating[process_id], signal.SIGKILL)
+                        except Exception as e:
+                            self.logger.error(f"Error killing process {process_id}: {e}")
                     
-                    # Wait a bit for graceful termination
-                    try:
-                        await asyncio.wait_for(process.wait(), timeout=3)
-                    except asyncio.TimeoutError:
-                        # Force kill if still running
-                        if os.name != 'nt':
-                            os.killpg(os.getpgid(process.pid), signal.SIGKILL)
-                        else:
-                            process.kill()
-                            
-            except (ProcessLookupError, psutil.NoSuchProcess):
-                pass  # Process already terminated
-            except Exception as e:
-                self.logger.error(f"Error killing process {process_id}: {e}")
-            finally:
-                if process_id in self.running_processes:
-                    del self.running_processes[process_id]
+                    _, unreaped = await asyncio.wait(pending, timeout=1)
+                    for waiter in unreaped:
+                        waiter.cancel()
+                self.logger.warning(f"Force killed {len(pending)} processes after {grace_period}s")
+        
+        pgids = self.__dict__.get('_process_pgids', {})
+        for process_id, process in snapshot:
+            self.running_processes.pop(process_id, None)
+            pgids.pop(process.pid, None)
         
         if killed_processes:
             self.logger.info(f"Killed {len(killed_processes)} running processes")
         
         return killed_processes
     
-    def get_system_resources(self) -> Dict[str, Any]:
-        """Get current system resource usage"""
+    def _process_index(self):
+        """Get the cached, incrementally refreshed process table"""
+        index = self.__dict__.get('_proc_index')
+        if index is None:
+            from core.process_index import ProcessIndex
+            index = self.__dict__.setdefault('_proc_index', ProcessIndex())
+        return index
+    
+    def find_application_processes(self, app_name: str, exact: bool = False) -> List[Dict[str, Any]]:
+        """Find running processes of an application by name"""
         
         try:
-            return {
-                "cpu_percent": psutil.cpu_percent(interval=1),
-                "memory": {
-                    "total": psutil.virtual_memory().total,
-                    "available": psutil.virtual_memory().available,
-                    "percent": psutil.virtual_memory().percent
-                },
-                "disk": {
-                    "total": psutil.disk_usage('/').total,
-                    "free": psutil.disk_usage('/').free,
-                    "percent": psutil.disk_usage('/').percent
-                },
-                "processes": len(psutil.pids()),
-                "timestamp": datetime.now().isoformat()
+            return [
+                {"pid": info.pid, "name": info.name, "pgid": info.pgid}
+                for info in self._process_index().find_by_name(app_name, exact=exact)
+            ]
+        except Exception as e:
+            self.logger.error(f"Failed to look up processes for {app_name}: {e}")
+            return []
+    
+    def get_application_status(self, app_name: str) -> Dict[str, Any]:
+        """Get whether an application is running and its processes"""
+        
+        processes = self.find_application_processes(app_name)
+        return {
+            "app": app_name,
+            "running": bool(processes),
+            "processes": processes,
+            "count": len(processes),
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    def _system_sampler(self):
+        """Get the shared background metrics sampler"""
+        sampler = self.__dict__.get('_metrics_sampler')
+        if sampler is None:
+            from core.system_metrics import acquire_sampler
+            sampler = self._metrics_sampler = acquire_sampler()
+        return sampler
+    
+    def get_system_resources(self, window: float = None) -> Dict[str, Any]:
+        """Get current system resource usage
+        
+        Served from the latest background sample; pass window (seconds) to
+        also get averages and percentiles over recent samples.
+        """
+        
+        try:
+            sampler = self._system_sampler()
+            snapshot = sampler.latest()
+            
+            resources = {
+                "cpu_percent": snapshot["cpu_percent"],
+                "memory": dict(snapshot["memory"]),
+                "disk": dict(snapshot["disk"]),
+                "processes": snapshot["processes"],
+                "timestamp": snapshot["timestamp"]
             }
+            if window:
+                resources["window"] = sampler.window(window)
+            return resources
         except Exception as e:
             self.logger.error(f"Failed to get system resources: {e}")
             return {
@@ -303,6 +625,20 @@
                 "timestamp": datetime.now().isoformat()
             }
     
+    def _safety_rules_status(self) -> Dict[str, Any]:
+        """Get the version of the rule set in force and how it is loaded"""
+        loader = self.__dict__.get('_rules_loader')
+        if loader is not None:
+            return {"hot_reload": True, **loader.get_status()}
+        
+        engine = self._safety_engine()
+        return {"hot_reload": False, "version": engine.version, "fingerprint": engine.fingerprint}
+    
+    def _executor_metrics(self) -> Dict[str, Any]:
+        """Get the executor's counters and latency histograms"""
+        from core.instrumentation import metrics
+        return metrics.to_json(prefix="executor_")
+    
     def get_executor_status(self) -> Dict[str, Any]:
         """Get current executor status and configuration"""
         
@@ -317,6 +653,13 @@
             },
             "running_processes": len(self.running_processes),
             "safety_rules_loaded": bool(self.safety_rules),
+            "safety_rules": self._safety_rules_status(),
+            "verdict_caches": {
+                "commands": self._verdict_cache("commands").get_stats(),
+                "paths": self._verdict_cache("paths").get_stats()
+            },
+            "scheduler": self._execution_scheduler().get_stats(),
+            "metrics": self._executor_metrics(),
             "timestamp": datetime.now().isoformat()
         }
     
@@ -332,6 +675,10 @@
             # Clear process tracking
             self.running_processes.clear()
             
+            if self.__dict__.pop('_metrics_sampler', None) is not None:
+                from core.system_metrics import release_sampler
+                release_sampler()
+            
             self.logger.info("Safe executor shutdown complete")
             
         except Exception as e:
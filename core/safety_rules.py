@@ -0,0 +1,390 @@
+"""
+Compiled safety rule engine for SafeExecutor.
+
+``config/safety_rules.json`` is turned into precompiled matchers once. A
+command is parsed once (see core.command_parser) and every rule works on
+the parsed segments rather than on substrings of the raw text: blocked
+terms match command names and their arguments, dangerous paths match
+path arguments, and the blacklist regexes run over a quote-free rendering
+of the segments. The blacklist gets a single alternation regex that
+answers "does anything match?"; only when it does are the individual
+patterns consulted, in their configured order.
+"""
+
+import copy
+import functools
+import hashlib
+import json
+import logging
+import os
+import posixpath
+import re
+import threading
+import time
+from pathlib import PurePath
+from typing import Any, Dict, Iterable, List, Optional, Pattern, Sequence, Tuple
+
+from core.command_parser import CommandParseError, ParsedCommand, TermSet, parse_command
+from core.command_parser import changed_directory, is_within, may_reach, path_prefix, resolve_path
+
+logger = logging.getLogger(__name__)
+
+# Text-based extensions allowed when the rules do not list any
+DEFAULT_ALLOWED_EXTENSIONS = frozenset([
+    '.txt', '.md', '.json', '.yaml', '.yml', '.xml', '.csv',
+    '.js', '.ts', '.jsx', '.tsx', '.py', '.java', '.go', '.rs',
+    '.html', '.css', '.scss', '.sass', '.less',
+    '.sh', '.bash', '.zsh', '.fish',
+    '.sql', '.log', '.conf', '.config', '.ini', '.toml'
+])
+
+# Commands refused at safety level "medium"
+MEDIUM_RISK_PATTERNS = ("rm -rf", "sudo", "chmod 777", "curl |", "wget |")
+
+# Device files that are harmless to name even though /dev is a dangerous path
+HARMLESS_PATHS = frozenset(["/dev/null", "/dev/stdin", "/dev/stdout", "/dev/stderr", "/dev/tty"])
+
+# The same command is often checked at several levels or by several
+# sessions; parses are immutable, so they are shared
+_parse = functools.lru_cache(maxsize=4096)(parse_command)
+
+# (section, key) -> required type of the settings a rule set is compiled from
+_STRING_LISTS = (
+    (("command_validation", "blacklist_patterns"), "blacklist patterns"),
+    (("command_validation", "dangerous_paths"), "dangerous paths"),
+    (("command_validation", "safe_command_prefixes", "low_risk"), "low-risk prefixes"),
+    (("file_operation_rules", "allowed_extensions"), "allowed extensions"),
+    (("file_operation_rules", "blocked_extensions"), "blocked extensions"),
+)
+
+
+class SafetyRulesError(ValueError):
+    """Raised when a safety rules document is malformed"""
+
+
+def validate_safety_rules(safety_rules: Any):
+    """Check the structure of a parsed safety rules document"""
+    if not isinstance(safety_rules, dict):
+        raise SafetyRulesError("Safety rules must be a JSON object")
+
+    for path, label in _STRING_LISTS:
+        node = safety_rules
+        for key in path[:-1]:
+            node = node.get(key, {})
+            if not isinstance(node, dict):
+                raise SafetyRulesError(f"'{key}' must be an object")
+        values = node.get(path[-1], [])
+        if not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+            raise SafetyRulesError(f"{label} ('{'.'.join(path)}') must be a list of strings")
+        if path[-1] == "dangerous_paths" and "" in values:
+            raise SafetyRulesError("dangerous paths must not contain an empty string")
+
+
+class CompiledSafetyRules:
+    """Command safety rules compiled once at load time"""
+
+    def __init__(self, safety_rules: Dict[str, Any], blocked_commands: Sequence[str]):
+        self._source = (safety_rules, blocked_commands)
+        # A private copy, so in-place edits of the source objects are noticed
+        self._snapshot = copy.deepcopy([safety_rules, list(blocked_commands)])
+        validation = safety_rules.get("command_validation", {})
+
+        # Blacklist patterns in configured order. Patterns that are not valid
+        # regexes are matched as lowercase literals.
+        self.blacklist: List[Tuple[str, Optional[Pattern], str]] = []
+        for pattern in validation.get("blacklist_patterns", []):
+            try:
+                self.blacklist.append((pattern, re.compile(pattern), ""))
+            except re.error:
+                self.blacklist.append((pattern, None, pattern.lower()))
+        self._blacklist_any = self._combine_blacklist()
+
+        self.blocked_terms = TermSet(blocked_commands)
+        self.dangerous_paths = tuple(validation.get("dangerous_paths", []))
+
+        # Commands allowed at level "low", matched against each segment's command name
+        self.low_risk_commands = frozenset(
+            prefix.lower() for prefix in validation.get("safe_command_prefixes", {}).get("low_risk", [])
+        )
+
+        self.medium_risk = TermSet(MEDIUM_RISK_PATTERNS)
+
+        file_rules = safety_rules.get("file_operation_rules", {})
+        self.blocked_extensions = frozenset(ext.lower() for ext in file_rules.get("blocked_extensions", []))
+        self.allowed_extensions = frozenset(ext.lower() for ext in file_rules.get("allowed_extensions", []))
+
+        self.version = str(safety_rules.get("safety_rules", {}).get("version", "unknown"))
+        self.fingerprint = hashlib.sha256(
+            json.dumps([safety_rules, list(blocked_commands)], sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()[:16]
+
+    def _combine_blacklist(self) -> List[Pattern]:
+        """Pre-filters that match iff at least one blacklist rule matches
+
+        Patterns with capture groups stay separate, since joining them would
+        renumber their groups and break backreferences.
+        """
+        combinable = []
+        filters = []
+        for pattern, compiled, literal in self.blacklist:
+            if compiled is None:
+                combinable.append(re.escape(literal))
+            elif compiled.groups == 0:
+                combinable.append(f"(?:{pattern})")
+            else:
+                filters.append(compiled)
+
+        if combinable:
+            try:
+                filters.insert(0, re.compile("|".join(combinable)))
+            except re.error:
+                # e.g. inline global flags mid-alternation; fall back to one regex per rule
+                filters[:0] = [
+                    compiled or re.compile(re.escape(literal))
+                    for _, compiled, literal in self.blacklist
+                    if compiled is None or compiled.groups == 0
+                ]
+        return filters
+
+    @property
+    def safety_rules(self) -> Dict[str, Any]:
+        """The parsed rules document this rule set was compiled from"""
+        return self._source[0]
+
+    def built_from(self, safety_rules: Dict[str, Any], blocked_commands: Sequence[str]) -> bool:
+        """Check whether these rules were compiled from the given configuration, as it is now
+
+        Compares contents, not identity, so editing the rules dict or the
+        blocked command list in place also calls for a recompile.
+        """
+        return [safety_rules, list(blocked_commands)] == self._snapshot
+
+    def is_extension_allowed(self, path: PurePath) -> bool:
+        """Check if file extension is allowed"""
+        suffix = path.suffix.lower()
+
+        # Check blocked extensions first
+        if suffix in self.blocked_extensions:
+            return False
+
+        # Check allowed extensions
+        if self.allowed_extensions:
+            return suffix in self.allowed_extensions
+
+        # If no specific allowed extensions defined, allow most text-based extensions
+        return suffix in DEFAULT_ALLOWED_EXTENSIONS or path.suffix == ''
+
+    def dangerous_path(self, parsed: ParsedCommand, cwd: Optional[str] = None) -> Optional[str]:
+        """The first configured dangerous path any argument or redirection names
+
+        Relative and ``~`` arguments are resolved against cwd first, so
+        ``../../etc/passwd`` is caught like ``/etc/passwd``. A ``cd`` moves
+        the cwd for the segments after it; as subshells and ``||`` make
+        the real directory uncertain, every directory the command may be
+        in by then is tried, and a ``cd`` that cannot be resolved counts
+        as reaching every dangerous path. Globbed and expanded words count
+        when their literal start could reach a dangerous path. Paths
+        compare case-insensitively.
+        """
+        directories = {cwd}
+        for segment in parsed.segments:
+            for directory in directories:
+                path = self._first_dangerous(segment.words(), directory)
+                if path is not None:
+                    return path
+            if segment.program in ("cd", "pushd", "popd"):
+                if segment.program == "popd":
+                    changed = {None}
+                else:
+                    changed = {changed_directory(segment.argv, directory) for directory in directories}
+                # Without a cwd to start from, relative paths are not checked at all
+                if None in changed and cwd is not None and self.dangerous_paths:
+                    return self.dangerous_paths[0]
+                for path in self.dangerous_paths:
+                    if any(is_within(directory, path) for directory in changed if directory is not None):
+                        return path
+                directories |= changed
+        return None
+
+    def _first_dangerous(self, words: Iterable[str], cwd: Optional[str]) -> Optional[str]:
+        resolved, prefixes = [], []
+        for word in words:
+            if "/" not in word and "~" not in word and word != "..":
+                continue  # cannot be path-like
+            path = resolve_path(word, cwd)
+            if path is not None:
+                if path.lower() not in HARMLESS_PATHS:
+                    resolved.append(path)
+                continue
+            prefix = path_prefix(word, cwd)
+            if prefix is not None:
+                prefixes.append(prefix)
+        if not resolved and not prefixes:
+            return None
+        for path in self.dangerous_paths:
+            if (any(is_within(word, path) for word in resolved)
+                    or any(may_reach(prefix, path) for prefix in prefixes)):
+                return path
+        return None
+
+    def check(self, command: str, safety_level: str, cwd: Optional[str] = None) -> Dict[str, Any]:
+        """Validate command safety based on level and rules, resolving relative paths against cwd"""
+
+        if not command.strip():
+            return {"safe": False, "reason": "Empty command"}
+
+        try:
+            parsed = _parse(command)
+        except CommandParseError as e:
+            return {"safe": False, "reason": f"Command could not be parsed: {e}"}
+        segments = parsed.segments
+
+        # Check blacklisted patterns from safety rules
+        command_text = " ".join(segment.text() for segment in segments).lower()
+        if any(f.search(command_text) for f in self._blacklist_any):
+            for pattern, compiled, literal in self.blacklist:
+                if compiled.search(command_text) if compiled is not None else literal in command_text:
+                    return {
+                        "safe": False,
+                        "reason": f"Command contains blocked pattern: {pattern}"
+                    }
+
+        # Check explicitly blocked commands
+        blocked = self.blocked_terms.first_match(segments)
+        if blocked is not None:
+            return {
+                "safe": False,
+                "reason": f"Command contains blocked term: {blocked}"
+            }
+
+        # Check dangerous paths
+        path = self.dangerous_path(parsed, cwd)
+        if path is not None:
+            return {
+                "safe": False,
+                "reason": f"Command references dangerous path: {path}"
+            }
+
+        # Safety level specific checks
+        if safety_level == "low":
+            # Very restrictive - every command must be a basic safe one, and nothing is written
+            if not all(segment.argv and all(name.lower() in self.low_risk_commands
+                                            for name in segment.commands())
+                       for segment in segments if segment.argv or segment.redirections):
+                return {
+                    "safe": False,
+                    "reason": f"Command not allowed at safety level 'low': {command}"
+                }
+            if any(redirection.writes and posixpath.normpath(redirection.target) not in HARMLESS_PATHS
+                   for segment in segments for redirection in segment.redirections):
+                return {
+                    "safe": False,
+                    "reason": "Output redirection not allowed at safety level 'low'"
+                }
+
+        elif safety_level == "medium":
+            # Allow file operations and common dev tools
+            pattern = self.medium_risk.first_match(segments)
+            if pattern is not None:
+                return {
+                    "safe": False,
+                    "reason": f"Command contains medium-risk pattern not allowed: {pattern}"
+                }
+
+        elif safety_level == "high":
+            # Allow most commands except explicitly blocked
+            pass
+        else:
+            return {
+                "safe": False,
+                "reason": f"Unknown safety level: {safety_level}"
+            }
+
+        return {
+            "safe": True,
+            "reason": "Command passed safety validation",
+            "safety_level": safety_level
+        }
+
+
+class SafetyRulesLoader:
+    """Reloads a safety rules file when it changes on disk
+
+    The file is re-checked at most every ``check_interval`` seconds. A new
+    version is parsed, validated and compiled in full before it replaces the
+    current rule set in a single assignment, so a check in flight keeps using
+    the rule set it started with. A file that fails to load is logged and the
+    previous rules stay in force.
+    """
+
+    def __init__(self, path: str, check_interval: float = 2.0):
+        self.path = path
+        self.check_interval = check_interval
+
+        self._rules: Optional[CompiledSafetyRules] = None
+        self._file_state = None
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+        self._stats = {"reloads": 0, "failed_reloads": 0}
+        self.loaded_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def _read(self, blocked_commands: Sequence[str]) -> CompiledSafetyRules:
+        with open(self.path, encoding="utf-8") as f:
+            safety_rules = json.load(f)
+        validate_safety_rules(safety_rules)
+        return CompiledSafetyRules(safety_rules, blocked_commands)
+
+    def current(self, blocked_commands: Sequence[str]) -> CompiledSafetyRules:
+        """Get the current rule set, reloading it first if the file changed"""
+        rules = self._rules
+        now = time.monotonic()
+        if (rules is not None and now - self._checked_at < self.check_interval
+                and rules.built_from(rules.safety_rules, blocked_commands)):
+            return rules
+
+        with self._lock:
+            rules = self._rules
+            self._checked_at = now
+            try:
+                stat = os.stat(self.path)
+                file_state = (stat.st_mtime_ns, stat.st_size)
+            except OSError as e:
+                file_state = None
+                if rules is None:
+                    raise SafetyRulesError(f"Cannot read safety rules {self.path}: {e}") from e
+
+            if file_state is not None and file_state != self._file_state:
+                self._file_state = file_state  # a bad file is not retried until it changes again
+                try:
+                    new_rules = self._read(blocked_commands)
+                except (OSError, ValueError) as e:  # JSONDecodeError and SafetyRulesError are ValueErrors
+                    self.last_error = str(e)
+                    self._stats["failed_reloads"] += 1
+                    if rules is None:
+                        self._file_state = None
+                        raise
+                    logger.error(f"Keeping safety rules {rules.version}; reload failed: {e}")
+                else:
+                    if rules is not None:
+                        self._stats["reloads"] += 1
+                        logger.info(f"Reloaded safety rules {rules.version} -> {new_rules.version}")
+                    self.loaded_at = time.time()
+                    self.last_error = None
+                    self._rules = rules = new_rules
+
+            if not rules.built_from(rules.safety_rules, blocked_commands):
+                self._rules = rules = CompiledSafetyRules(rules.safety_rules, blocked_commands)
+            return rules
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get the loaded version and reload counters"""
+        rules = self._rules
+        return {
+            "path": self.path,
+            "version": rules.version if rules else None,
+            "fingerprint": rules.fingerprint if rules else None,
+            "loaded_at": self.loaded_at,
+            "last_error": self.last_error,
+            **self._stats
+        }
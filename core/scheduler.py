@@ -0,0 +1,177 @@
+"""
+Admission control for SafeExecutor command execution.
+
+Commands take a slot before they spawn anything. A slot is granted only
+while both the global limit and the session's own limit have room. Waiting
+commands are queued by priority, and within a priority level the sessions
+waiting at that level take turns in round-robin order, so one chatty
+session cannot starve the others. When
+too many commands are already queued, new ones are refused rather than
+piling up.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict
+
+
+class SchedulerFullError(Exception):
+    """Raised when the execution queue is at capacity"""
+
+
+class ExecutionScheduler:
+    """Priority queue with global and per-session concurrency limits
+
+    Lower priority values run first; 0 is the default.
+    """
+
+    def __init__(self, max_concurrent: int = 5, per_session_limit: int = 2,
+                 max_queue_depth: int = 50):
+        self._running: Dict[str, int] = {}
+        # priority -> sessions in turn order -> that session's waiters, FIFO
+        self._levels: Dict[int, "OrderedDict[str, Deque[asyncio.Future]]"] = {}
+        self._queued = 0
+        self._stats = {"admitted": 0, "rejected": 0, "cancelled": 0, "peak_queued": 0}
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self.configure(max_concurrent, per_session_limit, max_queue_depth)
+
+    def configure(self, max_concurrent: int, per_session_limit: int, max_queue_depth: int):
+        """Set the limits; commands already running keep their slots"""
+        self.max_concurrent = max(1, max_concurrent)
+        self.per_session_limit = max(1, per_session_limit)
+        self.max_queue_depth = max_queue_depth
+        self._dispatch()  # raised limits may admit waiters right away
+
+    @property
+    def running(self) -> int:
+        return sum(self._running.values())
+
+    def _has_room(self, session_id: str) -> bool:
+        return (self.running < self.max_concurrent
+                and self._running.get(session_id, 0) < self.per_session_limit)
+
+    def _grant(self, session_id: str):
+        self._running[session_id] = self._running.get(session_id, 0) + 1
+        self._stats["admitted"] += 1
+
+    def _next_waiter(self):
+        """Pop the next waiter to admit, or None if nobody eligible is queued
+
+        Levels are tried best priority first. Within a level, the first
+        session under its own limit is served and then moved to the back of
+        that level's turn order.
+        """
+        for priority in sorted(self._levels):
+            sessions = self._levels[priority]
+            for session_id, queue in list(sessions.items()):
+                while queue and queue[0].done():
+                    queue.popleft()  # cancelled while waiting
+                if not queue:
+                    del sessions[session_id]
+                    continue
+                if self._running.get(session_id, 0) >= self.per_session_limit:
+                    continue
+                future = queue.popleft()
+                if queue:
+                    sessions.move_to_end(session_id)
+                else:
+                    del sessions[session_id]
+                return session_id, future
+            if not sessions:
+                del self._levels[priority]
+        return None
+
+    def _dispatch(self):
+        """Hand free slots to queued commands"""
+        while self.running < self.max_concurrent:
+            waiter = self._next_waiter()
+            if waiter is None:
+                return
+            session_id, future = waiter
+            self._queued -= 1
+            self._grant(session_id)
+            future.set_result(None)
+
+    async def acquire(self, session_id: str, priority: int = 0):
+        """Wait for an execution slot; raises SchedulerFullError if the queue is full"""
+        if not self._queued and self._has_room(session_id):
+            self._grant(session_id)
+            return
+
+        if self._queued >= self.max_queue_depth:
+            self._stats["rejected"] += 1
+            raise SchedulerFullError(
+                f"Execution queue is full ({self._queued} commands waiting)"
+            )
+
+        future = asyncio.get_running_loop().create_future()
+        sessions = self._levels.setdefault(priority, OrderedDict())
+        sessions.setdefault(session_id, deque()).append(future)
+        self._queued += 1
+        self._stats["peak_queued"] = max(self._stats["peak_queued"], self._queued)
+        self._dispatch()
+
+        started = time.perf_counter()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(session_id)  # granted just as we were cancelled
+            else:
+                future.cancel()
+                self._queued -= 1
+                self._stats["cancelled"] += 1
+            raise
+
+        waited = time.perf_counter() - started
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+
+    def release(self, session_id: str):
+        """Return a slot and admit whoever is next"""
+        remaining = self._running.get(session_id, 0) - 1
+        if remaining > 0:
+            self._running[session_id] = remaining
+        else:
+            self._running.pop(session_id, None)
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, session_id: str, priority: int = 0):
+        """Hold an execution slot for the duration of the block"""
+        await self.acquire(session_id, priority)
+        try:
+            yield
+        finally:
+            self.release(session_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get limits, occupancy and queueing counters"""
+        admitted = self._stats["admitted"]
+        return {
+            "max_concurrent": self.max_concurrent,
+            "per_session_limit": self.per_session_limit,
+            "max_queue_depth": self.max_queue_depth,
+            "running": self.running,
+            "queued": self._queued,
+            "sessions": self._session_stats(),
+            "avg_wait_seconds": self._wait_total / admitted if admitted else 0.0,
+            "max_wait_seconds": self._wait_max,
+            **self._stats
+        }
+
+    def _session_stats(self) -> Dict[str, Dict[str, int]]:
+        sessions = {
+            session_id: {"running": running, "queued": 0}
+            for session_id, running in self._running.items()
+        }
+        for level in self._levels.values():
+            for session_id, queue in level.items():
+                waiting = sum(1 for future in queue if not future.done())
+                if waiting:
+                    entry = sessions.setdefault(session_id, {"running": 0, "queued": 0})
+                    entry["queued"] += waiting
+        return sessions
@@ -0,0 +1,232 @@
+"""
+Full-text search over session activity and notes.
+
+Queries run against the FTS5 indexes built by schema migration 4 and come
+back ranked by BM25 with a highlighted snippet per hit. Session and type
+filters are exact matches on the joined row. When the SQLite build has no
+FTS5 the same call falls back to a LIKE scan, newest rows first.
+
+Pages are addressed by keyset: the cursor holds the sort key of the last
+hit returned, (rank, rowid) for FTS5 or (timestamp, rowid) for the LIKE
+fallback, so deep pages cost no more than the first one.
+
+Ranked pages are only stable while the index is not written to. BM25
+scores depend on corpus-wide statistics (row count, average length, how
+many rows hold each term), so any insert, update or delete between two
+pages re-scores every hit, including ones already returned: the next page
+can then repeat hits or skip ones that moved above the cursor's rank.
+Bounding the cursor by rowid would not help, since old rows are
+re-scored too. The LIKE fallback's (timestamp, rowid) order is stable.
+Callers that need an exact listing of a live session should restart from
+the first page, or list rows in time order with get_activity_page.
+"""
+
+import re
+import sqlite3
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from core.migrations import SEARCH_INDEXES, search_columns
+from core.records import decode_cursor, encode_cursor, keyset_before, record_type
+
+SNIPPET_TOKENS = 16
+HIGHLIGHT = ("[", "]")
+ELLIPSIS = "…"
+
+_INDEXES = {table: (fts, filters) for table, fts, filters in SEARCH_INDEXES}
+_WORD = re.compile(r'[^\s"]+')
+
+
+def match_expression(text: str) -> str:
+    """Plain user text as an FTS5 query: every word must match, a trailing * searches by prefix"""
+    terms = []
+    for word in _WORD.findall(text):
+        prefix = word.endswith("*")
+        word = word.rstrip("*")
+        if word:
+            terms.append(f'"{word}"' + ("*" if prefix else ""))
+    return " AND ".join(terms)
+
+
+def _phrase(value: Any) -> str:
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def _has_index(conn: sqlite3.Connection, fts: str) -> bool:
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts,)).fetchone()
+    return row is not None
+
+
+def search(conn: sqlite3.Connection, table: str, query: str,
+           filters: Optional[Dict[str, Any]] = None, limit: int = 20,
+           cursor: str = None, raw: bool = False) -> Dict[str, Any]:
+    """Search one table; returns {"results", "next_cursor", "engine"}
+
+    ``query`` is plain words unless ``raw`` is set, in which case it is
+    passed to FTS5 as a full query expression. ``filters`` maps filter
+    columns (e.g. session_id, action_type) to the exact value required.
+    FTS5 cursors resume by rank, so pages read while rows are being
+    written may overlap or miss hits (see the module docstring).
+    """
+    if table not in _INDEXES:
+        raise ValueError(f"No search index for table {table!r}")
+    fts, allowed = _INDEXES[table]
+    filters = {name: value for name, value in (filters or {}).items() if value is not None}
+    unknown = set(filters) - set(allowed)
+    if unknown:
+        raise ValueError(f"Cannot filter {table} on {sorted(unknown)}")
+
+    after = decode_cursor(cursor) if cursor else None
+    if _has_index(conn, fts):
+        rows = _search_fts(conn, table, fts, query, filters, limit, after, raw)
+        engine = "fts5"
+    else:
+        rows = _search_like(conn, table, query, filters, limit, after)
+        engine = "like"
+
+    next_cursor = encode_cursor(hit_position(rows[-1])) if len(rows) == limit else None
+    return {"results": rows, "next_cursor": next_cursor, "engine": engine}
+
+
+def hit_position(hit: Any) -> Tuple[Any, ...]:
+    """Keyset position of a hit: where the page after it starts"""
+    if hit.rank is not None:
+        return (hit.rank, hit.row_id)
+    if hasattr(hit, "timestamp"):
+        return (hit.timestamp, hit.row_id)
+    return (hit.row_id,)
+
+
+def _search_fts(conn: sqlite3.Connection, table: str, fts: str, query: str,
+                filters: Dict[str, Any], limit: int, after: Optional[Sequence[Any]],
+                raw: bool) -> List[Any]:
+    rowid = search_columns(conn, table, ())[0]
+    expression = query if raw else match_expression(query)
+    if not expression.strip():
+        raise ValueError("Search query is empty")
+    where = "".join(f" AND t.{name} = ?" for name in filters)
+    params = list(filters.values())
+    if after is not None:
+        score, last = after
+        where += " AND (f.rank > ? OR (f.rank = ? AND f.rowid > ?))"
+        params.extend([score, score, last])
+
+    # The page is picked first, ordered by rank with rowid breaking ties so
+    # pages never overlap; snippets are then built for those rows only
+    sql = (
+        f"SELECT t.{rowid} AS row_id, t.*, page.score AS rank, "
+        f"snippet({fts}, -1, ?, ?, ?, {SNIPPET_TOKENS}) AS snippet FROM ("
+        f"SELECT f.rowid AS hit, f.rank AS score FROM {fts} f CROSS JOIN {table} t ON t.{rowid} = f.rowid "
+        f"WHERE {fts} MATCH ?{where} ORDER BY f.rank, f.rowid LIMIT ?"
+        f") AS page CROSS JOIN {fts} f CROSS JOIN {table} t "
+        f"WHERE {fts} MATCH ? AND f.rowid = page.hit AND t.{rowid} = page.hit "
+        f"ORDER BY page.score, page.hit"
+    )
+    rows = conn.execute(sql, [*HIGHLIGHT, ELLIPSIS, expression, *params, limit, expression])
+    hit = record_type(tuple(column[0] for column in rows.description), "SearchHit")
+    return list(map(hit._make, rows))
+
+
+def _search_like(conn: sqlite3.Connection, table: str, query: str,
+                 filters: Dict[str, Any], limit: int, after: Optional[Sequence[Any]]) -> List[Any]:
+    rowid, _, text_columns = search_columns(conn, table, _INDEXES[table][1])
+    words = [word.rstrip("*") for word in _WORD.findall(query) if word.rstrip("*")]
+    if not words:
+        raise ValueError("Search query is empty")
+
+    conditions, params = [], []
+    for word in words:
+        pattern = "%" + re.sub(r"([\\%_])", r"\\\1", word) + "%"
+        conditions.append("(" + " OR ".join(f"{name} LIKE ? ESCAPE '\\'" for name in text_columns) + ")")
+        params.extend([pattern] * len(text_columns))
+    for name, value in filters.items():
+        conditions.append(f"{name} = ?")
+        params.append(value)
+
+    dated = "timestamp" in {c[1] for c in conn.execute(f"PRAGMA table_info({table})")}
+    if after is not None:
+        if dated:
+            clause, values = keyset_before("timestamp", rowid, after)
+        else:
+            clause, values = f"{rowid} < ?", [after[-1]]
+        conditions.append(clause)
+        params.extend(values)
+
+    order = "timestamp DESC, " if dated else ""
+    rows = conn.execute(
+        f"SELECT {rowid} AS row_id, *, NULL AS rank FROM {table} WHERE {' AND '.join(conditions)} "
+        f"ORDER BY {order}{rowid} DESC LIMIT ?",
+        params + [limit]
+    )
+    columns = tuple(column[0] for column in rows.description)
+    hit = record_type(columns + ("snippet",), "SearchHit")
+
+    results = []
+    for row in rows:
+        values = dict(zip(columns, row))
+        text = next((str(values[name]) for name in text_columns
+                     if values[name] and words[0].lower() in str(values[name]).lower()), "")
+        results.append(hit._make(row + (_like_snippet(text, words),)))
+    return results
+
+
+def _like_snippet(text: str, words: Sequence[str], width: int = 80) -> str:
+    """Window of text around the first matched word, with every word highlighted"""
+    if not text:
+        return ""
+    lowered = text.lower()
+    first = min((lowered.find(word.lower()) for word in words if word.lower() in lowered), default=0)
+    start = max(0, first - width // 2)
+    window = text[start:start + width]
+    open_mark, close_mark = HIGHLIGHT
+    pattern = re.compile("|".join(re.escape(word) for word in words), re.IGNORECASE)
+    window = pattern.sub(lambda m: f"{open_mark}{m.group(0)}{close_mark}", window)
+    return (ELLIPSIS if start else "") + window + (ELLIPSIS if start + width < len(text) else "")
+
+
+def merge_pages(pages: Sequence[Optional[Dict[str, Any]]], cursors: Sequence[Optional[str]],
+                limit: int) -> Dict[str, Any]:
+    """Interleave pages from several stores (e.g. shards) by rank position
+
+    BM25 scores depend on each store's own corpus statistics, so they are
+    not comparable across stores; the merged page takes each store's next
+    best hit in turn instead. ``pages[i]`` was fetched from store i with
+    ``cursors[i]`` ("" for its first page, None once it is exhausted, in
+    which case the page is None too). The merged next_cursor holds the
+    position each store resumes from.
+    """
+    taken = [0] * len(pages)
+    results = []
+    depth = 0
+    while len(results) < limit:
+        added = False
+        for index, page in enumerate(pages):
+            hits = page["results"] if page else []
+            if depth < len(hits) and len(results) < limit:
+                results.append(hits[depth])
+                taken[index] += 1
+                added = True
+        if not added:
+            break
+        depth += 1
+
+    positions: List[Optional[str]] = []
+    for index, page in enumerate(pages):
+        if page is None or "error" in page:
+            positions.append(None)
+        elif taken[index] == len(page["results"]):
+            positions.append(page["next_cursor"])
+        elif taken[index]:
+            positions.append(encode_cursor(hit_position(page["results"][taken[index] - 1])))
+        else:
+            positions.append(cursors[index])
+
+    engines = {page.get("engine") for page in pages if page and page.get("engine")}
+    merged = {
+        "results": results,
+        "next_cursor": encode_cursor(positions) if any(p is not None for p in positions) else None,
+        "engine": engines.pop() if len(engines) == 1 else "mixed"
+    }
+    errors = [page["error"] for page in pages if page and "error" in page]
+    if errors:
+        merged["error"] = "; ".join(errors)
+    return merged
@@ -1,10 +1,215 @@
+    def _get_pool(self):
+        """Get the session store connection pool, creating it on first use"""
+        pool = self.__dict__.get('_pool')
+        if pool is None:
+            from core.db_pool import ConnectionPool
+            
+            candidate = ConnectionPool(self.db_path)
+            self._migrate_schema(candidate)
+            pool = self.__dict__.setdefault('_pool', candidate)
+            if pool is not candidate:
+                candidate.close()
+        return pool
+    
+    def _migrate_schema(self, pool):
+        """Bring the database up to the latest schema version"""
+        from core.migrations import apply_migrations
+        
+        try:
+            with pool.connection() as conn:
+                applied = apply_migrations(conn)
+            if applied:
+                self.logger.info(f"Applied schema migrations: {applied}")
+        except Exception as e:
+            self.logger.error(f"Schema migration failed: {e}")
+    
+    def _connection(self, label: str):
+        """Check out a pooled connection for one transaction
+        
+        The time it is held is recorded in session_query_seconds with
+        method=label.
+        """
+        from core.instrumentation import timed_context
+        
+        return timed_context(self._get_pool().connection(), "session_query_seconds", method=label)
+    
+    def _connection_factory(self, label: str):
+        """Zero-argument _connection for helpers that open their own transactions"""
+        import functools
+        
+        return functools.partial(self._connection, label=label)
+    
+    def _get_write_buffer(self):
+        """Get the write-behind buffer for activity and note inserts"""
+        buffer = self.__dict__.get('_write_buffer')
+        if buffer is None:
+            from core.write_buffer import WriteBuffer
+            buffer = self.__dict__.setdefault('_write_buffer', WriteBuffer(self._connection_factory("write_buffer")))
+        return buffer
+    
+    def configure_write_buffer(self, max_batch: int = 500, flush_interval: float = 1.0,
+                               durability: str = "batched"):
+        """Replace the write buffer settings, flushing anything already queued
+        
+        durability is "batched" (flush on size, interval or close) or
+        "immediate" (commit every row as it is queued).
+        """
+        from core.write_buffer import WriteBuffer
+        
+        new_buffer = WriteBuffer(self._connection_factory("write_buffer"), max_batch=max_batch,
+                                 flush_interval=flush_interval, durability=durability)
+        old_buffer = self.__dict__.get('_write_buffer')
+        self._write_buffer = new_buffer
+        if old_buffer is not None:
+            old_buffer.close()
+    
+    def _flush_pending_writes(self, session_id: str = None):
+        """Write buffered rows so the next read sees them"""
+        buffer = self.__dict__.get('_write_buffer')
+        if buffer is not None:
+            try:
+                buffer.sync(session_id)
+            except Exception as e:
+                self.logger.error(f"Failed to flush buffered writes before read: {e}")
+    
+    def queue_activity(self, session_id: str, action_type: str, success: bool = True,
+                       execution_time: float = None, **fields) -> bool:
+        """Buffer an activity log row for the next batched write"""
+        
+        try:
+            row = {
+                "session_id": session_id,
+                "action_type": action_type,
+                "success": success,
+                "execution_time": execution_time,
+                # Stamp now so the row keeps its event time however late it is flushed
+                "timestamp": datetime.now().isoformat(),
+                **fields
+            }
+            self._get_write_buffer().add("activity_logs", row)
+            self._notify_activity(session_id)
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"Failed to queue activity: {e}")
+            return False
+    
+    # The direct writer, defined earlier in the class body
+    _write_activity = log_activity
+    
+    def log_activity(self, session_id: str, *args, **kwargs):
+        """Log an activity row right away and notify activity listeners"""
+        result = self._write_activity(session_id, *args, **kwargs)
+        self._notify_activity(session_id)
+        return result
+    
+    def add_activity_listener(self, listener):
+        """Call listener(session_id) whenever activity is written for a session"""
+        self.__dict__.setdefault('_activity_listeners', []).append(listener)
+    
+    def remove_activity_listener(self, listener):
+        """Stop notifying a listener added with add_activity_listener"""
+        listeners = self.__dict__.get('_activity_listeners', [])
+        if listener in listeners:
+            listeners.remove(listener)
+    
+    def _notify_activity(self, session_id: str):
+        """Tell every listener that a session has new activity"""
+        for listener in list(self.__dict__.get('_activity_listeners', ())):
+            try:
+                listener(session_id)
+            except Exception as e:
+                self.logger.error(f"Activity listener failed: {e}")
+    
+    def queue_note(self, session_id: str, note_type: str, **fields) -> bool:
+        """Buffer a session note row for the next batched write"""
+        
+        try:
+            row = {
+                "session_id": session_id,
+                "note_type": note_type,
+                "timestamp": datetime.now().isoformat(),
+                **fields
+            }
+            self._get_write_buffer().add("session_notes", row)
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"Failed to queue session note: {e}")
+            return False
+    
+    def _get_db_executor(self):
+        """Get the dedicated database thread used by the async API"""
+        executor = self.__dict__.get('_db_executor')
+        if executor is None:
+            from core.db_executor import DatabaseExecutor
+            executor = self.__dict__.setdefault('_db_executor', DatabaseExecutor())
+        return executor
+    
+    async def _run_db(self, func, *args, **kwargs):
+        """Run a blocking SessionManager call off the event loop"""
+        return await self._get_db_executor().run(func, *args, **kwargs)
+    
+    # The unbuffered reader, defined earlier in the class body
+    _read_recent_activity = get_recent_activity
+    
+    def get_recent_activity(self, session_id: str, **kwargs) -> List[Dict]:
+        """Get recent activity, including rows still in the write buffer"""
+        self._flush_pending_writes(session_id)
+        return self._read_recent_activity(session_id, **kwargs)
+    
+    async def get_recent_activity_async(self, session_id: str, **kwargs) -> List[Dict]:
+        """Awaitable variant of get_recent_activity"""
+        return await self._run_db(self.get_recent_activity, session_id, **kwargs)
+    
+    async def update_task_status_async(self, task_id: str, status: str) -> bool:
+        """Awaitable variant of update_task_status"""
+        return await self._run_db(self.update_task_status, task_id, status)
+    
+    async def get_tasks_async(self, session_id: str = None, status: str = None) -> List[Dict]:
+        """Awaitable variant of get_tasks"""
+        return await self._run_db(self.get_tasks, session_id, status)
+    
+    async def delete_task_async(self, task_id: str) -> bool:
+        """Awaitable variant of delete_task"""
+        return await self._run_db(self.delete_task, task_id)
+    
+    async def get_session_statistics_async(self, session_id: str, days: int = 7) -> Dict[str, Any]:
+        """Awaitable variant of get_session_statistics"""
+        return await self._run_db(self.get_session_statistics, session_id, days)
+    
+    async def cleanup_old_data_async(self, days: int = 30) -> Dict[str, int]:
+        """Awaitable variant of cleanup_old_data
+        
+        Each chunk is its own database job and the pauses between them are
+        awaited here, so other async calls are served while cleanup runs.
+        """
+        
+        try:
+            await self._run_db(self._flush_pending_writes)
+            report = await self._get_retention_engine().run_async(days, self._run_db)
+            return self._cleanup_result(report, days)
+            
+        except Exception as e:
+            self.logger.error(f"Failed to cleanup old data: {e}")
+            return {
+                "error": str(e),
+                "activities_deleted": 0,
+                "notes_deleted": 0,
+                "tasks_deleted": 0
+            }
+    
+    async def get_database_info_async(self) -> Dict[str, Any]:
+        """Awaitable variant of get_database_info"""
+        return await self._run_db(self.get_database_info)
+    
     def update_task_status(self, task_id: str, status: str) -> bool:
         """Update task status"""
         
         try:
             completed_at = datetime.now().isoformat() if status == 'completed' else None
             
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection(label="update_task_status") as conn:
                 cursor = conn.execute("""
                     UPDATE tasks 
                     SET status = ?, completed_at = ?, updated_at = CURRENT_TIMESTAMP
@@ -40,7 +245,7 @@
             
             query += " ORDER BY created_at DESC"
             
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection(label="get_tasks") as conn:
                 cursor = conn.execute(query, params)
                 
                 tasks = []
@@ -64,11 +269,178 @@
             self.logger.error(f"Failed to get tasks: {e}")
             return []
     
+    def get_tasks_page(self, session_id: str = None, status: str = None,
+                       limit: int = 100, cursor: str = None) -> Dict[str, Any]:
+        """Get one page of tasks, newest first, using keyset pagination
+        
+        Pass the returned next_cursor back in to get the following page;
+        it is None once the last page has been read.
+        """
+        from core.records import TASK_COLUMNS, TaskRecord, decode_cursor, encode_cursor, keyset_before
+        
+        try:
+            query = f"SELECT {', '.join(TASK_COLUMNS)} FROM tasks WHERE 1=1"
+            params = []
+            
+            if session_id:
+                query += " AND session_id = ?"
+                params.append(session_id)
+            
+            if status:
+                query += " AND status = ?"
+                params.append(status)
+            
+            if cursor:
+                clause, values = keyset_before("created_at", "id", decode_cursor(cursor))
+                query += f" AND {clause}"
+                params.extend(values)
+            
+            query += " ORDER BY created_at DESC, id DESC LIMIT ?"
+            params.append(limit)
+            
+            with self._connection(label="get_tasks_page") as conn:
+                tasks = list(map(TaskRecord._make, conn.execute(query, params)))
+            
+            next_cursor = None
+            if len(tasks) == limit:
+                next_cursor = encode_cursor((tasks[-1].created_at, tasks[-1].id))
+            
+            return {"tasks": tasks, "next_cursor": next_cursor}
+            
+        except Exception as e:
+            self.logger.error(f"Failed to get tasks page: {e}")
+            return {"tasks": [], "next_cursor": None, "error": str(e)}
+    
+    def iter_tasks(self, session_id: str = None, status: str = None,
+                   batch_size: int = 500) -> "Iterator[TaskRecord]":
+        """Stream tasks newest first, fetching batch_size rows at a time"""
+        
+        from core.records import check_page
+        
+        cursor = None
+        while True:
+            page = check_page(self.get_tasks_page(session_id, status, batch_size, cursor))
+            yield from page["tasks"]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return
+    
+    async def aiter_tasks(self, session_id: str = None, status: str = None,
+                          batch_size: int = 500) -> "AsyncIterator[TaskRecord]":
+        """Async variant of iter_tasks; each batch is fetched on the database thread"""
+        
+        from core.records import check_page
+        
+        cursor = None
+        while True:
+            page = check_page(await self._run_db(self.get_tasks_page, session_id, status, batch_size, cursor))
+            for task in page["tasks"]:
+                yield task
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return
+    
+    def get_activity_page(self, session_id: str, limit: int = 100, cursor: str = None) -> Dict[str, Any]:
+        """Get one page of a session's activity, newest first, using keyset pagination"""
+        from core.records import decode_cursor, encode_cursor, keyset_before, record_type
+        
+        try:
+            query = "SELECT rowid AS row_id, * FROM activity_logs WHERE session_id = ?"
+            params = [session_id]
+            
+            if cursor:
+                clause, values = keyset_before("timestamp", "rowid", decode_cursor(cursor))
+                query += f" AND {clause}"
+                params.extend(values)
+            else:
+                self._flush_pending_writes(session_id)
+            
+            query += " ORDER BY timestamp DESC, rowid DESC LIMIT ?"
+            params.append(limit)
+            
+            with self._connection(label="get_activity_page") as conn:
+                rows = conn.execute(query, params)
+                record = record_type(tuple(column[0] for column in rows.description))
+                activities = list(map(record._make, rows))
+            
+            next_cursor = None
+            if len(activities) == limit:
+                next_cursor = encode_cursor((activities[-1].timestamp, activities[-1].row_id))
+            
+            return {"activities": activities, "next_cursor": next_cursor}
+            
+        except Exception as e:
+            self.logger.error(f"Failed to get activity page: {e}")
+            return {"activities": [], "next_cursor": None, "error": str(e)}
+    
+    def iter_activity(self, session_id: str, batch_size: int = 500) -> "Iterator[Any]":
+        """Stream a session's activity newest first, fetching batch_size rows at a time"""
+        
+        from core.records import check_page
+        
+        cursor = None
+        while True:
+            page = check_page(self.get_activity_page(session_id, batch_size, cursor))
+            yield from page["activities"]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return
+    
+    async def aiter_activity(self, session_id: str, batch_size: int = 500) -> "AsyncIterator[Any]":
+        """Async variant of iter_activity; each batch is fetched on the database thread"""
+        
+        from core.records import check_page
+        
+        cursor = None
+        while True:
+            page = check_page(await self._run_db(self.get_activity_page, session_id, batch_size, cursor))
+            for activity in page["activities"]:
+                yield activity
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return
+    
+    def _search(self, table: str, query: str, filters: Dict[str, Any], limit: int,
+                cursor: str, raw: bool) -> Dict[str, Any]:
+        """Ranked full-text search over one table, see core.search"""
+        from core.search import search
+        
+        try:
+            if not cursor:
+                self._flush_pending_writes(filters.get("session_id"))
+            
+            with self._connection(label=f"search_{table}") as conn:
+                return search(conn, table, query, filters, limit, cursor, raw)
+                
+        except Exception as e:
+            self.logger.error(f"Search over {table} failed: {e}")
+            return {"results": [], "next_cursor": None, "error": str(e)}
+    
+    def search_activity(self, query: str, session_id: str = None, action_type: str = None,
+                        limit: int = 20, cursor: str = None, raw: bool = False) -> Dict[str, Any]:
+        """Search activity input and results, best matches first, with highlighted snippets"""
+        filters = {"session_id": session_id, "action_type": action_type}
+        return self._search("activity_logs", query, filters, limit, cursor, raw)
+    
+    def search_notes(self, query: str, session_id: str = None, note_type: str = None,
+                     limit: int = 20, cursor: str = None, raw: bool = False) -> Dict[str, Any]:
+        """Search session notes, best matches first, with highlighted snippets"""
+        filters = {"session_id": session_id, "note_type": note_type}
+        return self._search("session_notes", query, filters, limit, cursor, raw)
+    
+    async def search_activity_async(self, query: str, **kwargs) -> Dict[str, Any]:
+        """Awaitable variant of search_activity"""
+        return await self._run_db(self.search_activity, query, **kwargs)
+    
+    async def search_notes_async(self, query: str, **kwargs) -> Dict[str, Any]:
+        """Awaitable variant of search_notes"""
+        return await self._run_db(self.search_notes, query, **kwargs)
+    
     def delete_task(self, task_id: str) -> bool:
         """Delete a task"""
         
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection(label="delete_task") as conn:
                 cursor = conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
                 
                 if cursor.rowcount > 0:
@@ -86,52 +458,72 @@
     def get_session_statistics(self, session_id: str, days: int = 7) -> Dict[str, Any]:
         """Get detailed session statistics"""
         
+        from core.migrations import window_first_day, window_totals
+        
         try:
             since = datetime.now() - timedelta(days=days)
+            self._flush_pending_writes(session_id)
             
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection(label="get_session_statistics") as conn:
+                # Whole days come from the daily rollups; only the partial first
+                # day of the window is read from the raw tables
+                
                 # Activity statistics
-                activity_stats = conn.execute("""
-                    SELECT 
-                        COUNT(*) as total_activities,
-                        SUM(CASE WHEN success = 1 THEN 1 ELSE 0 END) as successful_activities,
-                        AVG(execution_time) as avg_execution_time,
-                        SUM(execution_time) as total_execution_time,
-                        COUNT(DISTINCT DATE(timestamp)) as active_days
-                    FROM activity_logs 
+                total, successful, active_days = window_totals(
+                    conn, session_id, since,
+                    "activity_daily_rollup", ["total", "successful", "total > 0"],
+                    "activity_logs", "timestamp",
+                    ["COUNT(*)", "SUM(CASE WHEN success = 1 THEN 1 ELSE 0 END)", "COUNT(*) > 0"]
+                )
+                # Float sums depend on summation order, so execution time is
+                # aggregated over the covering index just as the raw query did
+                time_avg, time_sum = conn.execute("""
+                    SELECT AVG(execution_time), SUM(execution_time)
+                    FROM activity_logs
                     WHERE session_id = ? AND timestamp > ?
                 """, (session_id, since.isoformat())).fetchone()
+                activity_stats = (total, successful, time_avg, time_sum, active_days)
                 
                 # Task statistics
-                task_stats = conn.execute("""
-                    SELECT 
-                        COUNT(*) as total_tasks,
-                        SUM(CASE WHEN status = 'completed' THEN 1 ELSE 0 END) as completed_tasks,
-                        SUM(CASE WHEN status = 'pending' THEN 1 ELSE 0 END) as pending_tasks,
-                        SUM(CASE WHEN status = 'in_progress' THEN 1 ELSE 0 END) as in_progress_tasks
-                    FROM tasks 
-                    WHERE session_id = ? AND created_at > ?
-                """, (session_id, since.isoformat())).fetchone()
+                task_stats = window_totals(
+                    conn, session_id, since,
+                    "task_daily_rollup", ["total", "completed", "pending", "in_progress"],
+                    "tasks", "created_at",
+                    ["COUNT(*)",
+                     "SUM(CASE WHEN status = 'completed' THEN 1 ELSE 0 END)",
+                     "SUM(CASE WHEN status = 'pending' THEN 1 ELSE 0 END)",
+                     "SUM(CASE WHEN status = 'in_progress' THEN 1 ELSE 0 END)"]
+                )
                 
                 # Note statistics
-                note_stats = conn.execute("""
-                    SELECT 
-                        COUNT(*) as total_notes,
-                        SUM(CASE WHEN note_type = 'manual' THEN 1 ELSE 0 END) as manual_notes,
-                        SUM(CASE WHEN note_type = 'auto_summary' THEN 1 ELSE 0 END) as auto_notes
-                    FROM session_notes 
-                    WHERE session_id = ? AND timestamp > ?
-                """, (session_id, since.isoformat())).fetchone()
+                note_stats = window_totals(
+                    conn, session_id, since,
+                    "note_daily_rollup", ["total", "manual", "auto_summary"],
+                    "session_notes", "timestamp",
+                    ["COUNT(*)",
+                     "SUM(CASE WHEN note_type = 'manual' THEN 1 ELSE 0 END)",
+                     "SUM(CASE WHEN note_type = 'auto_summary' THEN 1 ELSE 0 END)"]
+                )
                 
                 # Most common action types
+                since_day, next_day = window_first_day(since)
                 action_types = conn.execute("""
-                    SELECT action_type, COUNT(*) as count
-                    FROM activity_logs 
-                    WHERE session_id = ? AND timestamp > ?
+                    SELECT action_type, SUM(action_count) as count
+                    FROM (
+                        SELECT CASE WHEN action_type_is_null THEN NULL ELSE action_type END AS action_type, action_count
+                        FROM activity_action_daily_rollup
+                        WHERE session_id = ? AND day > ?
+                        UNION ALL
+                        SELECT action_type, COUNT(*)
+                        FROM activity_logs
+                        WHERE session_id = ? AND timestamp > ? AND timestamp < ? AND DATE(timestamp) = ?
+                        GROUP BY action_type
+                    )
                     GROUP BY action_type
+                    HAVING count > 0
                     ORDER BY count DESC
                     LIMIT 5
-                """, (session_id, since.isoformat())).fetchall()
+                """, (session_id, since_day, session_id, since.isoformat(), next_day, since_day)).fetchall()
                 
                 return {
                     "session_id": session_id,
@@ -174,43 +566,145 @@
                 "top_action_types": []
             }
     
+    def _get_retention_engine(self):
+        """Get the chunked retention engine used by cleanup_old_data"""
+        engine = self.__dict__.get('_retention_engine')
+        if engine is None:
+            from core.retention import RetentionEngine
+            engine = self.__dict__.setdefault('_retention_engine', RetentionEngine(self._connection_factory("retention")))
+        return engine
+    
+    def configure_retention(self, policies=None, chunk_size: int = 1000, pause: float = 0.01,
+                            archive_dir: str = None, archive_format: str = "jsonl"):
+        """Replace the retention policies and chunking used by cleanup_old_data
+        
+        archive_format "columnar" archives pruned rows as core.columnar
+        segments, which get_archived_statistics and import_columnar read.
+        """
+        from core.retention import DEFAULT_POLICIES, RetentionEngine
+        
+        self._retention_engine = RetentionEngine(
+            self._connection_factory("retention"),
+            policies=DEFAULT_POLICIES if policies is None else policies,
+            chunk_size=chunk_size,
+            pause=pause,
+            archive_dir=archive_dir,
+            archive_format=archive_format
+        )
+    
+    def export_columnar(self, table: str, path: str, since: datetime = None, until: datetime = None,
+                        session_id: str = None, batch_size: int = 50000) -> Dict[str, Any]:
+        """Stream a table, or a time/session range of it, into a columnar segment at path"""
+        from core.columnar import TIME_COLUMNS, export_table
+        
+        try:
+            if table not in TIME_COLUMNS:
+                raise ValueError(f"Cannot export table {table}")
+            self._flush_pending_writes(session_id)
+            
+            return export_table(
+                self._connection_factory("export_columnar"), table, path, TIME_COLUMNS[table],
+                since=since.isoformat() if since else None,
+                until=until.isoformat() if until else None,
+                session_id=session_id, batch_size=batch_size
+            )
+            
+        except Exception as e:
+            self.logger.error(f"Failed to export {table}: {e}")
+            return {"table": table, "rows": 0, "error": str(e)}
+    
+    def import_columnar(self, path: str, session_filter=None) -> Dict[str, Any]:
+        """Load archived segments under path back into their tables
+        
+        Rows keep their original ids, and the rollup triggers make them
+        visible to get_session_statistics. Rows whose id is already taken are
+        skipped and reported per table under "conflicts"; re-importing the
+        same archive reports every row that way. session_filter(session_id)
+        limits the import to the sessions it accepts. Note that
+        cleanup_old_data will prune imported rows again once expired.
+        """
+        from core.columnar import ColumnarSegment, find_segments, import_segment
+        
+        imported: Dict[str, int] = {}
+        conflicts: Dict[str, int] = {}
+        try:
+            for segment_path in find_segments(path):
+                with ColumnarSegment(segment_path) as segment, self._connection(label="import_columnar") as conn:
+                    counts = import_segment(conn, segment, session_filter=session_filter)
+                imported[segment.table] = imported.get(segment.table, 0) + counts["imported"]
+                conflicts[segment.table] = conflicts.get(segment.table, 0) + counts["conflicts"]
+            if any(conflicts.values()):
+                self.logger.warning(f"Skipped archived rows whose ids already exist: {conflicts}")
+            return {"imported": imported, "conflicts": conflicts}
+            
+        except Exception as e:
+            self.logger.error(f"Failed to import archive {path}: {e}")
+            return {"imported": imported, "conflicts": conflicts, "error": str(e)}
+    
+    def get_archived_statistics(self, archive_dir: str, session_id: str,
+                                since: datetime = None, until: datetime = None) -> Dict[str, Any]:
+        """Activity statistics for a session computed directly from columnar archive segments"""
+        from core.columnar import ColumnarSegment, activity_statistics, find_segments
+        
+        try:
+            segments = [ColumnarSegment(path) for path in find_segments(archive_dir, "activity_logs")]
+            try:
+                stats = activity_statistics(segments, session_id, since, until)
+            finally:
+                for segment in segments:
+                    segment.close()
+            stats["segments"] = len(segments)
+            return stats
+            
+        except Exception as e:
+            self.logger.error(f"Failed to get archived statistics: {e}")
+            return {
+                "session_id": session_id,
+                "error": str(e),
+                "activity_statistics": {},
+                "top_action_types": []
+            }
+    
+    def enable_incremental_vacuum(self) -> bool:
+        """One-off switch to auto_vacuum=INCREMENTAL (rewrites the database file)"""
+        
+        try:
+            enabled = self._get_retention_engine().enable_incremental_vacuum()
+            if enabled:
+                self.logger.info("Incremental vacuum enabled")
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"Failed to enable incremental vacuum: {e}")
+            return False
+    
+    def _cleanup_result(self, report: Dict[str, Any], days: int) -> Dict[str, Any]:
+        """Summarize a retention report as the cleanup_old_data result"""
+        cutoff_date = datetime.now() - timedelta(days=days)
+        tables = report["tables"]
+        
+        self.logger.info(
+            f"Cleanup completed: {report['rows_deleted']} rows in {report['duration_seconds']:.2f}s, "
+            f"max lock hold {report['max_lock_hold_ms']:.1f}ms, max lock wait {report['max_lock_wait_ms']:.1f}ms"
+        )
+        return {
+            "activities_deleted": tables.get("activity_logs", {}).get("deleted", 0),
+            "notes_deleted": tables.get("session_notes", {}).get("deleted", 0),
+            "tasks_deleted": tables.get("tasks", {}).get("deleted", 0),
+            "cutoff_date": cutoff_date.isoformat(),
+            "retention": report
+        }
+    
     def cleanup_old_data(self, days: int = 30) -> Dict[str, int]:
         """Clean up old session data"""
         
         try:
-            cutoff_date = datetime.now() - timedelta(days=days)
-            
-            with sqlite3.connect(self.db_path) as conn:
-                # Clean up old activity logs
-                activities_deleted = conn.execute("""
-                    DELETE FROM activity_logs 
-                    WHERE timestamp < ?
-                """, (cutoff_date.isoformat(),)).rowcount
-                
-                # Clean up old session notes (keep manual notes longer)
-                notes_deleted = conn.execute("""
-                    DELETE FROM session_notes 
-                    WHERE timestamp < ? AND note_type != 'manual'
-                """, (cutoff_date.isoformat(),)).rowcount
-                
-                # Clean up completed tasks older than cutoff
-                tasks_deleted = conn.execute("""
-                    DELETE FROM tasks 
-                    WHERE completed_at < ? AND status = 'completed'
-                """, (cutoff_date.isoformat(),)).rowcount
-                
-                conn.commit()
-                
-                cleanup_result = {
-                    "activities_deleted": activities_deleted,
-                    "notes_deleted": notes_deleted,
-                    "tasks_deleted": tasks_deleted,
-                    "cutoff_date": cutoff_date.isoformat()
-                }
-                
-                self.logger.info(f"Cleanup completed: {cleanup_result}")
-                return cleanup_result
-                
+            self._flush_pending_writes()
+            
+            # Deletes run in short chunked transactions instead of one long write lock
+            report = self._get_retention_engine().run(days)
+            return self._cleanup_result(report, days)
+            
         except Exception as e:
             self.logger.error(f"Failed to cleanup old data: {e}")
             return {
@@ -226,8 +720,22 @@
             # Perform any final cleanup
             self.logger.info("Session manager closing...")
             
-            # Could add connection pooling cleanup here if needed
-            # For now, sqlite3 connections are closed automatically
+            # Write out buffered activity before anything else shuts down
+            buffer = self.__dict__.pop('_write_buffer', None)
+            if buffer is not None:
+                flushed = buffer.close()
+                self.logger.info(f"Flushed {flushed} buffered rows")
+            
+            # Let queued async calls finish before the pool goes away
+            executor = self.__dict__.pop('_db_executor', None)
+            if executor is not None:
+                await executor.close()
+            
+            # Drain the connection pool; the next query opens a fresh one
+            pool = self.__dict__.pop('_pool', None)
+            if pool is not None:
+                closed = pool.close()
+                self.logger.info(f"Closed {closed} pooled database connections")
             
             self.logger.info("Session manager closed successfully")
             
@@ -238,7 +746,9 @@
         """Get database information and statistics"""
         
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            self._flush_pending_writes()
+            
+            with self._connection(label="get_database_info") as conn:
                 # Get table counts
                 activity_count = conn.execute("SELECT COUNT(*) FROM activity_logs").fetchone()[0]
                 notes_count = conn.execute("SELECT COUNT(*) FROM session_notes").fetchone()[0]
@@ -256,6 +766,11 @@
                     SELECT MAX(timestamp) FROM activity_logs
                 """).fetchone()[0]
                 
+                from core.migrations import explain_query_plans, get_schema_version
+                
+                schema_version = get_schema_version(conn)
+                query_plans = explain_query_plans(conn)
+                
                 return {
                     "database_path": self.db_path,
                     "database_size_bytes": db_size,
@@ -268,6 +783,10 @@
                         "oldest_activity": oldest_activity,
                         "newest_activity": newest_activity
                     },
+                    "schema_version": schema_version,
+                    "query_plans": query_plans,
+                    "connection_pool": self._get_pool().get_stats(),
+                    "write_buffer": self._get_write_buffer().get_stats(),
                     "status": "healthy"
                 }
                 
@@ -0,0 +1,555 @@
+"""
+Session store sharded across several SQLite files.
+
+Every session lives in exactly one shard, chosen by a stable hash of its
+session_id, so each shard has its own writer lock, connection pool and
+write buffer and independent sessions never wait on each other. Calls
+scoped to one session go straight to its shard. Store-wide calls
+(``get_database_info``, ``cleanup_old_data``, unscoped task queries) run
+on every shard in parallel and their results are merged.
+
+Shards are chosen with jump consistent hashing: growing from N to N+1
+shards moves only about 1/(N+1) of the sessions. Changing the shard count
+means rewriting the data offline with ``rebalance``:
+
+    python -m core.sharding rebalance storage/sessions.db --from 4 --to 8
+"""
+
+import argparse
+import asyncio
+import functools
+import hashlib
+import logging
+import os
+import sqlite3
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Tables whose rows belong to one session and move with it
+SHARDED_TABLES = ("activity_logs", "session_notes", "tasks")
+
+# SessionManager methods whose first argument is the session_id
+SESSION_SCOPED_METHODS = frozenset([
+    "queue_activity", "queue_note", "log_activity", "add_session_note",
+    "get_recent_activity", "get_recent_activity_async",
+    "get_session_statistics", "get_session_statistics_async",
+    "get_activity_page", "iter_activity", "aiter_activity",
+])
+
+# SessionManager methods applied to every shard alike
+BROADCAST_METHODS = frozenset([
+    "add_activity_listener", "remove_activity_listener", "configure_write_buffer",
+    "configure_retention", "enable_incremental_vacuum",
+])
+
+
+def jump_hash(key: int, buckets: int) -> int:
+    """Jump consistent hash (Lamping & Veach) of a 64-bit key"""
+    b, j = -1, 0
+    while j < buckets:
+        b = j
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        j = int((b + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return b
+
+
+def shard_paths(db_path: str, shards: int) -> List[str]:
+    """Shard file names derived from the unsharded database path"""
+    root, ext = os.path.splitext(db_path)
+    return [f"{root}.shard{index:02d}of{shards:02d}{ext or '.db'}" for index in range(shards)]
+
+
+class ShardRouter:
+    """Maps session ids to shard indexes"""
+
+    def __init__(self, shards: int):
+        if shards < 1:
+            raise ValueError("At least one shard is required")
+        self.shards = shards
+
+    def shard_for(self, session_id: str) -> int:
+        """Shard index for a session; stable across processes and restarts"""
+        digest = hashlib.blake2b(str(session_id).encode("utf-8"), digest_size=8).digest()
+        return jump_hash(int.from_bytes(digest, "big"), self.shards)
+
+
+class ShardedSessionManager:
+    """SessionManager-compatible facade over one SessionManager per shard"""
+
+    def __init__(self, db_path: str, shards: int = 4,
+                 manager_factory: Callable[[str], Any] = None, max_workers: int = None):
+        if manager_factory is None:
+            from core.session_manager import SessionManager
+            manager_factory = SessionManager
+
+        self.db_path = db_path
+        self.router = ShardRouter(shards)
+        self.paths = shard_paths(db_path, shards)
+        self.managers = [manager_factory(path) for path in self.paths]
+        self._pool = ThreadPoolExecutor(max_workers=max_workers or shards,
+                                        thread_name_prefix="session-shard")
+
+    def shard(self, session_id: str):
+        """The SessionManager holding a session"""
+        return self.managers[self.router.shard_for(session_id)]
+
+    def __getattr__(self, name: str):
+        if name in SESSION_SCOPED_METHODS:
+            def routed(session_id, *args, **kwargs):
+                return getattr(self.shard(session_id), name)(session_id, *args, **kwargs)
+            routed.__name__ = name
+            return routed
+        if name in BROADCAST_METHODS:
+            def broadcast(*args, **kwargs):
+                results = [getattr(manager, name)(*args, **kwargs) for manager in self.managers]
+                return all(results) if name == "enable_incremental_vacuum" else None
+            broadcast.__name__ = name
+            return broadcast
+        raise AttributeError(f"{type(self).__name__} has no attribute {name!r}")
+
+    def fan_out(self, method: str, *args, **kwargs) -> List[Any]:
+        """Call a method on every shard in parallel; results in shard order"""
+        futures = [
+            self._pool.submit(getattr(manager, method), *args, **kwargs)
+            for manager in self.managers
+        ]
+        return [future.result() for future in futures]
+
+    async def fan_out_async(self, method: str, *args, **kwargs) -> List[Any]:
+        """Await fan_out without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, lambda: self.fan_out(method, *args, **kwargs))
+
+    # Tasks -------------------------------------------------------------
+
+    def get_tasks(self, session_id: str = None, status: str = None) -> List[Dict]:
+        """Get tasks with optional filtering, newest first"""
+        if session_id:
+            return self.shard(session_id).get_tasks(session_id, status)
+        tasks = [task for shard in self.fan_out("get_tasks", None, status) for task in shard]
+        tasks.sort(key=lambda task: task["created_at"] or "", reverse=True)
+        return tasks
+
+    def get_tasks_page(self, session_id: str = None, status: str = None,
+                       limit: int = 100, cursor: str = None) -> Dict[str, Any]:
+        """One page of tasks, newest first; the keyset cursor works across shards"""
+        if session_id:
+            return self.shard(session_id).get_tasks_page(session_id, status, limit, cursor)
+
+        from core.records import desc_key, encode_cursor
+
+        pages = self.fan_out("get_tasks_page", None, status, limit, cursor)
+        errors = [page["error"] for page in pages if "error" in page]
+        merged = sorted((task for page in pages for task in page["tasks"]),
+                        key=lambda task: desc_key(task.created_at, task.id), reverse=True)
+        tasks = merged[:limit]
+        next_cursor = None
+        # More remain if a shard has further pages or rows were cut from this one
+        if tasks and (len(merged) > limit or any(page["next_cursor"] for page in pages)):
+            next_cursor = encode_cursor((tasks[-1].created_at, tasks[-1].id))
+
+        page = {"tasks": tasks, "next_cursor": next_cursor}
+        if errors:
+            page["error"] = "; ".join(errors)
+        return page
+
+    def iter_tasks(self, session_id: str = None, status: str = None, batch_size: int = 500):
+        """Stream tasks newest first, fetching batch_size rows at a time"""
+        from core.records import check_page
+
+        cursor = None
+        while True:
+            page = check_page(self.get_tasks_page(session_id, status, batch_size, cursor))
+            yield from page["tasks"]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return
+
+    def update_task_status(self, task_id: str, status: str) -> bool:
+        """Update task status on whichever shard holds the task"""
+        return any(self.fan_out("update_task_status", task_id, status))
+
+    def delete_task(self, task_id: str) -> bool:
+        """Delete a task from whichever shard holds it"""
+        return any(self.fan_out("delete_task", task_id))
+
+    # Search ------------------------------------------------------------
+
+    def _search(self, method: str, query: str, session_id: str, limit: int,
+                cursor: str, **kwargs) -> Dict[str, Any]:
+        if session_id:
+            return getattr(self.shard(session_id), method)(
+                query, session_id=session_id, limit=limit, cursor=cursor, **kwargs)
+
+        from core.records import decode_cursor
+        from core.search import merge_pages
+
+        # Each shard pages through its own ranking; the cursor keeps one
+        # position per shard ("" before its first page, None once exhausted)
+        cursors = list(decode_cursor(cursor)) if cursor else [""] * len(self.managers)
+        if len(cursors) != len(self.managers):
+            return {"results": [], "next_cursor": None,
+                    "error": f"Search cursor is for {len(cursors)} shards, not {len(self.managers)}"}
+        futures = [
+            self._pool.submit(getattr(manager, method), query, limit=limit,
+                              cursor=position or None, **kwargs)
+            if position is not None else None
+            for manager, position in zip(self.managers, cursors)
+        ]
+        pages = [future.result() if future is not None else None for future in futures]
+        return merge_pages(pages, cursors, limit)
+
+    def search_activity(self, query: str, session_id: str = None, action_type: str = None,
+                        limit: int = 20, cursor: str = None, raw: bool = False) -> Dict[str, Any]:
+        """Search activity across shards, best matches first"""
+        return self._search("search_activity", query, session_id, limit, cursor,
+                            action_type=action_type, raw=raw)
+
+    def search_notes(self, query: str, session_id: str = None, note_type: str = None,
+                     limit: int = 20, cursor: str = None, raw: bool = False) -> Dict[str, Any]:
+        """Search session notes across shards, best matches first"""
+        return self._search("search_notes", query, session_id, limit, cursor,
+                            note_type=note_type, raw=raw)
+
+    # Store-wide operations --------------------------------------------
+
+    def export_columnar(self, table: str, path: str, since=None, until=None,
+                        session_id: str = None, batch_size: int = 50000) -> Dict[str, Any]:
+        """Export each shard into its own segment under path (one shard for a single session)"""
+        if session_id:
+            return self.shard(session_id).export_columnar(
+                table, path, since, until, session_id, batch_size)
+
+        futures = [
+            self._pool.submit(manager.export_columnar, table,
+                              os.path.join(path, f"shard{index:02d}"), since, until, None, batch_size)
+            for index, manager in enumerate(self.managers)
+        ]
+        results = [future.result() for future in futures]
+        merged: Dict[str, Any] = {
+            "table": table,
+            "rows": sum(result.get("rows", 0) for result in results),
+            "shards": results
+        }
+        errors = [result["error"] for result in results if "error" in result]
+        if errors:
+            merged["error"] = "; ".join(errors)
+        return merged
+
+    def import_columnar(self, path: str) -> Dict[str, Any]:
+        """Import archived segments, sending each row to the shard that owns its session"""
+        futures = [
+            self._pool.submit(manager.import_columnar, path,
+                              functools.partial(self._owned_by, index))
+            for index, manager in enumerate(self.managers)
+        ]
+        results = [future.result() for future in futures]
+        merged: Dict[str, Any] = {"imported": {}, "conflicts": {}}
+        for result in results:
+            for key in ("imported", "conflicts"):
+                for table, count in result.get(key, {}).items():
+                    merged[key][table] = merged[key].get(table, 0) + count
+        errors = [result["error"] for result in results if "error" in result]
+        if errors:
+            merged["error"] = "; ".join(errors)
+        return merged
+
+    def _owned_by(self, index: int, session_id: Optional[str]) -> bool:
+        return self.router.shard_for(session_id) == index
+
+    def get_archived_statistics(self, archive_dir: str, session_id: str,
+                                since=None, until=None) -> Dict[str, Any]:
+        """Archived activity statistics, computed by the shard that owns the session"""
+        return self.shard(session_id).get_archived_statistics(archive_dir, session_id, since, until)
+
+    def cleanup_old_data(self, days: int = 30) -> Dict[str, Any]:
+        """Clean up old data on every shard in parallel"""
+        results = self.fan_out("cleanup_old_data", days)
+        merged: Dict[str, Any] = {
+            key: sum(result.get(key, 0) for result in results)
+            for key in ("activities_deleted", "notes_deleted", "tasks_deleted")
+        }
+        cutoffs = [result["cutoff_date"] for result in results if result.get("cutoff_date")]
+        if cutoffs:
+            merged["cutoff_date"] = min(cutoffs)
+        errors = [result["error"] for result in results if "error" in result]
+        if errors:
+            merged["error"] = "; ".join(errors)
+        merged["shards"] = results
+        return merged
+
+    def get_database_info(self) -> Dict[str, Any]:
+        """Get database information and statistics summed over every shard"""
+        infos = self.fan_out("get_database_info")
+        healthy = [info for info in infos if info.get("status") == "healthy"]
+
+        table_counts: Dict[str, int] = {}
+        for info in healthy:
+            for table, count in info.get("table_counts", {}).items():
+                table_counts[table] = table_counts.get(table, 0) + count
+
+        oldest = [info["date_range"]["oldest_activity"] for info in healthy
+                  if info.get("date_range", {}).get("oldest_activity")]
+        newest = [info["date_range"]["newest_activity"] for info in healthy
+                  if info.get("date_range", {}).get("newest_activity")]
+
+        return {
+            "database_path": self.db_path,
+            "shard_count": len(self.managers),
+            "database_size_bytes": sum(info.get("database_size_bytes", 0) for info in healthy),
+            "table_counts": table_counts,
+            "date_range": {
+                "oldest_activity": min(oldest) if oldest else None,
+                "newest_activity": max(newest) if newest else None
+            },
+            "shards": infos,
+            "status": "healthy" if len(healthy) == len(infos) else "degraded"
+        }
+
+    async def update_task_status_async(self, task_id: str, status: str) -> bool:
+        """Awaitable variant of update_task_status"""
+        return any(await self.fan_out_async("update_task_status", task_id, status))
+
+    async def delete_task_async(self, task_id: str) -> bool:
+        """Awaitable variant of delete_task"""
+        return any(await self.fan_out_async("delete_task", task_id))
+
+    async def get_tasks_async(self, session_id: str = None, status: str = None) -> List[Dict]:
+        """Awaitable variant of get_tasks"""
+        if session_id:
+            return await self.shard(session_id).get_tasks_async(session_id, status)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.get_tasks, None, status)
+
+    async def cleanup_old_data_async(self, days: int = 30) -> Dict[str, Any]:
+        """Awaitable variant of cleanup_old_data"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.cleanup_old_data, days)
+
+    async def get_database_info_async(self) -> Dict[str, Any]:
+        """Awaitable variant of get_database_info"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.get_database_info)
+
+    async def close(self):
+        """Close every shard"""
+        await asyncio.gather(*(manager.close() for manager in self.managers))
+        self._pool.shutdown(wait=True)
+
+
+def _base_table_sql(conn: sqlite3.Connection) -> Dict[str, str]:
+    placeholders = ", ".join("?" for _ in SHARDED_TABLES)
+    rows = conn.execute(
+        f"SELECT name, sql FROM sqlite_master WHERE type = 'table' AND name IN ({placeholders})",
+        SHARDED_TABLES
+    ).fetchall()
+    return dict(rows)
+
+
+def _derived_tables() -> set:
+    """Tables the migrations build from the sharded ones (rollups, search indexes)"""
+    from core.migrations import ROLLUPS, SEARCH_INDEXES
+
+    derived = {"schema_migrations"} | {rollup for _, rollup, _, _, _ in ROLLUPS}
+    for _, fts, _ in SEARCH_INDEXES:
+        derived.update([fts] + [f"{fts}_{shadow}" for shadow in ("data", "idx", "content", "docsize", "config")])
+    return derived
+
+
+def _unsharded_tables(conn: sqlite3.Connection, known: set) -> List[str]:
+    """Tables rebalance would not carry over to the new shards"""
+    return [
+        name for (name,) in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")
+        if name not in known
+    ]
+
+
+def _copy_columns(conn: sqlite3.Connection, table: str) -> Tuple[Optional[str], List[str]]:
+    """The INTEGER PRIMARY KEY column (if any) and the other columns to copy"""
+    row_id, columns = None, []
+    for _, name, col_type, _, _, pk in conn.execute(f"PRAGMA table_info({table})"):
+        if pk == 1 and col_type.upper() == "INTEGER":
+            row_id = name
+        else:
+            columns.append(name)
+    return row_id, columns
+
+
+def _copy_rows(conn: sqlite3.Connection, table: str, index: int) -> int:
+    """Copy one table's rows for shard index; returns how many got a new row id
+
+    Row ids are kept unless the target already holds that id (copied from
+    another source shard), in which case the row is given a fresh one.
+    """
+    row_id, columns = _copy_columns(conn, table)
+    column_list = ", ".join(columns)
+    if row_id is None:
+        conn.execute(
+            f"INSERT INTO shard{index}.{table} ({column_list}) "
+            f"SELECT {column_list} FROM main.{table} WHERE shard_of(session_id) = ?",
+            (index,)
+        )
+        return 0
+
+    conn.execute(
+        f"CREATE TEMP TABLE clashing_ids AS SELECT {row_id} AS id FROM main.{table} "
+        f"WHERE shard_of(session_id) = ? AND {row_id} IN (SELECT {row_id} FROM shard{index}.{table})",
+        (index,)
+    )
+    try:
+        conn.execute(
+            f"INSERT INTO shard{index}.{table} ({row_id}, {column_list}) "
+            f"SELECT {row_id}, {column_list} FROM main.{table} "
+            f"WHERE shard_of(session_id) = ? AND {row_id} NOT IN (SELECT id FROM temp.clashing_ids) "
+            f"ORDER BY {row_id}",
+            (index,)
+        )
+        return conn.execute(
+            f"INSERT INTO shard{index}.{table} ({column_list}) "
+            f"SELECT {column_list} FROM main.{table} WHERE {row_id} IN (SELECT id FROM temp.clashing_ids) "
+            f"ORDER BY {row_id}"
+        ).rowcount
+    finally:
+        conn.execute("DROP TABLE temp.clashing_ids")
+
+
+def rebalance(source_paths: Sequence[str], target_paths: Sequence[str]) -> Dict[str, Any]:
+    """Copy every session from the source shards into a new set of shards
+
+    Offline: nothing may be writing to the source files. The targets must
+    not exist yet; the sources are left untouched, so switching over (or
+    back) is a matter of which paths the store is opened with.
+
+    Only SHARDED_TABLES move; a source holding any other table (besides
+    what the migrations rebuild) is refused rather than silently dropped.
+    Row ids are kept where they stay unique; rows whose id was already
+    taken by another source shard are renumbered and counted under
+    ``reassigned_ids``.
+    """
+    from core.migrations import apply_migrations
+
+    existing = [path for path in target_paths if os.path.exists(path)]
+    if existing:
+        raise FileExistsError(f"Target shards already exist: {existing}")
+
+    router = ShardRouter(len(target_paths))
+    source_counts = {table: 0 for table in SHARDED_TABLES}
+    target_counts = {table: 0 for table in SHARDED_TABLES}
+    reassigned = {table: 0 for table in SHARDED_TABLES}
+
+    first = sqlite3.connect(source_paths[0])
+    try:
+        schema = _base_table_sql(first)
+    finally:
+        first.close()
+
+    known = set(SHARDED_TABLES) | _derived_tables()
+    for source_path in source_paths:
+        conn = sqlite3.connect(source_path)
+        try:
+            unsharded = _unsharded_tables(conn, known)
+        finally:
+            conn.close()
+        if unsharded:
+            raise ValueError(f"{source_path} has tables rebalance does not copy: {', '.join(unsharded)}; "
+                             f"move or drop them before rebalancing")
+
+    for path in target_paths:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = sqlite3.connect(path)
+        try:
+            for table in SHARDED_TABLES:
+                if table in schema:
+                    conn.execute(schema[table])
+            conn.commit()
+        finally:
+            conn.close()
+
+    for source_path in source_paths:
+        conn = sqlite3.connect(source_path, isolation_level=None)
+        try:
+            conn.create_function("shard_of", 1, router.shard_for, deterministic=True)
+            for index, target_path in enumerate(target_paths):
+                conn.execute(f"ATTACH DATABASE ? AS shard{index}", (target_path,))
+
+            conn.execute("BEGIN")
+            for table in SHARDED_TABLES:
+                if table not in schema:
+                    continue
+                source_counts[table] += conn.execute(f"SELECT COUNT(*) FROM main.{table}").fetchone()[0]
+                for index in range(len(target_paths)):
+                    reassigned[table] += _copy_rows(conn, table, index)
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        logger.info(f"Copied {source_path} into {len(target_paths)} shards")
+
+    # Indexes, rollups and triggers are built once the data is in place
+    for path in target_paths:
+        conn = sqlite3.connect(path)
+        try:
+            apply_migrations(conn)
+            for table in SHARDED_TABLES:
+                if table in schema:
+                    target_counts[table] += conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        finally:
+            conn.close()
+
+    if source_counts != target_counts:
+        raise RuntimeError(f"Row counts differ after rebalance: {source_counts} -> {target_counts}")
+    for table, count in reassigned.items():
+        if count:
+            logger.warning(f"{count} {table} rows had ids already used by another shard and were renumbered")
+
+    return {
+        "sources": list(source_paths),
+        "targets": list(target_paths),
+        "rows": target_counts,
+        "reassigned_ids": reassigned
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="Session store shard maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("rebalance", help="rewrite the store into a different number of shards")
+    command.add_argument("db_path", help="unsharded database path the shard names derive from")
+    command.add_argument("--from", dest="source", type=int, required=True,
+                         help="current shard count (1 for an unsharded database)")
+    command.add_argument("--to", dest="target", type=int, required=True, help="new shard count")
+
+    route = commands.add_parser("route", help="show which shard holds a session")
+    route.add_argument("db_path")
+    route.add_argument("--shards", type=int, required=True)
+    route.add_argument("session_id")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.command == "route":
+        index = ShardRouter(args.shards).shard_for(args.session_id)
+        print(f"{index} {shard_paths(args.db_path, args.shards)[index]}")
+        return
+
+    sources = [args.db_path] if args.source == 1 else shard_paths(args.db_path, args.source)
+    missing = [path for path in sources if not os.path.exists(path)]
+    if missing:
+        sys.exit(f"Missing source shards: {missing}")
+
+    try:
+        report = rebalance(sources, shard_paths(args.db_path, args.target))
+    except (FileExistsError, ValueError) as e:
+        sys.exit(str(e))
+    for table, count in report["rows"].items():
+        renumbered = report["reassigned_ids"][table]
+        print(f"{table:15s} {count:10d} rows" + (f" ({renumbered} renumbered)" if renumbered else ""))
+    print(f"wrote {len(report['targets'])} shards: {', '.join(report['targets'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Background system metrics sampler shared by the orchestrator and executor.
+
+A daemon thread samples CPU, memory, disk and process counts every
+``interval`` seconds into a fixed-size ring buffer. Readers get the latest
+snapshot without blocking: CPU load is measured between consecutive samples
+rather than with ``psutil.cpu_percent(interval=1)``, which sleeps the caller
+(and with it the event loop) for a full second.
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+class SystemMetricsSampler:
+    """Samples system resources on a cadence into a ring buffer"""
+
+    def __init__(self, interval: float = 2.0, history: int = 300, disk_path: str = '/'):
+        self.interval = interval
+        self.disk_path = disk_path
+        self._samples: "deque[Dict[str, Any]]" = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start the sampling thread"""
+        if self._thread is not None:
+            return
+        psutil.cpu_percent(interval=None)  # prime the counter; the first reading is meaningless
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="system-metrics", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the sampling thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def _run(self):
+        # The first CPU reading covers the time since start() primed the
+        # counter, so give it a short window before sampling
+        delay = min(self.interval, 0.5)
+        while not self._stop.wait(delay):
+            try:
+                self.sample_now()
+            except Exception as e:
+                logger.error(f"System metrics sample failed: {e}")
+            delay = self.interval
+
+    def sample_now(self) -> Dict[str, Any]:
+        """Take one sample and append it to the ring buffer"""
+        sample = self._measure(cpu=True)
+        with self._lock:
+            self._samples.append(sample)
+        return sample
+
+    def _measure(self, cpu: bool) -> Dict[str, Any]:
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage(self.disk_path)
+        return {
+            "cpu_percent": psutil.cpu_percent(interval=None) if cpu else None,
+            "memory": {
+                "total": memory.total,
+                "available": memory.available,
+                "percent": memory.percent
+            },
+            "disk": {
+                "total": disk.total,
+                "free": disk.free,
+                "percent": disk.percent
+            },
+            "processes": len(psutil.pids()),
+            "timestamp": datetime.now().isoformat(),
+            "monotonic": time.monotonic()
+        }
+
+    def latest(self) -> Dict[str, Any]:
+        """Get the most recent sample
+
+        Before the first background sample there is no CPU measurement
+        window yet, so memory, disk and processes are read directly and
+        cpu_percent is None rather than a meaningless reading.
+        """
+        with self._lock:
+            if self._samples:
+                return self._samples[-1]
+        return self._measure(cpu=False)
+
+    def window(self, seconds: float) -> Dict[str, Any]:
+        """Average, percentiles and max of each metric over the last ``seconds``"""
+        cutoff = time.monotonic() - seconds
+        with self._lock:
+            samples = [s for s in self._samples if s["monotonic"] >= cutoff]
+        if not samples:
+            return {"samples": 0, "window_seconds": seconds}
+
+        series = {
+            "cpu_percent": [s["cpu_percent"] for s in samples],
+            "memory_percent": [s["memory"]["percent"] for s in samples],
+            "disk_percent": [s["disk"]["percent"] for s in samples],
+            "processes": [s["processes"] for s in samples],
+        }
+        result: Dict[str, Any] = {"samples": len(samples), "window_seconds": seconds}
+        for name, values in series.items():
+            ordered = sorted(values)
+            result[name] = {
+                "avg": sum(values) / len(values),
+                "p50": percentile(ordered, 0.50),
+                "p95": percentile(ordered, 0.95),
+                "max": ordered[-1]
+            }
+        return result
+
+
+_shared: Optional[SystemMetricsSampler] = None
+_shared_users = 0
+_shared_lock = threading.Lock()
+
+
+def acquire_sampler(interval: float = 2.0) -> SystemMetricsSampler:
+    """Get the process-wide sampler, starting it for the first user"""
+    global _shared, _shared_users
+    with _shared_lock:
+        if _shared is None:
+            _shared = SystemMetricsSampler(interval=interval)
+            _shared.start()
+        _shared_users += 1
+        return _shared
+
+
+def release_sampler():
+    """Drop one user of the shared sampler, stopping it after the last"""
+    global _shared, _shared_users
+    with _shared_lock:
+        if _shared is None:
+            return
+        _shared_users = max(0, _shared_users - 1)
+        if _shared_users == 0:
+            _shared.stop()
+            _shared = None
@@ -0,0 +1,162 @@
+"""
+Registry of MCP tools for the orchestrator.
+
+``config/mcp_tools.json`` is read once and indexed by tool name and safety
+level. Tools found by the MCP gateway's discovery are merged in and
+re-fetched only every ``tool_discovery.refresh_interval`` seconds. The
+merged catalog is served as prebuilt descriptor lists with a content-hash
+ETag, so a client holding the current ETag can skip the list entirely.
+Tool implementations are imported on first use rather than at startup.
+"""
+
+import hashlib
+import importlib
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Configuration-only fields not exposed to clients
+_PRIVATE_FIELDS = ("enabled", "implementation")
+
+
+class ToolRegistry:
+    """Indexed, versioned catalog of available tools"""
+
+    def __init__(self, config_path: str = "config/mcp_tools.json",
+                 discover: Callable[[], List[Dict]] = None, package: str = "mcp_tools"):
+        self.config_path = config_path
+        self.discover = discover
+        self.package = package
+
+        self._lock = threading.RLock()
+        self._config: Optional[Dict[str, Any]] = None
+        self._discovered_at = float("-inf")
+        self._implementations: Dict[str, Any] = {}
+
+        self._specs: Dict[str, Dict[str, Any]] = {}
+        self._descriptors: List[Dict[str, Any]] = []
+        self._by_level: Dict[str, List[Dict[str, Any]]] = {}
+        self.etag = ""
+        self.version = ""
+
+    def _load_config(self) -> Dict[str, Any]:
+        if self._config is None:
+            with open(self.config_path, encoding="utf-8") as f:
+                self._config = json.load(f)
+        return self._config
+
+    def _refresh(self):
+        """Build the indexes on first use and after each discovery interval"""
+        config = self._load_config()
+        interval = config.get("tool_discovery", {}).get("refresh_interval", 300)
+        if self._specs and (self.discover is None or time.monotonic() - self._discovered_at < interval):
+            return
+
+        with self._lock:
+            if self._specs and (self.discover is None or time.monotonic() - self._discovered_at < interval):
+                return
+
+            specs = {
+                tool["name"]: tool
+                for tool in config.get("available_tools", [])
+                if tool.get("enabled", True)
+            }
+            if self.discover is not None and config.get("tool_discovery", {}).get("auto_discover", True):
+                try:
+                    for tool in self.discover() or []:
+                        specs[tool["name"]] = tool
+                except Exception as e:
+                    logger.error(f"Tool discovery failed, serving configured tools: {e}")
+                self._discovered_at = time.monotonic()
+            self._index(specs, config.get("mcp_tools", {}).get("version", "0"))
+
+    def _index(self, specs: Dict[str, Dict[str, Any]], config_version: str):
+        descriptors = [
+            {key: value for key, value in spec.items() if key not in _PRIVATE_FIELDS}
+            for spec in specs.values()
+        ]
+        digest = hashlib.sha256(
+            json.dumps(descriptors, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()[:16]
+
+        by_level: Dict[str, List[Dict[str, Any]]] = {}
+        for descriptor in descriptors:
+            by_level.setdefault(descriptor.get("safety_level", "unknown"), []).append(descriptor)
+
+        if digest != self.etag.strip('"'):
+            logger.info(f"Tool catalog {config_version}+{digest}: {len(descriptors)} tools")
+        # Publish the new catalog; readers never see a mix of old and new indexes
+        self._specs, self._descriptors, self._by_level = specs, descriptors, by_level
+        self.version = f"{config_version}+{digest}"
+        self.etag = f'"{digest}"'
+
+    def descriptors(self, safety_level: str = None) -> List[Dict[str, Any]]:
+        """Tool descriptors, optionally only those at one safety level
+
+        The descriptor dicts are shared; treat them as read-only.
+        """
+        self._refresh()
+        if safety_level is None:
+            return list(self._descriptors)
+        return list(self._by_level.get(safety_level, []))
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        """Descriptor of one tool, or None"""
+        self._refresh()
+        spec = self._specs.get(name)
+        if spec is None:
+            return None
+        return {key: value for key, value in spec.items() if key not in _PRIVATE_FIELDS}
+
+    def versioned(self, etag: str = None, safety_level: str = None) -> Dict[str, Any]:
+        """Descriptors with their ETag, or just not_modified if etag is current"""
+        self._refresh()
+        current = self.etag
+        if etag is not None and etag == current:
+            return {"etag": current, "version": self.version, "not_modified": True}
+        return {
+            "etag": current,
+            "version": self.version,
+            "not_modified": False,
+            "tools": self.descriptors(safety_level)
+        }
+
+    def implementation(self, name: str) -> Any:
+        """Import a tool's implementation on first use
+
+        ``implementation`` in the tool's config names it as "module" or
+        "module:attribute"; by default it is the module ``<package>.<name>``.
+        """
+        implementation = self._implementations.get(name)
+        if implementation is not None:
+            return implementation
+
+        self._refresh()
+        spec = self._specs.get(name)
+        if spec is None:
+            raise KeyError(f"Unknown tool: {name}")
+
+        target = spec.get("implementation") or f"{self.package}.{name}"
+        module_name, _, attribute = target.partition(":")
+        with self._lock:
+            implementation = self._implementations.get(name)
+            if implementation is None:
+                implementation = importlib.import_module(module_name)
+                if attribute:
+                    implementation = getattr(implementation, attribute)
+                self._implementations[name] = implementation
+        return implementation
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get catalog size, version and loaded implementations"""
+        return {
+            "tools": len(self._specs),
+            "by_safety_level": {level: len(tools) for level, tools in self._by_level.items()},
+            "version": self.version,
+            "etag": self.etag,
+            "implementations_loaded": sorted(self._implementations)
+        }
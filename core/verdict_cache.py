@@ -0,0 +1,84 @@
+"""
+Bounded LRU cache for SafeExecutor validation verdicts.
+
+Entries are tied to a version stamp (e.g. the compiled rules fingerprint or
+the allowed directory list): the first lookup under a new stamp drops every
+entry computed under the old one. An optional TTL bounds how long a verdict
+that depends on the filesystem, such as a resolved symlink, can be reused.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+MISSING = object()
+
+
+class VerdictCache:
+    """Thread-safe LRU cache with stamp invalidation and optional expiry"""
+
+    def __init__(self, maxsize: int = 2048, ttl: float = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self.clock = clock
+
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._stamp: Hashable = None
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidations": 0}
+
+    def _check_stamp(self, stamp: Hashable):
+        if stamp != self._stamp:
+            if self._entries:
+                self._stats["invalidations"] += 1
+            self._entries.clear()
+            self._stamp = stamp
+
+    def get(self, key: Hashable, stamp: Hashable) -> Any:
+        """Get a cached verdict, or MISSING"""
+        with self._lock:
+            self._check_stamp(stamp)
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return MISSING
+
+            value, stored_at = entry
+            if self.ttl is not None and self.clock() - stored_at > self.ttl:
+                del self._entries[key]
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return MISSING
+
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return value
+
+    def put(self, key: Hashable, stamp: Hashable, value: Any):
+        """Store a verdict computed under ``stamp``"""
+        with self._lock:
+            self._check_stamp(stamp)
+            self._entries[key] = (value, self.clock())
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def clear(self):
+        """Drop every cached verdict"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get size and hit/miss counters"""
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+                **self._stats
+            }
@@ -0,0 +1,197 @@
+"""
+Write-behind buffer for high-volume session store inserts.
+
+Activity log and session note rows are collected in memory and written in
+one transaction per flush with ``executemany``, so a burst of actions costs
+one commit (and one fsync) instead of one per row. Buffers flush when they
+reach ``max_batch`` rows, every ``flush_interval`` seconds, and on close.
+"""
+
+import logging
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# How eagerly buffered rows reach disk
+DURABILITY_MODES = (
+    "batched",    # flush on size, interval or close; a crash loses at most one interval
+    "immediate",  # flush on every write; same durability as unbuffered inserts
+)
+
+BUFFERED_TABLES = ("activity_logs", "session_notes")
+
+
+def _is_transient(error: Exception) -> bool:
+    """Check whether a failed write is worth retrying later"""
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and ("locked" in message or "busy" in message)
+
+
+class WriteBuffer:
+    """Groups activity and note inserts into batched transactions"""
+
+    def __init__(self, connection_factory: Callable, max_batch: int = 500,
+                 flush_interval: float = 1.0, durability: str = "batched"):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown durability mode: {durability}")
+
+        self.connection_factory = connection_factory
+        self.max_batch = max(1, max_batch)
+        self.flush_interval = flush_interval
+        self.durability = durability
+        self.logger = logging.getLogger(__name__)
+
+        self._pending: List[Tuple[str, Dict[str, Any]]] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        self._stats = {"rows_written": 0, "rows_dropped": 0, "flushes": 0, "failed_flushes": 0}
+        self._table_columns: Dict[str, frozenset] = {}
+
+    def add(self, table: str, row: Dict[str, Any]):
+        """Queue one row for insertion into ``table``"""
+        if table not in BUFFERED_TABLES:
+            raise ValueError(f"Table is not buffered: {table}")
+
+        with self._lock:
+            self._pending.append((table, row))
+            pending = len(self._pending)
+
+        if self.durability == "immediate":
+            self.flush()
+        elif pending >= self.max_batch:
+            self._wakeup.set()
+            if pending >= self.max_batch * 4:
+                # The flusher is falling behind; push back on the writer
+                self.flush()
+        self._ensure_flusher()
+
+    def has_pending(self, session_id: str = None) -> bool:
+        """Check for rows not yet written, optionally for one session"""
+        with self._lock:
+            if session_id is None:
+                return bool(self._pending)
+            return any(row.get("session_id") == session_id for _, row in self._pending)
+
+    def sync(self, session_id: str = None) -> int:
+        """Make every row queued so far visible to readers"""
+        if self.has_pending(session_id):
+            return self.flush()
+        # Rows may already be swapped out by a flush that has not committed yet
+        with self._flush_lock:
+            return 0
+
+    def flush(self) -> int:
+        """Write every pending row in a single transaction"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+
+            # Group rows sharing a table and column set into one executemany
+            groups: Dict[Tuple[str, Tuple[str, ...]], List[Tuple]] = {}
+            for table, row in batch:
+                columns = tuple(row)
+                groups.setdefault((table, columns), []).append(tuple(row.values()))
+
+            try:
+                self._write(groups)
+                written = len(batch)
+            except Exception as e:
+                self._stats["failed_flushes"] += 1
+                if _is_transient(e):
+                    # Lock contention: keep the rows for the next flush
+                    self.logger.error(f"Failed to flush {len(batch)} buffered rows: {e}")
+                    with self._lock:
+                        self._pending[:0] = batch
+                    raise
+                # A row the schema rejects would fail forever; isolate it so the rest still land
+                written = self._write_groups_separately(groups)
+
+            self._stats["flushes"] += 1
+            self._stats["rows_written"] += written
+            return written
+
+    def _columns(self, conn, table: str) -> frozenset:
+        """Column names of a buffered table, read once from the schema"""
+        columns = self._table_columns.get(table)
+        if columns is None:
+            columns = frozenset(row[1] for row in conn.execute(f"PRAGMA table_info({table})"))
+            if columns:
+                self._table_columns[table] = columns
+        return columns
+
+    def _write(self, groups: Dict[Tuple[str, Tuple[str, ...]], List[Tuple]]):
+        """Insert grouped rows in one transaction"""
+        with self.connection_factory() as conn:
+            for (table, columns), rows in groups.items():
+                # Column names come from callers' keyword arguments; only real columns reach the SQL
+                unknown = set(columns) - self._columns(conn, table)
+                if unknown:
+                    raise ValueError(f"Unknown {table} columns: {sorted(unknown)}")
+                placeholders = ", ".join("?" for _ in columns)
+                names = ", ".join(f'"{column}"' for column in columns)
+                conn.executemany(f"INSERT INTO {table} ({names}) VALUES ({placeholders})", rows)
+
+    def _write_groups_separately(self, groups: Dict[Tuple[str, Tuple[str, ...]], List[Tuple]]) -> int:
+        """Insert each group in its own transaction, retrying a failed group row by row"""
+        written = 0
+        for key, rows in groups.items():
+            try:
+                self._write({key: rows})
+                written += len(rows)
+                continue
+            except Exception as e:
+                self.logger.warning(f"Retrying {len(rows)} buffered {key[0]} rows one by one: {e}")
+            for row in rows:
+                try:
+                    self._write({key: [row]})
+                    written += 1
+                except Exception as e:
+                    self._stats["rows_dropped"] += 1
+                    self.logger.error(f"Dropped a buffered {key[0]} row that could not be written: {e}")
+        return written
+
+    def _ensure_flusher(self):
+        """Start the interval flush thread on first use"""
+        if self._flusher is not None or self.durability == "immediate":
+            return
+        with self._lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._run_flusher,
+                                                 name="session-write-buffer", daemon=True)
+                self._flusher.start()
+
+    def _run_flusher(self):
+        """Flush on the interval, or early when a batch fills up"""
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                pass  # already logged; rows stay queued for the next attempt
+
+    def close(self) -> int:
+        """Stop the flush thread and write whatever is still buffered"""
+        self._stop.set()
+        self._wakeup.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=self.flush_interval + 5)
+            self._flusher = None
+        return self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get buffer depth and flush counters"""
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "durability": self.durability,
+            "max_batch": self.max_batch,
+            "flush_interval": self.flush_interval,
+            "pending_rows": pending,
+            **self._stats
+        }
@@ -0,0 +1,54 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# The session store tables as SessionManager creates them, before any migration
+SESSION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS activity_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT,
+    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+    action_type TEXT,
+    user_input TEXT,
+    result TEXT,
+    success BOOLEAN,
+    execution_time REAL
+);
+CREATE TABLE IF NOT EXISTS session_notes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT,
+    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+    note_type TEXT,
+    content TEXT
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    session_id TEXT,
+    title TEXT,
+    description TEXT,
+    priority TEXT,
+    status TEXT DEFAULT 'pending',
+    due_date TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    completed_at DATETIME,
+    automation_pattern TEXT,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+
+@pytest.fixture
+def session_db(tmp_path):
+    """Path of a fresh session store database with the unmigrated tables"""
+    path = str(tmp_path / "sessions.db")
+    conn = sqlite3.connect(path)
+    try:
+        conn.executescript(SESSION_SCHEMA)
+    finally:
+        conn.close()
+    return path
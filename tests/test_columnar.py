@@ -0,0 +1,83 @@
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+
+from core.columnar import ColumnarSegment, activity_statistics, export_table, import_segment
+
+TIMESTAMPS = [
+    "2024-01-02 03:04:05",               # SQLite CURRENT_TIMESTAMP
+    "2024-01-02T03:04:05",
+    "2024-01-02T03:04:05.123456",
+    "2024-01-02 03:04:05.5",
+    "2024-01-02T03:04:05+02:00",
+    "2024-01-02T03:04:05.250000-07:30",
+    "2024-01-02T03:04:05Z",
+    "2024-01-02",
+    "yesterday",
+    "",
+    None,
+    1700000000,
+]
+
+
+def factory(path):
+    @contextmanager
+    def connect():
+        conn = sqlite3.connect(path)
+        try:
+            yield conn
+        finally:
+            conn.close()
+    return connect
+
+
+def rows(conn, table="activity_logs"):
+    return conn.execute(f"SELECT id, session_id, timestamp, typeof(timestamp), action_type, success, "
+                        f"execution_time FROM {table} ORDER BY id").fetchall()
+
+
+@pytest.fixture
+def source(session_db):
+    conn = sqlite3.connect(session_db)
+    for index, timestamp in enumerate(TIMESTAMPS):
+        conn.execute("INSERT INTO activity_logs (session_id, timestamp, action_type, success, execution_time) "
+                     "VALUES (?, ?, ?, ?, ?)", ("s1", timestamp, "command", index % 2 == 0, index * 0.1))
+    conn.execute("INSERT INTO activity_logs (session_id, action_type) VALUES ('s2', 'chat')")
+    conn.commit()
+    conn.close()
+    return session_db
+
+
+def test_timestamps_round_trip(source, tmp_path):
+    export_table(factory(source), "activity_logs", str(tmp_path / "segment"), "timestamp", batch_size=5)
+
+    target = str(tmp_path / "restored.db")
+    with sqlite3.connect(source) as conn:
+        schema = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'activity_logs'").fetchone()[0]
+        expected = rows(conn)
+    with factory(target)() as conn, ColumnarSegment(str(tmp_path / "segment")) as segment:
+        conn.execute(schema)
+        assert import_segment(conn, segment) == {"imported": len(expected), "conflicts": 0}
+        assert rows(conn) == expected
+        assert import_segment(conn, segment) == {"imported": 0, "conflicts": len(expected)}
+
+
+def test_iter_rows_match_values(source, tmp_path):
+    export_table(factory(source), "activity_logs", str(tmp_path / "segment"), "timestamp")
+    with ColumnarSegment(str(tmp_path / "segment")) as segment:
+        columns = segment.columns
+        assert list(segment.iter_rows(batch_size=4)) == list(zip(*(segment.values(name) for name in columns)))
+        assert segment.values("timestamp")[:len(TIMESTAMPS) - 1] == TIMESTAMPS[:-1]
+
+
+def test_time_range_and_statistics_use_parsed_timestamps(source, tmp_path):
+    manifest = export_table(factory(source), "activity_logs", str(tmp_path / "segment"), "timestamp")
+    assert manifest["time_range"][0] == "2024-01-02T00:00:00"
+
+    with ColumnarSegment(str(tmp_path / "segment")) as segment:
+        since = datetime(2024, 1, 2)
+        stats = activity_statistics([segment], "s1", since, since + timedelta(days=1))
+    # "yesterday", "", NULL and the integer have no parsed time and fall outside any window
+    assert stats["activity_statistics"]["total_activities"] == 8
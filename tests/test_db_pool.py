@@ -0,0 +1,36 @@
+import threading
+
+import pytest
+
+from core.db_pool import ConnectionPool, PoolClosedError
+
+
+def test_stats_count_every_checkout_across_threads(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), max_size=2)
+    threads, rounds = 8, 200
+
+    def work():
+        for _ in range(rounds):
+            with pool.connection() as conn:
+                conn.execute("SELECT 1").fetchone()
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    stats = pool.get_stats()
+    assert stats["checkouts"] == threads * rounds
+    assert stats["opened"] == stats["open_connections"] <= 2
+    assert stats["waits"] <= stats["checkouts"]
+    assert pool.close() == stats["opened"]
+
+
+def test_closed_pool_refuses_checkouts(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"))
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE t (x)")
+    pool.close()
+    with pytest.raises(PoolClosedError):
+        pool.acquire()
@@ -0,0 +1,116 @@
+import os
+import shlex
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from core.command_parser import parse_command
+from core.inprocess_commands import CommandContext, PathNotAllowedError, prepare
+
+LINES = "".join(f"line {number} {'error' if number % 7 == 0 else 'ok'}\n" for number in range(1, 40))
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "root"
+    (root / "src" / "deep").mkdir(parents=True)
+    (root / "app.log").write_text(LINES)
+    (root / "notes.txt").write_text("Alpha\nbeta\nERROR here\nno newline at end")
+    (root / "src" / "main.py").write_text("import os\n# TODO: error handling\nprint('ok')\n")
+    (root / "src" / "deep" / "util.py").write_text("def error():\n    pass\n")
+    (root / ".hidden").write_text("secret\n")
+    (tmp_path / "outside.txt").write_text("outside\n")
+    return root
+
+
+def context(root: Path) -> CommandContext:
+    def validate_path(path):
+        resolved = Path(path).expanduser().resolve()
+        if resolved == root or root in resolved.parents:
+            return resolved
+        return None
+
+    return CommandContext(str(root), validate_path, lambda path: path.suffix != ".exe")
+
+
+def run_in_process(command, root):
+    output = prepare(parse_command(command), context(root))
+    assert output is not None, f"{command!r} was not served in-process"
+    stdout = b""
+    try:
+        while True:
+            stream, data = next(output)
+            if stream == "stdout":
+                stdout += data
+    except StopIteration as stop:
+        return stdout, stop.value or 0
+
+
+@pytest.mark.parametrize("command", [
+    "pwd",
+    "echo hello   world",
+    "echo -n no newline",
+    "cat app.log notes.txt",
+    "cat -n notes.txt",
+    "head app.log",
+    "head -n 3 app.log notes.txt",
+    "head -5 app.log",
+    "head -c 20 app.log",
+    "tail app.log",
+    "tail -n 2 notes.txt",
+    "tail -n +35 app.log",
+    "tail -c 7 notes.txt",
+    "tail -q -n 1 app.log notes.txt",
+    "ls",
+    "ls -a",
+    "ls -A1",
+    "ls -r src",
+    "ls -p . src",
+    "ls -d src",
+    "ls -l src",
+    "grep error app.log",
+    "grep -n -i error notes.txt app.log",
+    "grep -c error app.log",
+    "grep -v ok app.log",
+    "grep -w -o 'line 1' app.log",
+    "grep -x beta notes.txt",
+    "grep -l error app.log notes.txt",
+    "grep -L error app.log notes.txt",
+    "grep -F -e 'TODO:' -e pass -rn src",
+    "grep -E 'line (1|2)4' app.log",
+    "grep -m 2 -h error app.log",
+    "grep -q error app.log",
+    "grep missing app.log",
+])
+def test_matches_subprocess(tree, command):
+    argv = shlex.split(command)
+    if shutil.which(argv[0]) is None:
+        pytest.skip(f"{argv[0]} not installed")
+    env = dict(os.environ, LC_ALL="C")
+    expected = subprocess.run(argv, cwd=tree, capture_output=True, env=env)
+    assert run_in_process(command, tree) == (expected.stdout, expected.returncode)
+
+
+@pytest.mark.parametrize("command", [
+    "cat ../outside.txt",
+    "head /etc/hostname",
+    "tail -n 1 ~/../../etc/passwd",
+    "ls ..",
+    "grep outside ../outside.txt",
+    "cat link.txt",
+    "grep -r outside linked",
+    "ls linked",
+])
+def test_path_outside_allowed_dirs(tree, command):
+    (tree / "link.txt").symlink_to(tree.parent / "outside.txt")
+    (tree / "linked").symlink_to(tree.parent)
+    with pytest.raises(PathNotAllowedError, match="Path not allowed"):
+        prepare(parse_command(command), context(tree))
+
+
+def test_blocked_file_type(tree):
+    (tree / "tool.exe").write_bytes(b"MZ")
+    with pytest.raises(PathNotAllowedError, match="File type not allowed"):
+        prepare(parse_command("cat tool.exe"), context(tree))
@@ -0,0 +1,114 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from core import migrations
+from core.migrations import MIGRATIONS, apply_migrations, get_schema_version, window_totals
+
+# get_session_statistics before the rollups: one pass over the raw rows
+RAW_ACTIVITY_STATISTICS = """
+    SELECT COUNT(*), SUM(CASE WHEN success = 1 THEN 1 ELSE 0 END), AVG(execution_time),
+           SUM(execution_time), COUNT(DISTINCT DATE(timestamp))
+    FROM activity_logs WHERE session_id = ? AND timestamp > ?
+"""
+
+
+def activity_statistics(conn, session_id, since):
+    """The activity figures as get_session_statistics computes them"""
+    total, successful, active_days = window_totals(
+        conn, session_id, since,
+        "activity_daily_rollup", ["total", "successful", "total > 0"],
+        "activity_logs", "timestamp",
+        ["COUNT(*)", "SUM(CASE WHEN success = 1 THEN 1 ELSE 0 END)", "COUNT(*) > 0"])
+    time_avg, time_sum = conn.execute(
+        "SELECT AVG(execution_time), SUM(execution_time) FROM activity_logs "
+        "WHERE session_id = ? AND timestamp > ?", (session_id, since.isoformat())).fetchone()
+    return (total, successful, time_avg, time_sum, active_days)
+
+
+def add_activity(conn, session_id, when, execution_time, success=True, action_type="command"):
+    conn.execute("INSERT INTO activity_logs (session_id, timestamp, action_type, success, execution_time) "
+                 "VALUES (?, ?, ?, ?, ?)", (session_id, when.isoformat(), action_type, success, execution_time))
+
+
+@pytest.fixture
+def conn(session_db):
+    conn = sqlite3.connect(session_db)
+    yield conn
+    conn.close()
+
+
+def test_migrations_apply_once(conn):
+    assert apply_migrations(conn) == [version for version, _, _ in MIGRATIONS]
+    assert apply_migrations(conn) == []
+    assert get_schema_version(conn) == MIGRATIONS[-1][0]
+
+
+def test_search_migration_deferred_without_fts5(conn, monkeypatch):
+    monkeypatch.setattr(migrations, "fts5_available", lambda conn: False)
+    applied = apply_migrations(conn)
+    assert 4 not in applied and applied
+    monkeypatch.undo()
+    assert apply_migrations(conn) == [4]
+
+
+def test_statistics_match_raw_query(conn):
+    apply_migrations(conn)
+    now = datetime.now()
+    times = [0.1, 0.2, 0.3, 0.2, 0.0123456789, None, 1e-7, 2.5]
+    for day in range(10):
+        for index, execution_time in enumerate(times):
+            add_activity(conn, "s1", now - timedelta(days=day, hours=index * 2.5), execution_time,
+                         success=index % 3 != 0)
+    add_activity(conn, "s2", now, 9.75)
+    conn.commit()
+
+    for days in (1, 3, 7, 30):
+        since = now - timedelta(days=days)
+        expected = conn.execute(RAW_ACTIVITY_STATISTICS, ("s1", since.isoformat())).fetchone()
+        assert activity_statistics(conn, "s1", since) == expected
+
+
+def test_statistics_keep_full_precision(conn):
+    apply_migrations(conn)
+    now = datetime.now()
+    for execution_time in (0.2, 0.3, 0.3, 0.0123456789):
+        add_activity(conn, "s1", now - timedelta(hours=1), execution_time)
+    conn.commit()
+    _, _, time_avg, time_sum, _ = activity_statistics(conn, "s1", now - timedelta(days=7))
+    assert time_sum == 0.8123456789000001
+    assert time_avg == 0.20308641972500002
+
+
+def test_rollups_follow_updates_and_deletes(conn):
+    apply_migrations(conn)
+    now = datetime.now()
+    for hours in range(0, 96, 3):
+        add_activity(conn, "s1", now - timedelta(hours=hours), 0.5, success=hours % 2 == 0)
+    conn.execute("UPDATE activity_logs SET success = 1 WHERE id % 4 = 0")
+    conn.execute("UPDATE activity_logs SET timestamp = ? WHERE id % 5 = 0",
+                 ((now - timedelta(days=20)).isoformat(),))
+    conn.execute("DELETE FROM activity_logs WHERE id % 7 = 0")
+    conn.commit()
+
+    since = now - timedelta(days=3, hours=5)
+    expected = conn.execute(RAW_ACTIVITY_STATISTICS, ("s1", since.isoformat())).fetchone()
+    assert activity_statistics(conn, "s1", since) == expected
+
+
+def test_upgrade_from_microsecond_rollups(conn):
+    apply_migrations(conn, [migration for migration in MIGRATIONS if migration[0] <= 5])
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(activity_daily_rollup)")]
+    assert "execution_time_us" in columns
+    now = datetime.now()
+    for hours in range(0, 72, 5):
+        add_activity(conn, "s1", now - timedelta(hours=hours), 0.0123456789)
+    conn.commit()
+
+    assert apply_migrations(conn) == [6]
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(activity_daily_rollup)")]
+    assert columns == ["session_id", "day", "total", "successful"]
+    since = now - timedelta(days=2)
+    expected = conn.execute(RAW_ACTIVITY_STATISTICS, ("s1", since.isoformat())).fetchone()
+    assert activity_statistics(conn, "s1", since) == expected
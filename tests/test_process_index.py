@@ -0,0 +1,27 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from core.process_index import ProcessIndex, ProcFSSource
+
+pytestmark = pytest.mark.skipif(not os.path.isdir("/proc/self"), reason="needs procfs")
+
+
+def test_procfs_reads_process_group_not_session():
+    info = ProcFSSource().read(os.getpid())
+    assert info.pgid == os.getpgid(os.getpid())
+
+
+def test_group_members_finds_child_in_new_group():
+    # Own process group, parent's session: group and session ids differ
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"],
+                             preexec_fn=os.setpgrp)
+    try:
+        index = ProcessIndex(ProcFSSource(), max_age=0)
+        members = index.group_members(child.pid)
+        assert [info.pid for info in members] == [child.pid]
+    finally:
+        child.kill()
+        child.wait()
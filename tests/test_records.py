@@ -0,0 +1,69 @@
+import random
+import sqlite3
+
+import pytest
+
+from core.records import (PageError, check_page, decode_cursor, desc_key, encode_cursor,
+                          keyset_before)
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE tasks (id TEXT PRIMARY KEY, created_at TEXT)")
+    rng = random.Random(3)
+    # Few distinct timestamps, so ties on created_at are common, plus NULLs
+    stamps = ["2024-01-01 09:00:00", "2024-01-01 10:00:00", "2024-01-02 08:30:00", None]
+    conn.executemany("INSERT INTO tasks VALUES (?, ?)",
+                     [(f"task-{number:03d}", rng.choice(stamps)) for number in range(101)])
+    yield conn
+    conn.close()
+
+
+def pages(conn, limit):
+    """Page through tasks newest first the way get_tasks_page does"""
+    cursor = None
+    while True:
+        query, params = "SELECT id, created_at FROM tasks", []
+        if cursor:
+            clause, params = keyset_before("created_at", "id", decode_cursor(cursor))
+            query += f" WHERE {clause}"
+        rows = conn.execute(query + " ORDER BY created_at DESC, id DESC LIMIT ?", params + [limit]).fetchall()
+        yield rows
+        if len(rows) < limit:
+            return
+        cursor = encode_cursor((rows[-1][1], rows[-1][0]))
+
+
+@pytest.mark.parametrize("limit", [1, 7, 25, 101, 200])
+def test_keyset_pages_match_full_listing(conn, limit):
+    expected = conn.execute("SELECT id, created_at FROM tasks ORDER BY created_at DESC, id DESC").fetchall()
+    listed = [row for page in pages(conn, limit) for row in page]
+    assert listed == expected
+
+
+def test_desc_key_matches_sql_order(conn):
+    expected = conn.execute("SELECT id, created_at FROM tasks ORDER BY created_at DESC, id DESC").fetchall()
+    rows = conn.execute("SELECT id, created_at FROM tasks ORDER BY random()").fetchall()
+    assert sorted(rows, key=lambda row: desc_key(row[1], row[0]), reverse=True) == expected
+
+
+def test_cursor_round_trip():
+    position = ("2024-01-02T08:30:00.123456", "task-é/+=")
+    cursor = encode_cursor(position)
+    assert cursor.isascii()
+    assert decode_cursor(cursor) == position
+    assert decode_cursor(encode_cursor((None, 17))) == (None, 17)
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor", "!!!", "bnVsbA=="])
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError, match="Invalid page cursor"):
+        decode_cursor(cursor)
+
+
+def test_check_page():
+    page = {"tasks": [], "next_cursor": None}
+    assert check_page(page) is page
+    with pytest.raises(PageError, match="database is locked"):
+        check_page({"tasks": [], "next_cursor": None, "error": "database is locked"})
@@ -0,0 +1,137 @@
+import glob
+import gzip
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import SESSION_SCHEMA
+from core.columnar import ColumnarSegment, import_segment
+from core.retention import RetentionEngine
+
+
+def factory(path):
+    @contextmanager
+    def connect():
+        conn = sqlite3.connect(path, timeout=5.0)
+        try:
+            yield conn
+        finally:
+            conn.close()
+    return connect
+
+
+@pytest.fixture
+def store(session_db):
+    conn = sqlite3.connect(session_db)
+    now = datetime.now()
+    for day in range(60):
+        for number in range(5):
+            when = (now - timedelta(days=day, hours=12, minutes=number)).isoformat()
+            conn.execute("INSERT INTO activity_logs (session_id, timestamp, action_type) VALUES (?, ?, 'command')",
+                         (f"s{number}", when))
+    for day in (10, 40, 50):
+        when = (now - timedelta(days=day)).isoformat()
+        for note_type in ("manual", "auto_summary"):
+            conn.execute("INSERT INTO session_notes (session_id, timestamp, note_type, content) VALUES (?, ?, ?, ?)",
+                         ("s1", when, note_type, f"{note_type} {day}"))
+        for status in ("completed", "pending"):
+            conn.execute("INSERT INTO tasks (id, session_id, title, status, completed_at) VALUES (?, ?, ?, ?, ?)",
+                         (f"{status}-{day}", "s1", "task", status, when if status == "completed" else None))
+    conn.commit()
+    conn.close()
+    return session_db
+
+
+def expired_activity(path, days=30):
+    conn = sqlite3.connect(path)
+    try:
+        cutoff = (datetime.now() - timedelta(days=days)).isoformat()
+        cursor = conn.execute("SELECT * FROM activity_logs WHERE timestamp < ? ORDER BY id", (cutoff,))
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor]
+    finally:
+        conn.close()
+
+
+def test_lock_wait_reported_apart_from_hold(store):
+    blocker = sqlite3.connect(store, isolation_level=None, check_same_thread=False)
+    blocker.execute("BEGIN IMMEDIATE")
+    release = threading.Timer(0.3, blocker.execute, ("COMMIT",))
+    release.start()
+    try:
+        report = RetentionEngine(factory(store), pause=0, vacuum_pages=0).run(days=30)
+    finally:
+        release.join()
+        blocker.close()
+
+    assert report["tables"]["activity_logs"]["deleted"] == 30 * 5
+    assert report["max_lock_wait_ms"] >= 250
+    assert report["max_lock_hold_ms"] < 250
+    assert report["total_lock_wait_ms"] >= report["max_lock_wait_ms"]
+
+
+def test_policies_prune_in_chunks(store):
+    report = RetentionEngine(factory(store), chunk_size=7, pause=0).run(days=30)
+    tables = report["tables"]
+    assert tables["activity_logs"]["deleted"] == 150
+    assert tables["activity_logs"]["chunks"] == 22
+    # Manual notes and unfinished tasks never expire
+    assert tables["session_notes"]["deleted"] == 2
+    assert tables["tasks"]["deleted"] == 2
+
+    conn = sqlite3.connect(store)
+    assert conn.execute("SELECT COUNT(*) FROM activity_logs").fetchone()[0] == 150
+    assert sorted(row[0] for row in conn.execute("SELECT content FROM session_notes")) == \
+        ["auto_summary 10", "manual 10", "manual 40", "manual 50"]
+    assert sorted(row[0] for row in conn.execute("SELECT id FROM tasks")) == \
+        ["completed-10", "pending-10", "pending-40", "pending-50"]
+    conn.close()
+
+
+def test_jsonl_archive_holds_exactly_the_deleted_rows(store, tmp_path):
+    expected = expired_activity(store)
+    archive = tmp_path / "archive"
+    report = RetentionEngine(factory(store), chunk_size=40, pause=0, archive_dir=str(archive)).run(days=30)
+    assert report["tables"]["activity_logs"]["archived"] == len(expected) == 150
+
+    archived = []
+    for path in sorted(glob.glob(str(archive / "activity_logs" / "*.jsonl.gz"))):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f]
+        assert {row["timestamp"][:10] for row in rows} == {os.path.basename(path)[:10]}
+        archived.extend(rows)
+    assert sorted(archived, key=lambda row: row["id"]) == expected
+
+
+def test_columnar_archive_imports_back(store, tmp_path):
+    expected = expired_activity(store)
+    archive = tmp_path / "archive"
+    report = RetentionEngine(factory(store), chunk_size=40, pause=0, archive_dir=str(archive),
+                             archive_format="columnar").run(days=30)
+    segment_path = report["tables"]["activity_logs"]["archive_segment"]
+
+    restored = str(tmp_path / "restored.db")
+    with factory(restored)() as conn, ColumnarSegment(segment_path) as segment:
+        conn.executescript(SESSION_SCHEMA)
+        assert import_segment(conn, segment) == {"imported": 150, "conflicts": 0}
+        conn.commit()
+    assert expired_activity(restored) == expected
+
+
+def test_failed_delete_undoes_the_archive(store, tmp_path):
+    conn = sqlite3.connect(store)
+    conn.execute("CREATE TRIGGER refuse_delete BEFORE DELETE ON activity_logs "
+                 "BEGIN SELECT RAISE(ABORT, 'deletes refused'); END")
+    conn.commit()
+    conn.close()
+
+    archive = tmp_path / "archive"
+    with pytest.raises(sqlite3.IntegrityError, match="deletes refused"):
+        RetentionEngine(factory(store), pause=0, archive_dir=str(archive)).run(days=30)
+    assert len(expired_activity(store)) == 150
+    assert glob.glob(str(archive / "activity_logs" / "*")) == []
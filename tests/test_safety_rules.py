@@ -0,0 +1,107 @@
+import json
+import os
+
+import pytest
+
+from core.safety_rules import CompiledSafetyRules
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CWD = "/home/user"
+
+
+@pytest.fixture(scope="module")
+def rules():
+    with open(os.path.join(ROOT, "config", "safety_rules.json")) as f:
+        safety_rules = json.load(f)
+    with open(os.path.join(ROOT, "config", "settings.json")) as f:
+        blocked_commands = json.load(f)["security"]["blocked_commands"]
+    return CompiledSafetyRules(safety_rules, blocked_commands)
+
+
+@pytest.mark.parametrize("command", [
+    "r''m -rf /",
+    "r''m -rf build",
+    "s\"u\"do ls",
+    "sh -c 'rm -rf build'",
+    "bash -c 'shutdown now'",
+    "echo $(reboot)",
+    "echo `sudo ls`",
+    "ls /",
+    "cat ../../etc/passwd",
+    "cat ~/../../etc/shadow",
+    "ls ..//../../..",
+    "find . -exec rm -rf {} +",
+    "find . -name '*.tmp' -execdir rm -rf {} ';'",
+    "eval rm -rf build",
+    "eval 'sudo ls'",
+    "cat /e*/shadow",
+    "cat /e?c/passwd",
+    "cat ~/../../e*",
+    "cat /tmp/.*/etc/passwd",
+    "cat $HOME/../../etc/shadow",
+    "cat ${HOME}/../../etc/passwd",
+    "cat `pwd`/../../etc/passwd",
+    "cat /ETC/passwd",
+    "ls /Usr/Bin",
+    "cd .. && cd .. && cat etc/passwd",
+    "cd /tmp; cat ../etc/passwd",
+    "(cd /tmp) && cat ../etc/passwd",
+    "cd $DIR && cat ../x",
+    "cd - && ls",
+])
+def test_rejected_at_every_level(rules, command):
+    for level in ("low", "medium", "high"):
+        assert not rules.check(command, level, CWD)["safe"], level
+
+
+@pytest.mark.parametrize("command, level", [
+    ("ls /tmp", "low"),
+    ("cat ../README.md", "low"),
+    ("git add src/app.py", "medium"),
+    ("find . -name '*.py' -exec grep -n TODO {} +", "low"),
+    ("grep -rn error logs 2>/dev/null", "low"),
+    ("ls /tmp/*.log", "low"),
+    ("cat src/*.py docs/guide.{md,txt}", "low"),
+    ("cat ~/notes/*.md", "low"),
+    ("echo $HOME", "low"),
+    ("cat /DEV/NULL", "low"),
+    ("cd src && ls ..", "high"),
+])
+def test_accepted(rules, command, level):
+    assert rules.check(command, level, CWD)["safe"]
+
+
+def test_find_exec_ends_at_terminator(rules):
+    # "rm" after ";" is an argument to find, not a command it runs
+    assert rules.check("find . -exec echo {} ';' -name rm", "low", CWD)["safe"]
+
+
+def test_relative_paths_resolve_against_cwd(rules):
+    assert rules.check("cat ../passwd", "low", "/etc/ssl")["reason"].endswith(": /etc")
+    assert rules.check("cat ../passwd", "low", CWD)["safe"]
+
+
+@pytest.mark.parametrize("command", [
+    "find . -exec rm {} ;",
+    "find . -exec python x.py ;",
+    "find . -name '*.py' -execdir ls {} ; -exec touch {} +",
+    "find . -exec env rm x ;",
+    "xargs rm",
+])
+def test_low_checks_every_command_started(rules, command):
+    assert not rules.check(command, "low", CWD)["safe"]
+    assert rules.check(command, "high", CWD)["safe"]
+
+
+def test_in_place_edits_call_for_recompile():
+    safety_rules = {"command_validation": {"blacklist_patterns": ["rm -rf"]}}
+    blocked_commands = ["shutdown"]
+    rules = CompiledSafetyRules(safety_rules, blocked_commands)
+    assert rules.built_from(safety_rules, blocked_commands)
+    assert rules.built_from({"command_validation": {"blacklist_patterns": ["rm -rf"]}}, ["shutdown"])
+
+    safety_rules["command_validation"]["blacklist_patterns"].append("curl")
+    assert not rules.built_from(safety_rules, blocked_commands)
+    safety_rules["command_validation"]["blacklist_patterns"].pop()
+    blocked_commands.append("reboot")
+    assert not rules.built_from(safety_rules, blocked_commands)
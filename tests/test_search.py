@@ -0,0 +1,67 @@
+import sqlite3
+
+import pytest
+
+from core import migrations
+from core.migrations import apply_migrations
+from core.search import match_expression, search
+
+
+def fill(conn):
+    for number in range(60):
+        conn.execute(
+            "INSERT INTO activity_logs (session_id, timestamp, action_type, user_input, result) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (f"s{number % 3}", f"2024-01-{number % 28 + 1:02d}T10:00:00", "command",
+             f"grep error app{number}.log" if number % 2 else f"ls dir{number}",
+             "disk error" if number % 5 == 0 else "ok"))
+    conn.commit()
+
+
+@pytest.fixture(params=["fts5", "like"])
+def engine(request):
+    return request.param
+
+
+@pytest.fixture
+def conn(engine, session_db, monkeypatch):
+    conn = sqlite3.connect(session_db)
+    if engine == "like":
+        monkeypatch.setattr(migrations, "fts5_available", lambda conn: False)
+    elif not migrations.fts5_available(conn):
+        pytest.skip("SQLite built without FTS5")
+    apply_migrations(conn)
+    fill(conn)
+    yield conn
+    conn.close()
+
+
+def test_pages_cover_every_hit_once(conn, engine):
+    expected = {row[0] for row in conn.execute(
+        "SELECT id FROM activity_logs WHERE user_input LIKE '%error%' OR result LIKE '%error%'")}
+    seen, cursor = [], None
+    while True:
+        page = search(conn, "activity_logs", "error", limit=7, cursor=cursor)
+        assert page["engine"] == engine
+        seen.extend(hit.row_id for hit in page["results"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen))
+    assert set(seen) == expected
+
+
+def test_filters_and_snippets(conn):
+    page = search(conn, "activity_logs", "error", {"session_id": "s1"}, limit=100)
+    assert page["results"] and all(hit.session_id == "s1" for hit in page["results"])
+    assert all("[error]" in hit.snippet for hit in page["results"])
+    with pytest.raises(ValueError, match="Cannot filter"):
+        search(conn, "activity_logs", "error", {"user_input": "x"})
+    with pytest.raises(ValueError, match="empty"):
+        search(conn, "activity_logs", '  "" ')
+
+
+def test_match_expression():
+    assert match_expression('disk error*') == '"disk" AND "error"*'
+    assert match_expression('say "hi"') == '"say" AND "hi"'
+    assert match_expression("* **") == ""
@@ -0,0 +1,176 @@
+import asyncio
+import os
+import sqlite3
+from collections import Counter
+
+import pytest
+
+from conftest import SESSION_SCHEMA
+from core.migrations import apply_migrations
+from core.records import TASK_COLUMNS, TaskRecord, decode_cursor, encode_cursor, keyset_before
+from core.sharding import ShardedSessionManager, ShardRouter, rebalance, shard_paths
+
+SESSIONS = [f"session-{number:03d}" for number in range(40)]
+
+
+class TaskShard:
+    """The task queries of SessionManager over one shard file"""
+
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.executescript(SESSION_SCHEMA)
+
+    def add_task(self, task_id, session_id, created_at):
+        self.conn.execute("INSERT INTO tasks (id, session_id, title, created_at) VALUES (?, ?, ?, ?)",
+                          (task_id, session_id, task_id, created_at))
+
+    def get_tasks(self, session_id=None, status=None):
+        query = "SELECT id, session_id, created_at FROM tasks WHERE (? IS NULL OR session_id = ?)"
+        rows = self.conn.execute(query + " ORDER BY created_at DESC", (session_id, session_id))
+        return [dict(zip(("id", "session_id", "created_at"), row)) for row in rows]
+
+    def get_tasks_page(self, session_id=None, status=None, limit=100, cursor=None):
+        query = f"SELECT {', '.join(TASK_COLUMNS)} FROM tasks WHERE (? IS NULL OR session_id = ?)"
+        params = [session_id, session_id]
+        if cursor:
+            clause, values = keyset_before("created_at", "id", decode_cursor(cursor))
+            query += f" AND {clause}"
+            params.extend(values)
+        query += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        tasks = list(map(TaskRecord._make, self.conn.execute(query, params + [limit])))
+        next_cursor = encode_cursor((tasks[-1].created_at, tasks[-1].id)) if len(tasks) == limit else None
+        return {"tasks": tasks, "next_cursor": next_cursor}
+
+    async def close(self):
+        self.conn.close()
+
+
+def test_routing_is_stable_and_balanced():
+    router = ShardRouter(8)
+    keys = [f"session-{number}" for number in range(8000)]
+    placement = [router.shard_for(key) for key in keys]
+    assert placement == [ShardRouter(8).shard_for(key) for key in keys]
+    assert all(800 <= count <= 1200 for count in Counter(placement).values())
+
+    # Growing by one shard only moves sessions onto the new shard
+    grown = [ShardRouter(9).shard_for(key) for key in keys]
+    moved = [after for before, after in zip(placement, grown) if before != after]
+    assert set(moved) == {8}
+    assert 0.08 < len(moved) / len(keys) < 0.15
+
+
+def test_fan_out_merges_tasks_across_shards(tmp_path):
+    store = ShardedSessionManager(str(tmp_path / "sessions.db"), shards=3, manager_factory=TaskShard)
+    expected = []
+    for number, session_id in enumerate(SESSIONS):
+        # Repeated and NULL created_at values exercise the id tiebreak
+        for created_at in (f"2024-01-{number % 5 + 1:02d} 10:00:00", "2024-02-01 00:00:00", None):
+            task_id = f"task-{number:03d}-{created_at}"
+            store.shard(session_id).add_task(task_id, session_id, created_at)
+            expected.append((created_at is not None, created_at or "", task_id))
+    expected = [task_id for _, _, task_id in sorted(expected, reverse=True)]
+    assert len({id(store.shard(session_id)) for session_id in SESSIONS}) == 3
+
+    assert [task.id for task in store.iter_tasks(batch_size=7)] == expected
+    assert {task["id"] for task in store.get_tasks()} == set(expected)
+    assert [task["session_id"] for task in store.get_tasks(SESSIONS[5])] == [SESSIONS[5]] * 3
+
+    page = store.get_tasks_page(limit=len(expected))
+    assert [task.id for task in page["tasks"]] == expected
+    assert page["next_cursor"] is None
+    asyncio.run(store.close())
+
+
+def fill(path, sessions, rows_per_session=3):
+    conn = sqlite3.connect(path)
+    conn.executescript(SESSION_SCHEMA)
+    for session_id in sessions:
+        for number in range(rows_per_session):
+            conn.execute("INSERT INTO activity_logs (session_id, action_type, execution_time) VALUES (?, ?, ?)",
+                         (session_id, f"command {number}", number * 0.5))
+            conn.execute("INSERT INTO session_notes (session_id, content) VALUES (?, ?)",
+                         (session_id, f"note {number}"))
+        conn.execute("INSERT INTO tasks (id, session_id, title) VALUES (?, ?, 'task')",
+                     (f"task-{session_id}", session_id))
+    conn.commit()
+    apply_migrations(conn)
+    conn.close()
+
+
+def contents(paths, table="activity_logs", columns="session_id, action_type, execution_time"):
+    rows = Counter()
+    for path in paths:
+        conn = sqlite3.connect(path)
+        rows.update(conn.execute(f"SELECT {columns} FROM {table}"))
+        conn.close()
+    return rows
+
+
+def test_rebalance_moves_sessions_to_their_shard(tmp_path):
+    source = str(tmp_path / "sessions.db")
+    fill(source, SESSIONS)
+    targets = shard_paths(source, 3)
+
+    report = rebalance([source], targets)
+    assert report["rows"] == {"activity_logs": 120, "session_notes": 120, "tasks": 40}
+    assert report["reassigned_ids"] == {"activity_logs": 0, "session_notes": 0, "tasks": 0}
+
+    router = ShardRouter(3)
+    for index, path in enumerate(targets):
+        conn = sqlite3.connect(path)
+        sessions = {session_id for (session_id,) in conn.execute("SELECT session_id FROM activity_logs")}
+        assert sessions and all(router.shard_for(session_id) == index for session_id in sessions)
+        assert conn.execute("SELECT SUM(total) FROM activity_daily_rollup").fetchone()[0] == \
+            conn.execute("SELECT COUNT(*) FROM activity_logs").fetchone()[0]
+        conn.close()
+    # One source keeps every row id
+    assert contents(targets, columns="id, session_id, action_type") == \
+        contents([source], columns="id, session_id, action_type")
+
+
+def test_rebalance_renumbers_clashing_ids(tmp_path):
+    # Two stores filled independently both start their ids at 1
+    sources = [str(tmp_path / "a.db"), str(tmp_path / "b.db")]
+    fill(sources[0], SESSIONS[:20])
+    fill(sources[1], SESSIONS[20:])
+    targets = shard_paths(str(tmp_path / "merged.db"), 2)
+
+    report = rebalance(sources, targets)
+    assert report["rows"]["activity_logs"] == 120
+    assert 0 < report["reassigned_ids"]["activity_logs"] < 60
+    assert report["reassigned_ids"]["tasks"] == 0
+    assert contents(targets) == contents(sources)
+    assert contents(targets, "session_notes", "session_id, content") == \
+        contents(sources, "session_notes", "session_id, content")
+
+
+def test_rebalance_refuses_unsharded_tables(tmp_path):
+    source = str(tmp_path / "sessions.db")
+    fill(source, SESSIONS[:5])
+    conn = sqlite3.connect(source)
+    conn.execute("CREATE TABLE user_preferences (key TEXT PRIMARY KEY, value TEXT)")
+    conn.close()
+
+    targets = shard_paths(source, 2)
+    with pytest.raises(ValueError, match="user_preferences"):
+        rebalance([source], targets)
+    assert not any(os.path.exists(path) for path in targets)
+
+
+def test_rebalance_closes_connections(tmp_path, monkeypatch):
+    source = str(tmp_path / "sessions.db")
+    fill(source, SESSIONS[:5])
+    opened = []
+    connect = sqlite3.connect
+
+    def tracking_connect(*args, **kwargs):
+        conn = connect(*args, **kwargs)
+        opened.append(conn)
+        return conn
+
+    monkeypatch.setattr(sqlite3, "connect", tracking_connect)
+    rebalance([source], shard_paths(source, 2))
+    assert opened
+    for conn in opened:
+        with pytest.raises(sqlite3.ProgrammingError, match="closed"):
+            conn.execute("SELECT 1")
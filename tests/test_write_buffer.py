@@ -0,0 +1,142 @@
+import sqlite3
+import time
+from contextlib import contextmanager
+
+import pytest
+
+from core.write_buffer import WriteBuffer
+
+
+class Factory:
+    """Connection factory that can be told to fail its next connections"""
+
+    def __init__(self, path):
+        self.path = path
+        self.failures = []
+        self.connections = 0
+
+    @contextmanager
+    def __call__(self):
+        self.connections += 1
+        if self.failures:
+            raise self.failures.pop(0)
+        conn = sqlite3.connect(self.path)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+
+def count(path, table="activity_logs", session_id=None):
+    conn = sqlite3.connect(path)
+    try:
+        query = f"SELECT COUNT(*) FROM {table}" + (" WHERE session_id = ?" if session_id else "")
+        return conn.execute(query, (session_id,) if session_id else ()).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def activity(number, session_id="s1", **extra):
+    return {"session_id": session_id, "action_type": "command", "user_input": f"ls {number}",
+            "success": True, "execution_time": number / 100, **extra}
+
+
+@pytest.fixture
+def factory(session_db):
+    return Factory(session_db)
+
+
+def test_batched_rows_land_in_one_flush(factory, session_db):
+    buffer = WriteBuffer(factory, max_batch=100, flush_interval=60)
+    for number in range(10):
+        buffer.add("activity_logs", activity(number))
+    buffer.add("session_notes", {"session_id": "s1", "note_type": "manual", "content": "note"})
+    assert count(session_db) == 0
+    assert buffer.has_pending("s1") and not buffer.has_pending("s2")
+
+    assert buffer.flush() == 11
+    assert factory.connections == 1
+    assert count(session_db) == 10 and count(session_db, "session_notes") == 1
+    assert buffer.get_stats()["rows_written"] == 11
+    assert buffer.close() == 0
+
+
+def test_flush_on_size_interval_and_close(factory, session_db):
+    buffer = WriteBuffer(factory, max_batch=5, flush_interval=60)
+    for number in range(5):
+        buffer.add("activity_logs", activity(number))
+    assert wait_for(lambda: count(session_db) == 5)
+    buffer.add("activity_logs", activity(5))
+    buffer.close()
+    assert count(session_db) == 6 and buffer.get_stats()["pending_rows"] == 0
+
+    buffer = WriteBuffer(factory, max_batch=100, flush_interval=0.05)
+    buffer.add("activity_logs", activity(6))
+    assert wait_for(lambda: count(session_db) == 7)
+    buffer.close()
+
+
+def test_immediate_durability_writes_every_row(factory, session_db):
+    buffer = WriteBuffer(factory, durability="immediate")
+    buffer.add("activity_logs", activity(1))
+    assert count(session_db) == 1
+    assert buffer.get_stats()["pending_rows"] == 0
+    with pytest.raises(ValueError, match="durability"):
+        WriteBuffer(factory, durability="eventually")
+
+
+def test_sync_makes_session_rows_visible(factory, session_db):
+    buffer = WriteBuffer(factory, flush_interval=60)
+    buffer.add("activity_logs", activity(1, "s1"))
+    buffer.add("activity_logs", activity(2, "s2"))
+    assert buffer.sync("s3") == 0
+    assert buffer.sync("s1") == 2
+    assert count(session_db, session_id="s1") == 1
+    buffer.close()
+
+
+def test_locked_database_keeps_rows_for_retry(factory, session_db):
+    buffer = WriteBuffer(factory, flush_interval=60)
+    for number in range(3):
+        buffer.add("activity_logs", activity(number))
+    factory.failures.append(sqlite3.OperationalError("database is locked"))
+
+    with pytest.raises(sqlite3.OperationalError, match="locked"):
+        buffer.flush()
+    stats = buffer.get_stats()
+    assert stats["pending_rows"] == 3 and stats["failed_flushes"] == 1
+
+    buffer.add("activity_logs", activity(3))
+    assert buffer.flush() == 4
+    conn = sqlite3.connect(session_db)
+    inputs = [row[0] for row in conn.execute("SELECT user_input FROM activity_logs ORDER BY id")]
+    conn.close()
+    assert inputs == ["ls 0", "ls 1", "ls 2", "ls 3"]
+    buffer.close()
+
+
+def test_bad_rows_are_dropped_and_the_rest_written(factory, session_db):
+    buffer = WriteBuffer(factory, flush_interval=60)
+    buffer.add("activity_logs", activity(1, id=1))
+    buffer.add("activity_logs", activity(2, id=1))       # duplicate primary key
+    buffer.add("activity_logs", activity(3, id=2))
+    buffer.add("activity_logs", activity(4, colour="red"))  # no such column
+    buffer.add("session_notes", {"session_id": "s1", "content": "kept"})
+
+    assert buffer.flush() == 3
+    stats = buffer.get_stats()
+    assert stats["rows_dropped"] == 2 and stats["pending_rows"] == 0
+    assert count(session_db) == 2 and count(session_db, "session_notes") == 1
+    with pytest.raises(ValueError, match="not buffered"):
+        buffer.add("tasks", {"id": "t1"})
+    buffer.close()